@@ -0,0 +1,141 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+ANALYTICS_DB = os.getenv("ANALYTICS_DB", "interview_analytics.sqlite")  # empty string disables the store
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS answers (
+    id INTEGER PRIMARY KEY,
+    recorded_at REAL NOT NULL,
+    session_id TEXT,
+    domain TEXT NOT NULL,
+    round TEXT NOT NULL,
+    question TEXT NOT NULL,
+    score REAL NOT NULL,
+    confidence TEXT,
+    latency REAL
+);
+CREATE INDEX IF NOT EXISTS answers_domain_question ON answers (domain, question, score);
+CREATE INDEX IF NOT EXISTS answers_session ON answers (session_id);
+
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    recorded_at REAL NOT NULL,
+    domain TEXT NOT NULL,
+    overall_score REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_domain_score ON sessions (domain, overall_score);
+"""
+
+
+def normalize_domain(domain):
+    return " ".join(str(domain).split()).lower()
+
+
+class AnalyticsStore:
+    """
+    Append-only SQLite store of every evaluated answer and every finished session.
+    Cohort queries are answered from the (domain, overall_score) and
+    (domain, question, score) indexes rather than by scanning history.
+    """
+
+    def __init__(self, path=ANALYTICS_DB):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        self._db.commit()
+
+    #---------writes---------
+    def record_answer(self, session_id, domain, answer, latency=None):
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO answers (recorded_at, session_id, domain, round, question, score, confidence, latency) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (time.time(), session_id, normalize_domain(domain), answer.round, answer.question,
+                 answer.score, answer.confidence, latency),
+            )
+            self._db.commit()
+
+    def record_answers(self, rows):
+        """Bulk insert of (session_id, domain, answer, latency) tuples in one transaction."""
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "INSERT INTO answers (recorded_at, session_id, domain, round, question, score, confidence, latency) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(now, session_id, normalize_domain(domain), answer.round, answer.question,
+                  answer.score, answer.confidence, latency)
+                 for session_id, domain, answer, latency in rows],
+            )
+            self._db.commit()
+
+    def record_session(self, session_id, domain, overall_score):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, recorded_at, domain, overall_score) VALUES (?, ?, ?, ?)",
+                (session_id, time.time(), normalize_domain(domain), float(overall_score)),
+            )
+            self._db.commit()
+
+    #---------cohort queries---------
+    def percentile(self, domain, score):
+        """
+        Percentile of `score` among finished sessions in `domain` (share scoring at or below it).
+        Returns (percentile, cohort_size); percentile is None for an empty cohort.
+        """
+        with self._lock:
+            below, total = self._db.execute(
+                "SELECT "
+                "(SELECT COUNT(*) FROM sessions WHERE domain = ?1 AND overall_score <= ?2), "
+                "(SELECT COUNT(*) FROM sessions WHERE domain = ?1)",
+                (normalize_domain(domain), float(score)),
+            ).fetchone()
+        if not total:
+            return None, 0
+        return round(below / total * 100, 1), total
+
+    def hardest_questions(self, domain, limit=5, min_attempts=3):
+        """Questions in `domain` with the lowest average score: [(question, avg_score, attempts)]."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT question, AVG(score) AS avg_score, COUNT(*) AS attempts "
+                "FROM answers WHERE domain = ? "
+                "GROUP BY question HAVING attempts >= ? "
+                "ORDER BY avg_score ASC, attempts DESC LIMIT ?",
+                (normalize_domain(domain), min_attempts, limit),
+            ).fetchall()
+        return [(question, round(avg_score, 2), attempts) for question, avg_score, attempts in rows]
+
+    def domain_summary(self, domain):
+        """Number of answers, mean score and mean grading latency recorded for `domain`."""
+        with self._lock:
+            count, avg_score, avg_latency = self._db.execute(
+                "SELECT COUNT(*), AVG(score), AVG(latency) FROM answers WHERE domain = ?",
+                (normalize_domain(domain),),
+            ).fetchone()
+        return {"answers": count, "avg_score": avg_score, "avg_latency": avg_latency}
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_analytics_store():
+    """Returns the process-wide store, or None when ANALYTICS_DB is empty or unusable."""
+    global _store
+    if _store is None and ANALYTICS_DB:
+        with _store_lock:
+            if _store is None:
+                try:
+                    _store = AnalyticsStore(ANALYTICS_DB)
+                except sqlite3.Error as e:
+                    logger.error(f"Analytics store '{ANALYTICS_DB}' unavailable: {e}")
+                    return None
+    return _store
@@ -0,0 +1,214 @@
+import io
+import os
+import json
+import time
+import wave
+import base64
+import random
+import logging
+import urllib.error
+import urllib.request
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+#---------thin-client settings---------
+# When set, main.py sends every heavy call to this interview server (see server.py)
+INTERVIEW_API_URL = os.getenv("INTERVIEW_API_URL", "").rstrip("/")
+INTERVIEW_API_KEY = os.getenv("INTERVIEW_API_KEY")
+INTERVIEW_API_TIMEOUT = float(os.getenv("INTERVIEW_API_TIMEOUT", "300"))  # per job, queueing included
+POLL_WAIT = 25  # seconds each long-poll of a job may block on the server
+
+
+class InterviewAPIError(Exception):
+    """Raised when the interview server rejects a request or a job fails."""
+
+
+class InterviewAPI:
+    """Minimal client for the interview server: submit a task, long-poll its job."""
+
+    def __init__(self, url=INTERVIEW_API_URL, api_key=INTERVIEW_API_KEY, timeout=INTERVIEW_API_TIMEOUT):
+        self.url = url
+        self.api_key = api_key
+        self.timeout = timeout
+
+    def request(self, method, path, body=None):
+        data = json.dumps(body).encode() if body is not None else None
+        request = urllib.request.Request(f"{self.url}{path}", data=data, method=method)
+        request.add_header("Content-Type", "application/json")
+        if self.api_key:
+            request.add_header("X-API-Key", self.api_key)
+        try:
+            with urllib.request.urlopen(request, timeout=POLL_WAIT + 10) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.loads(e.read()).get("error", e.reason)
+            except ValueError:
+                message = e.reason
+            raise InterviewAPIError(f"{method} {path} -> {e.code}: {message}") from e
+
+    def wait(self, job):
+        deadline = time.monotonic() + self.timeout
+        while job["status"] in ("queued", "running"):
+            if time.monotonic() > deadline:
+                raise InterviewAPIError(f"Job {job['task']} did not finish within {self.timeout:.0f}s")
+            job = self.request("GET", f"/jobs/{job['job_id']}?wait={POLL_WAIT}")
+        if job["status"] == "failed":
+            raise InterviewAPIError(f"Job {job['task']} failed: {job.get('error')}")
+        return job["result"]
+
+    def run(self, task, **args):
+        """Runs one server task and returns its result."""
+        return self.wait(self.request("POST", f"/tasks/{task}", args)["job"])
+
+
+_api = None
+
+
+def get_client():
+    """The shared API client (stands in for domain.get_client in thin-client mode)."""
+    global _api
+    if _api is None:
+        _api = InterviewAPI()
+    return _api
+
+
+def wav_base64(audio, fs=16000):
+    """A file path or float32 array as base64 16-bit PCM WAV, the server's upload format."""
+    if isinstance(audio, str):
+        with open(audio, "rb") as f:
+            return base64.b64encode(f.read()).decode()
+    pcm = (np.clip(np.asarray(audio, dtype=np.float32), -1, 1) * 32767).astype("<i2")
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(fs)
+        wav.writeframes(pcm.tobytes())
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+#---------drop-in replacements for the functions main.py calls---------
+def identify_domain(job_description, client=None, refresh=False):
+    try:
+        return (client or get_client()).run("identify_domain", job_description=job_description, refresh=refresh)
+    except Exception as e:
+        logger.error(f"[Runtime Error] Domain Identification Failed: {e}")
+        return "Error occurred during domain identification"
+
+
+def generate_hr_questions():
+    try:
+        return get_client().run("generate_hr_questions")
+    except Exception as e:
+        logger.error(f"Error generating HR questions, using the built-in HR list: {e}")
+        from hr import HR_QUESTIONS
+        return random.sample(HR_QUESTIONS, 5)
+
+
+def generate_technical_questions(domain, num_questions=10):
+    try:
+        return get_client().run("generate_technical_questions", domain=domain, num_questions=num_questions)
+    except Exception as e:
+        logger.error(f"Error generating technical questions: {e}")
+        return [f"Error generating questions: {e}"]
+
+
+def evaluate_hr_answer(question, answer):
+    try:
+        return tuple(get_client().run("evaluate_hr_answer", question=question, answer=answer))
+    except Exception as e:
+        logger.error(f"Error evaluating HR answer: {e}")
+        return 0, "Error during evaluation.", "Low"
+
+
+def evaluate_technical_answer(question, answer, domain):
+    try:
+        return tuple(get_client().run("evaluate_technical_answer", question=question, answer=answer, domain=domain))
+    except Exception as e:
+        logger.error(f"Error evaluating technical answer: {e}")
+        return 0, "Error during evaluation."
+
+
+def stream_evaluate_hr_answer(question, answer):
+    """The server grades whole replies, so the 'stream' is the single final result."""
+    score, feedback, confidence = evaluate_hr_answer(question, answer)
+    yield "", {"score": score, "feedback": feedback, "confidence": confidence}
+
+
+def stream_evaluate_technical_answer(question, answer, domain):
+    score, feedback = evaluate_technical_answer(question, answer, domain)
+    yield "", {"score": score, "feedback": feedback}
+
+
+def evaluate_hr_round(qa_pairs):
+    try:
+        return [tuple(result) for result in get_client().run("evaluate_hr_round", qa_pairs=[list(p) for p in qa_pairs])]
+    except Exception as e:
+        logger.error(f"Error evaluating HR round: {e}")
+        return [(0, "Error during evaluation.", "Low") for _ in qa_pairs]
+
+
+def transcribe_audio(audio):
+    try:
+        if audio is None:
+            raise ValueError("No audio to transcribe.")
+        return get_client().run("transcribe_audio", audio=wav_base64(audio))
+    except Exception as e:
+        logger.error(f"Error during transcription: {e}")
+        return ""
+
+
+def _transcribe_and_evaluate(task, question, audio, transcript, domain=None):
+    started = time.perf_counter()
+    args = {"question": question, "domain": domain}
+    if transcript is None:
+        args["audio"] = wav_base64(audio) if audio is not None else None
+    else:
+        args["transcript"] = transcript
+    try:
+        result = get_client().run(task, **args)
+        return result["transcript"], result["score"], result["feedback"], result["confidence"], \
+            time.perf_counter() - started
+    except Exception as e:
+        logger.error(f"Error during {task}: {e}")
+        return transcript or "", 0, "Error during evaluation.", "Low" if task.endswith("_hr") else None, \
+            time.perf_counter() - started
+
+
+def transcribe_and_evaluate_hr(question, audio, transcript=None):
+    return _transcribe_and_evaluate("transcribe_and_evaluate_hr", question, audio, transcript)
+
+
+def transcribe_and_evaluate_technical(question, audio, domain, transcript=None):
+    return _transcribe_and_evaluate("transcribe_and_evaluate_technical", question, audio, transcript, domain)
+
+
+class RemoteAnalytics:
+    """Stands in for the local analytics store: answers go to the server's store, next to its cohort."""
+
+    def record_answer(self, session_id, domain, answer, latency=None):
+        # Fire and forget: the UI does not wait for the write
+        get_client().request("POST", "/tasks/record_answer",
+                             {"session_id": session_id, "domain": domain, "answer": answer.to_state()})
+
+
+def get_analytics_store():
+    return RemoteAnalytics()
+
+
+def warm_up_evaluation():
+    """The server warms its own workers at boot; nothing to load in a thin client."""
+    return 0.0
+
+
+def generate_report(hr_answers, tech_answers, cohort_scores=None, analytics=None, domain=None, session_id=None):
+    """Builds the report on the server, which ranks it against its own analytics cohort."""
+    try:
+        return get_client().run("generate_report", domain=domain, session_id=session_id,
+                                hr_answers=[answer.to_state() for answer in hr_answers],
+                                tech_answers=[answer.to_state() for answer in tech_answers])
+    except Exception as e:
+        logger.error(f"Error generating report: {e}")
+        return f"⚠️ Error generating report: {e}"
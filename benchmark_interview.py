@@ -0,0 +1,331 @@
+import os
+import sys
+import json
+import glob
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import numpy as np
+from benchmark_transcription import peak_rss_mb
+from telemetry import configure_logging
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+MAX_ANSWER_SECONDS = 30
+STAGES = ["start", "confirm_domain", "start_hr_prompt", "hr_round", "tech_prompt", "tech_round", "result_wait"]
+
+SAMPLE_JDS = [
+    "We are looking for a Python Developer to build REST APIs with Django and Flask, "
+    "write unit tests and work with PostgreSQL.",
+    "We are hiring a Data Scientist to design A/B experiments, build predictive models in Python "
+    "and present insights to product managers.",
+    "Join our team as a DevOps Engineer to automate CI/CD pipelines, manage Kubernetes clusters "
+    "and monitor production systems on AWS.",
+    "We are seeking a Cybersecurity Analyst to monitor security events, triage alerts "
+    "and respond to incidents using SIEM tools.",
+]
+
+
+#---------fake LLM server speaking the chat completions API---------
+class FakeLLMServer:
+    """
+    Local HTTP server answering /chat/completions like the Groq API, so the real
+    GroqBackend (HTTP client, pooling, retries, scheduler) is exercised end to end.
+    `latency` is spread over the reply's tokens when streaming; above `rpm` requests
+    per minute it answers 429 with a Retry-After header.
+    """
+
+    def __init__(self, latency=0.5, rpm=0, host="127.0.0.1", port=0):
+        from llm import fake_responder
+        from scheduler import TokenBucket, estimate_tokens
+        from prompts import count_tokens
+
+        self.latency = latency
+        self.bucket = TokenBucket(rpm) if rpm > 0 else None
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "rate_limited": 0, "prompt_tokens": 0, "completion_tokens": 0}
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body, headers=()):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if not self.path.endswith("/chat/completions"):
+                    return self._send(404, {"error": {"message": "not found"}})
+
+                with server.lock:
+                    server.stats["requests"] += 1
+                    wait = server.bucket.delay(1, time.monotonic()) if server.bucket else 0.0
+                    if wait:
+                        server.stats["rate_limited"] += 1
+                    elif server.bucket:
+                        server.bucket.take(1)
+                if wait:
+                    return self._send(429, {"error": {"message": "rate limit exceeded"}},
+                                      [("retry-after", f"{wait:.2f}")])
+
+                model = request.get("model", "")
+                text = fake_responder(request.get("messages", []), model)
+                usage = {"prompt_tokens": count_tokens(request.get("messages", [])),
+                         "completion_tokens": estimate_tokens(text)}
+                usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+                with server.lock:
+                    server.stats["prompt_tokens"] += usage["prompt_tokens"]
+                    server.stats["completion_tokens"] += usage["completion_tokens"]
+                if not request.get("stream"):
+                    time.sleep(server.latency)
+                    return self._send(200, {
+                        "id": "bench", "object": "chat.completion", "created": int(time.time()), "model": model,
+                        "choices": [{"index": 0, "finish_reason": "stop",
+                                     "message": {"role": "assistant", "content": text}}],
+                        "usage": usage,
+                    })
+
+                tokens = text.split(" ")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for i, token in enumerate(tokens):
+                    time.sleep(server.latency / len(tokens))
+                    self._chunk(model, token + (" " if i < len(tokens) - 1 else ""), None)
+                self._chunk(model, "", "stop")
+                self._write(b"data: [DONE]\n\n")
+                self._write(b"")
+
+            def _chunk(self, model, content, finish_reason):
+                body = {"id": "bench", "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                        "choices": [{"index": 0, "delta": {"content": content}, "finish_reason": finish_reason}]}
+                self._write(f"data: {json.dumps(body)}\n\n".encode())
+
+            def _write(self, data):
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://{host}:{self.httpd.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, name="fake-llm", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+
+
+#---------pre-recorded answers in place of the microphone---------
+class WavMicrophone:
+    """
+    Drop-in for the parts of `sounddevice` that voice.py uses (rec/wait/InputStream),
+    replaying pre-recorded WAV answers in turn instead of capturing audio.
+    """
+
+    def __init__(self, clips, fs=16000):
+        self.clips = clips
+        self.fs = fs
+        self.turn = 0
+
+    def _next_clip(self, frames):
+        clip = self.clips[self.turn % len(self.clips)]
+        self.turn += 1
+        clip = clip[:frames] if frames else clip
+        return clip.reshape(-1, 1).astype("float32")
+
+    def rec(self, frames, samplerate=None, channels=1, dtype="float32"):
+        return self._next_clip(frames)
+
+    def wait(self):
+        pass
+
+    def InputStream(self, samplerate=None, channels=1, dtype="float32", blocksize=1600, callback=None):
+        microphone = self
+
+        class Stream:
+            def __enter__(self):
+                fs = samplerate or microphone.fs
+                clip = microphone._next_clip(None)
+                # Trail with silence past the longest answer window, so the capture loop
+                # ends on a pause (or its duration limit) like a live microphone would
+                silence = np.zeros((max(0, MAX_ANSWER_SECONDS * fs - len(clip)) + fs, 1), dtype="float32")
+                clip = np.concatenate([clip, silence])
+                for start in range(0, len(clip), blocksize):
+                    block = clip[start:start + blocksize]
+                    callback(block, len(block), None, None)
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+        return Stream()
+
+
+def load_clips(paths, fs=16000):
+    """Reads WAV answers as 16 kHz float32; a second of low noise stands in when none are given."""
+    from scipy.io.wavfile import read
+    from voice import to_whisper_audio
+
+    clips = [to_whisper_audio(*reversed(read(path))) for path in paths]
+    return clips or [np.random.default_rng(0).normal(0, 0.01, fs).astype("float32")]
+
+
+#---------one worker process drives candidates through main.py---------
+def _timed_run(element, samples, stage, errors):
+    started = time.perf_counter()
+    app = element.run()
+    samples.append((stage, time.perf_counter() - started))
+    if app.exception:
+        errors.append(f"{stage}: {app.exception[0].message}")
+    return app
+
+
+def run_candidates(candidate_ids, options):
+    """Runs candidates back to back through the full stage machine; returns samples and peak RSS."""
+    os.environ.update(options["env"])
+    workdir = tempfile.mkdtemp(prefix="interview-bench-")
+    os.chdir(workdir)
+    sys.path.insert(0, REPO_DIR)
+    logging.disable(logging.WARNING)
+
+    microphone = WavMicrophone([])
+    sys.modules["sounddevice"] = microphone
+    microphone.clips = load_clips(options["wavs"])
+    from streamlit.testing.v1 import AppTest
+
+    samples, errors, completed = [], [], 0
+    for candidate in candidate_ids:
+        started = time.perf_counter()
+        at = AppTest.from_file(os.path.join(REPO_DIR, "main.py"), default_timeout=options["timeout"])
+        try:
+            at.run()
+            jd = SAMPLE_JDS[candidate % len(SAMPLE_JDS)]
+            at = _timed_run(at.text_input(key="jd_input").input(jd), samples, "start", errors)
+            at = _timed_run(at.text_input(key="confirm_domain_input").input("yes"), samples, "confirm_domain", errors)
+            at = _timed_run(at.text_input(key="start_hr_input").input("yes"), samples, "start_hr_prompt", errors)
+            session = at.session_state["interview"]
+            while session.stage == 'hr_round' and at.button:
+                at = _timed_run(at.button[0].click(), samples, "hr_round", errors)
+                session = at.session_state["interview"]
+            at = _timed_run(at.text_input(key="start_tech_input").input("yes"), samples, "tech_prompt", errors)
+            session = at.session_state["interview"]
+            while session.stage == 'tech_round' and at.button:
+                at = _timed_run(at.button[0].click(), samples, "tech_round", errors)
+                session = at.session_state["interview"]
+            at = _timed_run(at.text_input(key="result_input").input("show result"), samples, "result_wait", errors)
+            if "INTERVIEW PERFORMANCE REPORT" not in at.session_state["interview"].chat_history[-1][0]:
+                errors.append(f"candidate {candidate}: no report produced")
+            else:
+                completed += 1
+        except Exception as e:
+            errors.append(f"candidate {candidate}: {e!r}")
+        samples.append(("candidate", time.perf_counter() - started))
+
+    os.chdir(REPO_DIR)
+    shutil.rmtree(workdir, ignore_errors=True)
+    return {"samples": samples, "errors": errors, "completed": completed,
+            "peak_rss_mb": round(peak_rss_mb(), 1), "pid": os.getpid()}
+
+
+#---------report---------
+def summarise(results, wall_seconds):
+    by_stage = {}
+    for result in results:
+        for stage, seconds in result["samples"]:
+            by_stage.setdefault(stage, []).append(seconds)
+    stages = {}
+    for stage in STAGES + ["candidate"]:
+        values = np.asarray(by_stage.get(stage, []))
+        if not len(values):
+            continue
+        p50, p95, p99 = np.percentile(values, [50, 95, 99]) * 1000
+        stages[stage] = {"n": len(values), "p50_ms": round(p50, 1), "p95_ms": round(p95, 1), "p99_ms": round(p99, 1)}
+    completed = sum(result["completed"] for result in results)
+    return {
+        "stages": stages,
+        "completed": completed,
+        "wall_s": round(wall_seconds, 2),
+        "candidates_per_min": round(completed / wall_seconds * 60, 2) if wall_seconds else None,
+        "worker_peak_rss_mb": [result["peak_rss_mb"] for result in results],
+        "errors": [error for result in results for error in result["errors"]],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Headless load test of the full interview flow (main.py) with a fake LLM server and WAV answers."
+    )
+    parser.add_argument("wavs", nargs="*", help="Pre-recorded answers (default: recordings/*.wav, else noise)")
+    parser.add_argument("--candidates", type=int, default=8, help="Total simulated candidates")
+    parser.add_argument("--concurrency", type=int, default=4, help="Worker processes, i.e. concurrent candidates")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Seconds per fake LLM reply")
+    parser.add_argument("--llm-rpm", type=int, default=0, help="Fake server rate limit (0 = unlimited)")
+    parser.add_argument("--client-rpm", type=int, default=0, help="LLM_RPM of each worker's scheduler (0 = unlimited)")
+    parser.add_argument("--transcriber", default="fake", help="WHISPER_BACKEND for the workers (fake skips the model)")
+    parser.add_argument("--fake-rtf", type=float, default=0.05, help="Seconds of fake transcription per audio second")
+    parser.add_argument("--timeout", type=float, default=120, help="Per-step script timeout in seconds")
+    parser.add_argument("--json", help="Also write the summary as JSON to this file")
+    args = parser.parse_args()
+
+    configure_logging()
+    wavs = args.wavs or sorted(glob.glob(os.path.join(REPO_DIR, "recordings", "*.wav")))
+    server = FakeLLMServer(latency=args.llm_latency, rpm=args.llm_rpm).start()
+    env = {
+        "LLM_BACKEND": "groq", "GROQ_API_KEY": "benchmark", "GROQ_BASE_URL": server.url,
+        "LLM_RPM": str(args.client_rpm), "LLM_TPM": "0",
+        "WHISPER_BACKEND": args.transcriber, "WHISPER_FAKE_RTF": str(args.fake_rtf),
+        "ARCHIVE_RECORDINGS": "0", "SESSION_STORE": "",
+    }
+    options = {"env": env, "wavs": [os.path.abspath(path) for path in wavs], "timeout": args.timeout}
+    # Set before the workers spawn: modules read their settings from the environment at import time
+    os.environ.update(env)
+    workers = max(1, min(args.concurrency, args.candidates))
+    shards = [list(range(i, args.candidates, workers)) for i in range(workers)]
+
+    logging.info(f"Running {args.candidates} candidate(s) on {workers} worker(s) against {server.url}")
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        results = list(pool.map(run_candidates, shards, [options] * workers))
+    summary = summarise(results, time.perf_counter() - started)
+    summary["llm_server"] = dict(server.stats)
+    if summary["completed"]:
+        summary["tokens_per_interview"] = round(
+            (server.stats["prompt_tokens"] + server.stats["completion_tokens"]) / summary["completed"])
+    server.stop()
+
+    print(f"\n{'stage':<16}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage, row in summary["stages"].items():
+        print(f"{stage:<16}{row['n']:>6}{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}")
+    print(f"\ncompleted={summary['completed']}/{args.candidates} wall={summary['wall_s']}s "
+          f"throughput={summary['candidates_per_min']} candidates/min")
+    print(f"worker peak RSS (MB): {summary['worker_peak_rss_mb']}")
+    print(f"LLM server: {summary['llm_server']}")
+    print(f"tokens per completed interview: {summary.get('tokens_per_interview')}")
+    for error in summary["errors"]:
+        print(f"ERROR {error}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as out:
+            json.dump(summary, out, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+from collections import defaultdict
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_MODULES = {os.path.splitext(name)[0] for name in os.listdir(REPO_DIR) if name.endswith(".py")}
+
+_IMPORT_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s*(\S+)")
+
+# Runs in a fresh interpreter: renders main.py once, as a new Streamlit worker would
+# for its first visitor, then waits for the background warmup to finish.
+RENDER_SCRIPT = """
+import time
+started = time.perf_counter()
+import json
+from streamlit.testing.v1 import AppTest
+streamlit_loaded = time.perf_counter()
+app = AppTest.from_file(MAIN, default_timeout=TIMEOUT)
+app.run()
+rendered = time.perf_counter()
+jd_box = any(box.label.startswith("Paste Job Description") for box in app.text_input)
+import startup
+ready = startup.get_warmup().wait(TIMEOUT)
+warmed = time.perf_counter()
+print("RESULT " + json.dumps({
+    "streamlit_import_s": streamlit_loaded - started,
+    "script_run_s": rendered - streamlit_loaded,
+    "first_render_s": rendered - started,
+    "jd_box": jd_box,
+    "ready": ready,
+    "ready_s": warmed - started,
+    "warmup": startup.get_warmup().status(),
+}))
+"""
+
+
+def measure_imports(module="main", env=None, cwd=REPO_DIR):
+    """
+    Imports `module` in a fresh interpreter under -X importtime and returns
+    ({package: self seconds}, {repo module: cumulative seconds}, total seconds).
+    Self times are summed per top-level package, so nothing is counted twice.
+    """
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=cwd, env=env, capture_output=True, text=True)
+    if proc.returncode:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import failed")
+    packages, repo_modules, total = defaultdict(float), {}, 0.0
+    for line in proc.stderr.splitlines():
+        match = _IMPORT_LINE.match(line)
+        if not match:
+            continue
+        own, cumulative, name = match.groups()
+        packages[name.split(".")[0]] += int(own) / 1e6
+        if name in REPO_MODULES:
+            repo_modules[name] = int(cumulative) / 1e6
+        if name == module:
+            total = int(cumulative) / 1e6
+    return dict(packages), repo_modules, total
+
+
+def measure_first_render(env=None, timeout=120, cwd=REPO_DIR):
+    """Times a fresh interpreter from start to the first rendered page and to warmup readiness."""
+    script = RENDER_SCRIPT.replace("TIMEOUT", repr(timeout)).replace("MAIN", repr(os.path.join(REPO_DIR, "main.py")))
+    started = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-c", script], cwd=cwd, env=env,
+                          capture_output=True, text=True, timeout=timeout * 2)
+    wall = time.perf_counter() - started
+    for line in proc.stdout.splitlines():
+        if line.startswith("RESULT "):
+            result = json.loads(line[len("RESULT "):])
+            result["process_s"] = wall
+            return result
+    raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "no result")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Cold-start benchmark of a Streamlit worker: import time per module and time to first render."
+    )
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters per measurement (medians are shown)")
+    parser.add_argument("--top", type=int, default=12, help="Packages to list by import time")
+    parser.add_argument("--offline", action="store_true",
+                        help="Use the fake LLM and transcription backends (no API key or model needed)")
+    parser.add_argument("--timeout", type=float, default=120, help="Seconds to wait for render and warmup")
+    parser.add_argument("--json", help="Also write the results as JSON to this file")
+    args = parser.parse_args()
+
+    env = dict(os.environ, SESSION_STORE="", METRICS_PORT="0", LOG_FILE="", PYTHONPATH=REPO_DIR)
+    if args.offline:
+        env.update(LLM_BACKEND="fake", WHISPER_BACKEND="fake")
+    # Pure import cost, without the warmup thread competing for the interpreter
+    import_env = dict(env, WARMUP_ON_BOOT="0")
+
+    imports, renders = [], []
+    for _ in range(args.runs):
+        # Empty working directory per run, so no SQLite store or cache is already warm
+        workdir = tempfile.mkdtemp(prefix="startup-bench-")
+        try:
+            imports.append(measure_imports("main", import_env, workdir))
+            renders.append(measure_first_render(env, args.timeout, workdir))
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    packages = {name: statistics.median(run[0].get(name, 0.0) for run in imports) for name in imports[0][0]}
+    repo_modules = {name: statistics.median(run[1].get(name, 0.0) for run in imports) for name in imports[0][1]}
+    summary = {
+        "import_main_s": round(statistics.median(run[2] for run in imports), 3),
+        "packages_s": {name: round(s, 3) for name, s in sorted(packages.items(), key=lambda kv: -kv[1])[:args.top]},
+        "repo_modules_s": {name: round(s, 3) for name, s in sorted(repo_modules.items(), key=lambda kv: -kv[1])},
+    }
+    for key in ("streamlit_import_s", "script_run_s", "first_render_s", "ready_s", "process_s"):
+        summary[key] = round(statistics.median(run[key] for run in renders), 3)
+    summary["jd_box_rendered"] = all(run["jd_box"] for run in renders)
+    summary["warmup"] = renders[-1]["warmup"]
+
+    print(f"import main: {summary['import_main_s']}s (median of {args.runs})\n")
+    print(f"{'package':<28}{'self s':>10}")
+    for name, seconds in summary["packages_s"].items():
+        print(f"{name:<28}{seconds:>10}")
+    print(f"\n{'repo module':<28}{'cumulative s':>14}")
+    for name, seconds in summary["repo_modules_s"].items():
+        print(f"{name:<28}{seconds:>14}")
+    print(f"\nstreamlit import {summary['streamlit_import_s']}s + script run {summary['script_run_s']}s "
+          f"= first render {summary['first_render_s']}s (JD box shown: {summary['jd_box_rendered']})")
+    print(f"warmup finished at {summary['ready_s']}s: {summary['warmup']['seconds']}")
+    for name, error in summary["warmup"]["errors"].items():
+        print(f"warmup of {name} failed: {error}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as out:
+            json.dump(summary, out, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import os
+import sys
+import glob
+import time
+import logging
+import argparse
+import resource
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from transcription import EngineConfig, build_engine, wav_duration
+from telemetry import configure_logging
+
+
+def peak_rss_mb():
+    # ru_maxrss is reported in KiB on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def run_config(config, files, batch_size):
+    """Loads one engine configuration and transcribes `files`; runs in a fresh process per config."""
+    baseline_mb = peak_rss_mb()
+    started = time.perf_counter()
+    engine = build_engine(config)
+    engine.load()
+    load_seconds = time.perf_counter() - started
+
+    audio_seconds = sum(wav_duration(path) for path in files)
+    started = time.perf_counter()
+    for i in range(0, len(files), batch_size):
+        engine.transcribe_batch(files[i:i + batch_size])
+    compute_seconds = time.perf_counter() - started
+
+    return {
+        "config": repr(config),
+        "load_s": round(load_seconds, 2),
+        "audio_s": round(audio_seconds, 1),
+        "compute_s": round(compute_seconds, 2),
+        "rtf": round(compute_seconds / audio_seconds, 3) if audio_seconds else None,
+        "model_mb": round(peak_rss_mb() - baseline_mb, 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Offline benchmark of transcription engines: real-time factor and memory per configuration."
+    )
+    parser.add_argument("wavs", nargs="*", help="WAV files to transcribe (default: recordings/*.wav)")
+    parser.add_argument("--backends", nargs="+", default=["whisper", "faster-whisper"])
+    parser.add_argument("--models", nargs="+", default=["tiny", "base"])
+    parser.add_argument("--compute-types", nargs="+", default=["float32", "int8"])
+    parser.add_argument("--threads", nargs="+", type=int, default=[os.cpu_count() or 1])
+    parser.add_argument("--beam-sizes", nargs="+", type=int, default=[1])
+    parser.add_argument("--batch-size", type=int, default=4)
+    args = parser.parse_args()
+
+    files = args.wavs or sorted(glob.glob(os.path.join("recordings", "*.wav")))
+    if not files:
+        parser.error("No WAV files given and none found in recordings/.")
+
+    print(f"Benchmarking on {len(files)} file(s), {sum(wav_duration(f) for f in files):.1f}s of audio\n")
+    header = f"{'configuration':<52} {'load_s':>7} {'compute_s':>9} {'rtf':>7} {'model_mb':>9} {'peak_mb':>8}"
+    print(header)
+    print("-" * len(header))
+
+    spawn = multiprocessing.get_context("spawn")
+    for backend, model, compute_type, threads, beam in itertools.product(
+            args.backends, args.models, args.compute_types, args.threads, args.beam_sizes):
+        config = EngineConfig(backend=backend, model_size=model, compute_type=compute_type,
+                              threads=threads, beam_size=beam)
+        # A fresh process per configuration keeps the memory figures independent
+        with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as pool:
+            try:
+                result = pool.submit(run_config, config, files, args.batch_size).result()
+            except Exception as e:
+                print(f"{repr(config):<52} failed: {e}")
+                continue
+        print(f"{result['config']:<52} {result['load_s']:>7} {result['compute_s']:>9} "
+              f"{result['rtf']:>7} {result['model_mb']:>9} {result['peak_rss_mb']:>8}")
+
+
+if __name__ == "__main__":
+    configure_logging(level=logging.WARNING)
+    main()
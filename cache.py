@@ -0,0 +1,191 @@
+import os
+import re
+import json
+import time
+import hashlib
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+#---------cache settings---------
+CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_SIZE", "512"))
+CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+CACHE_DISK_PATH = os.getenv("LLM_CACHE_PATH")  # e.g. "llm_cache.sqlite"; unset keeps the cache in memory only
+CACHE_DISK_MAX_ENTRIES = int(os.getenv("LLM_CACHE_DISK_SIZE", "20000"))
+
+_MISSING = object()
+_registry = {}
+
+
+def normalize_text(text):
+    """Lowercases and collapses whitespace so trivially different inputs share a key."""
+    return re.sub(r"\s+", " ", str(text)).strip().lower()
+
+
+def make_key(*parts):
+    """Content-addressed key over the normalized parts (input text, model, prompt version...)."""
+    raw = "\x1f".join(normalize_text(p) for p in parts)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Two-tier cache for LLM responses: an in-process LRU in front of an optional
+    SQLite table. Both tiers honour the TTL; the disk tier is trimmed to
+    `disk_max_entries` by least recent access.
+    Values must be JSON serialisable.
+    """
+
+    def __init__(self, name, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL,
+                 disk_path=CACHE_DISK_PATH, disk_max_entries=CACHE_DISK_MAX_ENTRIES):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_max_entries = disk_max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self.hits = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.miss_seconds = 0.0
+
+        if disk_path:
+            try:
+                self._db = sqlite3.connect(disk_path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS cache ("
+                    "namespace TEXT, key TEXT, value TEXT, created REAL, accessed REAL, "
+                    "PRIMARY KEY (namespace, key))"
+                )
+                self._db.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (namespace, accessed)")
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Disk cache '{disk_path}' unavailable, using memory only: {e}")
+                self._db = None
+
+        _registry[name] = self
+
+    def _expired(self, created):
+        return self.ttl is not None and time.time() - created > self.ttl
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created, value = entry
+                if not self._expired(created):
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    self.memory_hits += 1
+                    return value
+                del self._memory[key]
+
+            value = self._disk_get(key)
+            if value is not _MISSING:
+                self.hits += 1
+                self.disk_hits += 1
+                return value
+
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, value)
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?)",
+                        (self.name, key, json.dumps(value), now, now),
+                    )
+                    self._db.execute(
+                        "DELETE FROM cache WHERE namespace = ? AND key IN ("
+                        "SELECT key FROM cache WHERE namespace = ? ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                        (self.name, self.name, self.disk_max_entries),
+                    )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    logger.error(f"Failed to write disk cache entry: {e}")
+
+    def get_or_compute(self, key, compute, cacheable=lambda value: True):
+        """
+        Returns the cached value for `key`, or calls `compute()` and stores its
+        result when `cacheable(result)` holds. Miss latency is tracked so the
+        stats can estimate the time saved by hits.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            logger.info(f"[{self.name}] cache hit")
+            return value
+
+        started = time.perf_counter()
+        value = compute()
+        with self._lock:
+            self.miss_seconds += time.perf_counter() - started
+        if cacheable(value):
+            self.set(key, value)
+        return value
+
+    def _remember(self, key, created, value):
+        self._memory[key] = (created, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_get(self, key):
+        if self._db is None:
+            return _MISSING
+        try:
+            row = self._db.execute(
+                "SELECT value, created FROM cache WHERE namespace = ? AND key = ?",
+                (self.name, key),
+            ).fetchone()
+            if row is None:
+                return _MISSING
+            value, created = json.loads(row[0]), row[1]
+            if self._expired(created):
+                self._db.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (self.name, key))
+                self._db.commit()
+                return _MISSING
+            self._db.execute(
+                "UPDATE cache SET accessed = ? WHERE namespace = ? AND key = ?",
+                (time.time(), self.name, key),
+            )
+            self._db.commit()
+            self._remember(key, created, value)
+            return value
+        except (sqlite3.Error, ValueError) as e:
+            logger.error(f"Failed to read disk cache entry: {e}")
+            return _MISSING
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM cache WHERE namespace = ?", (self.name,))
+                self._db.commit()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        avg_miss = self.miss_seconds / self.misses if self.misses else 0.0
+        return {
+            "hits": self.hits,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": len(self._memory),
+            "avg_miss_seconds": round(avg_miss, 3),
+            "estimated_seconds_saved": round(self.hits * avg_miss, 3),
+        }
+
+
+def cache_stats():
+    """Hit/miss counters for every cache created in this process, keyed by cache name."""
+    return {name: cache.stats() for name, cache in _registry.items()}
@@ -0,0 +1,46 @@
+import os
+import streamlit as st
+from streamlit_chat import message
+
+# Number of most recent messages rendered as live chat bubbles on every rerun
+CHAT_WINDOW = int(os.getenv("CHAT_WINDOW", "8"))
+
+
+def _page_markdown(history, page, window):
+    """
+    Markdown for one page of older messages. Pages before the live window never change
+    (the history is append-only), so each is built once and kept in session state.
+    """
+    cache = st.session_state.setdefault("chat_page_cache", {})
+    key = (page, window)
+    if key not in cache:
+        lines = []
+        for msg, is_user in history[page * window:(page + 1) * window]:
+            speaker = "🧑 **You**" if is_user else "🤖 **Bot**"
+            lines.append(f"{speaker}: {msg}")
+        cache[key] = "\n\n".join(lines)
+    return cache[key]
+
+
+def render_chat(history, window=CHAT_WINDOW):
+    """
+    Renders a history of (message, is_user) pairs with constant work per rerun: only the last `window` messages are
+    live bubbles; older turns are collapsed into fixed pages that are rendered from
+    cached markdown, and only when the candidate asks to see them.
+    """
+    live_start = max(0, len(history) - window)
+    # Older messages are paged in whole pages so their content is stable between reruns
+    full_pages = live_start // window
+    live_start = full_pages * window
+
+    if full_pages:
+        show = st.toggle(f"Show earlier messages ({live_start})", key="chat_show_earlier")
+        if show:
+            page = st.number_input("Page", min_value=1, max_value=full_pages, value=full_pages,
+                                   key="chat_page") - 1
+            st.markdown(_page_markdown(history, page, window))
+            st.divider()
+
+    for i in range(live_start, len(history)):
+        msg, is_user = history[i]
+        message(msg, is_user=is_user, key=f"chat_{i}")
@@ -1,69 +1,111 @@
-import os
-from groq import Groq
-from dotenv import load_dotenv
 import logging
+from llm import get_gateway
+from cache import ResponseCache, make_key
+from domain_classifier import get_domain_classifier, DOMAIN_CONFIDENCE
+from prompts import PromptTemplate
+from routing import get_router
 
-load_dotenv()
-
-#----logging setup----------
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
-#---------groq api key---------------
-try:
-    groq_api_key = os.getenv("GROQ_API_KEY")
-    if not groq_api_key:
-        raise ValueError("GROQ_API_KEY is not set in the environment variables.")
-    client = Groq(api_key=groq_api_key)
-    logger.info("Groq client initialized successfully.")
-except Exception as e:
-    logger.error(f"[Initialization Error] Failed to create Groq client: {e}")
-    client = None
+#---------shared llm gateway---------------
+def get_client():
+    """
+    Returns the shared LLM gateway, or None when it cannot be created (e.g. no API key).
+    Built on first use rather than at import, so importing this module stays cheap.
+    """
+    try:
+        return get_gateway()
+    except Exception as e:
+        logger.error(f"[Initialization Error] Failed to create LLM gateway: {e}")
+        return None
+
+# Bump when the system prompt changes so stale cached titles are not reused.
+DOMAIN_PROMPT_VERSION = "v2"
+domain_cache = ResponseCache("identify_domain")
+INVALID_JD = "Invalid job description"
+
+DOMAIN_PROMPT = PromptTemplate(
+    "identify_domain", DOMAIN_PROMPT_VERSION,
+    instructions="as a job title classifier, identify the most accurate and specific job title or domain "
+                 "from the given job description. "
+                 "If the input is not a valid job description, respond strictly with: Invalid job description. "
+                 "Do NOT explain or apologize. Just return the job title or 'Invalid job description'.",
+    body="{job_description}",
+)
+
+# A reply longer than this is an explanation rather than a job title
+DOMAIN_MAX_TITLE_WORDS = 8
+
+def _title_escalation(response):
+    """Small-model replies worth a second opinion: empty, rambling, or rejecting the input."""
+    if not response:
+        return "empty"
+    if len(response.split()) > DOMAIN_MAX_TITLE_WORDS:
+        return "not a title"
+    if INVALID_JD.lower() in response.lower():
+        return "invalid"
+    return None
+
+def request_llm_domain(job_description, client=None):
+    """
+    Asks the LLM for the job title of `job_description`, bypassing the local classifier and cache.
+    The small model answers unless its reply does not look like a job title.
+    """
+    logger.info("Sending request to LLM gateway...")
+    client = client or get_gateway()
+
+    def ask(model):
+        response = ""
+        for content in client.stream(messages=DOMAIN_PROMPT.messages(job_description=job_description), model=model):
+            response += content
+            logger.debug(f"Received chunk: {content}")
+        return response.strip()
+
+    return get_router().route("identify_domain", ask, _title_escalation, lambda response: response)
 
 #---------domain identification function------
-def identify_domain(job_description, client):
+def identify_domain(job_description, client, refresh=False):
     """
     Identifies the specific job title or domain from a given job description.
-    Uses LLaMA3-70B through Groq API.
+    Confident matches come from the local classifier in milliseconds; the rest go
+    through the shared LLM gateway (small model first, see routing.py), and its
+    answers become new classifier examples. `refresh` (the candidate asked for a
+    recheck) skips the classifier and cache and overwrites both with the new answer.
     """
     logger.info("Starting domain identification.")
     
     if not client:
-        logger.error("Groq client is not initialized.")
+        logger.error("LLM gateway is not initialized.")
         return "Client initialization failed"
 
     if not isinstance(job_description, str) or not job_description.strip():
         logger.warning("Invalid job description input received.")
-        return "Invalid job description"
+        return INVALID_JD
 
-    system_prompt = (
-        "You are a job title classification assistant. "
-        "Identify the most accurate and specific job title or domain "
-        "from the given job description. "
-        "If the input is not a valid job description, respond strictly with: Invalid job description. "
-        "Do NOT explain or apologize. Just return the job title or 'Invalid job description'."
-    )
+    classifier = get_domain_classifier()
+    if classifier is not None and not refresh:
+        try:
+            label, confidence = classifier.predict(job_description)
+            if label and confidence >= DOMAIN_CONFIDENCE:
+                logger.info(f"Domain identified locally: '{label}' (confidence {confidence})")
+                return label
+            logger.info(f"Local classifier not confident ({confidence}), asking the LLM.")
+        except Exception as e:
+            logger.error(f"Local domain classifier failed: {e}")
 
     try:
-        logger.info("Sending request to Groq LLM API...")
-        stream = client.chat.completions.create(
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": job_description}
-            ],
-            model="llama3-70b-8192",
-            stream=True
-        )
-
-        response = ""
-        for chunk in stream:
-            content = chunk.choices[0].delta.content
-            if content:
-                response += content
-                logger.debug(f"Received chunk: {content}")
-
-        response = response.strip()
+        key = make_key(job_description, get_router().key, DOMAIN_PROMPT_VERSION)
+        if refresh:
+            response = request_llm_domain(job_description, client)
+            if response:
+                domain_cache.set(key, response)
+        else:
+            response = domain_cache.get_or_compute(
+                key, lambda: request_llm_domain(job_description, client), cacheable=bool
+            )
         logger.info(f"Domain identification completed: '{response}'")
+        if classifier is not None and response and INVALID_JD.lower() not in response.lower():
+            classifier.add_example(job_description, response, replace=refresh)
         return response
 
     except Exception as e:
@@ -0,0 +1,233 @@
+import os
+import re
+import math
+import time
+import random
+import sqlite3
+import logging
+import argparse
+import threading
+from collections import Counter, defaultdict
+from telemetry import configure_logging
+
+logger = logging.getLogger(__name__)
+
+#---------classifier settings---------
+DOMAIN_CLASSIFIER_DB = os.getenv("DOMAIN_CLASSIFIER_DB", "domain_classifier.sqlite")
+# Cosine similarity to the nearest known job description needed to skip the LLM
+DOMAIN_CONFIDENCE = float(os.getenv("DOMAIN_CONFIDENCE", "0.55"))
+SEED_PDF = "Job Descriptions.pdf"
+NEIGHBOURS = 3
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or our the their this to we who will with "
+    "you your you'll we're role team join looking seeking hiring candidate ideal experience strong work".split()
+)
+
+
+def tokenize(text):
+    """Lower-cased word unigrams and bigrams, without stopwords."""
+    words = [w for w in re.findall(r"[a-z0-9+#]+", text.lower()) if w not in _STOPWORDS]
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def same_domain(a, b):
+    return " ".join(a.lower().split()) == " ".join(b.lower().split())
+
+
+class DomainClassifier:
+    """
+    TF-IDF nearest-neighbour classifier over job descriptions with known titles.
+    Examples are seeded from the bundled job description PDF and grow with every
+    title the LLM returns, so repeat and near-repeat JDs are answered locally.
+    Vectors are sparse dicts searched through an inverted index; the index is
+    rebuilt lazily after new examples arrive and swapped in whole, so lookups never
+    see a half-built one.
+    """
+
+    def __init__(self, path=DOMAIN_CLASSIFIER_DB):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS examples ("
+            "id INTEGER PRIMARY KEY, text TEXT NOT NULL UNIQUE, label TEXT NOT NULL, source TEXT, created REAL)"
+        )
+        self._db.commit()
+        self.examples = [tuple(row) for row in self._db.execute("SELECT text, label FROM examples ORDER BY id")]
+        self._dirty = True
+        self._index = ({}, {}, [])  # (idf, postings, labels)
+
+    def __len__(self):
+        return len(self.examples)
+
+    def add_examples(self, examples, source="llm", replace=False):
+        """
+        Adds (job_description, title) pairs. Exact duplicate descriptions are ignored,
+        unless `replace` is set, in which case their stored title is overwritten.
+        """
+        rows = [(text.strip(), label.strip(), source, time.time()) for text, label in examples
+                if text and text.strip() and label and label.strip()]
+        conflict = ("ON CONFLICT(text) DO UPDATE SET label = excluded.label, source = excluded.source, "
+                    "created = excluded.created") if replace else "ON CONFLICT(text) DO NOTHING"
+        with self._lock:
+            before = self._db.total_changes
+            self._db.executemany(f"INSERT INTO examples (text, label, source, created) VALUES (?, ?, ?, ?) {conflict}", rows)
+            self._db.commit()
+            added = self._db.total_changes - before
+            if added:
+                self.examples = [tuple(row) for row in self._db.execute("SELECT text, label FROM examples ORDER BY id")]
+                self._dirty = True
+        return added
+
+    def add_example(self, text, label, source="llm", replace=False):
+        return self.add_examples([(text, label)], source, replace)
+
+    #---------index---------
+    @staticmethod
+    def _vector(tokens, idf):
+        counts = Counter(t for t in tokens if t in idf)
+        vector = {t: (1 + math.log(c)) * idf[t] for t, c in counts.items()}
+        norm = math.sqrt(sum(w * w for w in vector.values()))
+        return {t: w / norm for t, w in vector.items()} if norm else {}
+
+    @classmethod
+    def _fit(cls, examples):
+        """Builds the (idf, postings, labels) index of `examples` without touching any instance state."""
+        documents = [tokenize(text) for text, _ in examples]
+        df = Counter(t for tokens in documents for t in set(tokens))
+        n = len(documents)
+        idf = {t: math.log((1 + n) / (1 + d)) + 1 for t, d in df.items()}
+        postings = defaultdict(list)
+        for i, tokens in enumerate(documents):
+            for t, w in cls._vector(tokens, idf).items():
+                postings[t].append((i, w))
+        return idf, dict(postings), [label for _, label in examples]
+
+    def _ensure_index(self):
+        """The current index, rebuilt first if examples were added since the last fit."""
+        with self._lock:
+            if self._dirty:
+                self._index = self._fit(self.examples)
+                self._dirty = False
+            return self._index
+
+    @classmethod
+    def _predict(cls, text, index):
+        idf, postings, labels = index
+        scores = defaultdict(float)
+        for t, w in cls._vector(tokenize(text), idf).items():
+            for i, weight in postings.get(t, ()):
+                scores[i] += w * weight
+        if not scores:
+            return None, 0.0
+        # Similarity-weighted vote among the nearest examples; confidence is the best match's similarity
+        nearest = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:NEIGHBOURS]
+        votes = defaultdict(float)
+        for i, score in nearest:
+            votes[labels[i]] += score
+        label = max(votes, key=votes.get)
+        confidence = max(score for i, score in nearest if labels[i] == label)
+        return label, round(confidence, 4)
+
+    def predict(self, text):
+        """Returns (title, confidence) for a job description; (None, 0.0) when nothing is similar."""
+        return self._predict(text, self._ensure_index())
+
+    #---------held-out evaluation---------
+    def evaluate(self, holdout=0.2, thresholds=(0.3, 0.4, 0.5, 0.55, 0.6, 0.7, 0.8), labeller=None, seed=0):
+        """
+        Fits on a random split and scores the held-out examples. The reference title is the
+        stored one, or `labeller(text)` (e.g. a live LLM call) when given. For each threshold
+        reports coverage (share answered locally) and precision (share of those matching).
+        """
+        examples = list(self.examples)
+        random.Random(seed).shuffle(examples)
+        cut = max(1, int(len(examples) * holdout))
+        held_out, train = examples[:cut], examples[cut:]
+        if not train:
+            raise ValueError("Not enough examples to evaluate.")
+
+        index = self._fit(train)
+        results = []
+        for text, label in held_out:
+            reference = labeller(text) if labeller else label
+            predicted, confidence = self._predict(text, index)
+            results.append((confidence, predicted is not None and same_domain(predicted, reference)))
+
+        report = []
+        for threshold in thresholds:
+            answered = [correct for confidence, correct in results if confidence >= threshold]
+            report.append({
+                "threshold": threshold,
+                "coverage": round(len(answered) / len(results), 3),
+                "precision": round(sum(answered) / len(answered), 3) if answered else None,
+            })
+        return {"train": len(train), "held_out": len(held_out), "thresholds": report}
+
+
+def parse_job_descriptions(path=SEED_PDF):
+    """Extracts (description, title) pairs from the numbered job description PDF."""
+    from pypdf import PdfReader
+
+    text = " ".join(" ".join(page.extract_text() or "" for page in PdfReader(path).pages).split())
+    entries = re.finditer(
+        r"(?:^|\s)\d{1,2}\.\s+(?P<title>.+?)\s+(?P<body>(?:We|We’re|We're|Our|Join|As)\b.+?)(?=\s\d{1,2}\.\s+[A-Z]|$)",
+        text,
+    )
+    return [(f"{m.group('title')} {m.group('body')}", m.group("title")) for m in entries]
+
+
+_classifier = None
+_classifier_lock = threading.Lock()
+
+
+def get_domain_classifier():
+    """
+    Returns the process-wide classifier, seeding it from the job description PDF on first
+    use. Returns None when the example store cannot be opened.
+    """
+    global _classifier
+    if _classifier is None:
+        with _classifier_lock:
+            if _classifier is None:
+                try:
+                    classifier = DomainClassifier()
+                except sqlite3.Error as e:
+                    logger.error(f"Domain classifier store '{DOMAIN_CLASSIFIER_DB}' unavailable: {e}")
+                    return None
+                if not len(classifier) and os.path.exists(SEED_PDF):
+                    try:
+                        added = classifier.add_examples(parse_job_descriptions(SEED_PDF), source="seed")
+                        logger.info(f"Seeded domain classifier with {added} job descriptions.")
+                    except Exception as e:
+                        logger.warning(f"Could not seed domain classifier from '{SEED_PDF}': {e}")
+                _classifier = classifier
+    return _classifier
+
+
+if __name__ == "__main__":
+    configure_logging()
+    parser = argparse.ArgumentParser(description="Local job-domain classifier maintenance.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    seed = commands.add_parser("seed", help="Add the job descriptions of a numbered PDF as examples")
+    seed.add_argument("pdf", nargs="?", default=SEED_PDF)
+    evaluate = commands.add_parser("evaluate", help="Precision and coverage per threshold on a held-out split")
+    evaluate.add_argument("--holdout", type=float, default=0.2)
+    evaluate.add_argument("--against-llm", action="store_true",
+                          help="Use live LLM titles as the reference instead of the stored labels")
+    args = parser.parse_args()
+
+    classifier = get_domain_classifier()
+    if args.command == "seed":
+        print(f"Added {classifier.add_examples(parse_job_descriptions(args.pdf), source='seed')} example(s).")
+    else:
+        labeller = None
+        if args.against_llm:
+            from domain import request_llm_domain
+            labeller = request_llm_domain
+        from scheduler import llm_priority, BATCH
+        with llm_priority(BATCH):
+            report = classifier.evaluate(args.holdout, labeller=labeller)
+        print(f"train={report['train']} held_out={report['held_out']}")
+        for row in report["thresholds"]:
+            print(f"threshold={row['threshold']:.2f} coverage={row['coverage']:.3f} precision={row['precision']}")
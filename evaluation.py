@@ -0,0 +1,172 @@
+import os
+import time
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait
+from voice import transcribe_audio
+from hr import evaluate_hr_answer
+from technical import evaluate_technical_answer
+from transcription import warmup as warm_up_transcription
+from scheduler import llm_priority, BACKGROUND
+
+logger = logging.getLogger(__name__)
+
+EVAL_WORKERS = int(os.getenv("EVAL_WORKERS", "2"))
+PREFETCH_WORKERS = int(os.getenv("PREFETCH_WORKERS", "2"))
+
+
+#---------jobs run off the request path---------
+def transcribe_and_evaluate_hr(question, audio, transcript=None):
+    """
+    Transcribes an HR answer, given as a file path or in-memory array (unless a streaming transcript is passed in) and grades it.
+    Returns (transcript, score, feedback, confidence, latency_seconds).
+    """
+    started = time.perf_counter()
+    if transcript is None:
+        transcript = transcribe_audio(audio)
+    score, feedback, confidence = evaluate_hr_answer(question, transcript)
+    return transcript, score, feedback, confidence, time.perf_counter() - started
+
+
+def transcribe_and_evaluate_technical(question, audio, domain, transcript=None):
+    """
+    Transcribes a technical answer, given as a file path or in-memory array (unless a streaming transcript is passed in) and grades it.
+    Returns (transcript, score, feedback, confidence, latency_seconds); confidence is always None.
+    """
+    started = time.perf_counter()
+    if transcript is None:
+        transcript = transcribe_audio(audio)
+    score, feedback = evaluate_technical_answer(question, transcript, domain)
+    return transcript, score, feedback, None, time.perf_counter() - started
+
+
+class EvaluationPipeline:
+    """
+    Per-session background worker for transcribe -> evaluate jobs.
+    Jobs are keyed by an id such as ("hr", 0); finished results are handed back by
+    collect() so the UI thread can move them into session state on its next run.
+    """
+
+    def __init__(self, max_workers=EVAL_WORKERS):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="evaluation")
+        self.jobs = {}
+
+    def submit(self, job_id, fn, *args):
+        logger.info(f"Queued background evaluation job {job_id}.")
+        started = time.perf_counter()
+        # Carry the caller's context so the job's spans count towards its session
+        future = self.executor.submit(contextvars.copy_context().run, fn, *args)
+        future.add_done_callback(
+            lambda f: logger.info(f"Job {job_id} finished in {time.perf_counter() - started:.2f}s.")
+        )
+        self.jobs[job_id] = future
+        return future
+
+    def pending(self):
+        return sum(1 for future in self.jobs.values() if not future.done())
+
+    def collect(self):
+        """Returns {job_id: result} for every finished job and forgets them."""
+        done = {}
+        for job_id, future in list(self.jobs.items()):
+            if future.done():
+                del self.jobs[job_id]
+                try:
+                    done[job_id] = future.result()
+                except Exception as e:
+                    logger.error(f"Background job {job_id} failed: {e}")
+                    done[job_id] = e
+        return done
+
+    def wait_all(self, timeout=None):
+        """Blocks until the outstanding jobs finish (or `timeout` passes), then collects them."""
+        outstanding = [future for future in self.jobs.values() if not future.done()]
+        if outstanding:
+            logger.info(f"Waiting on {len(outstanding)} outstanding evaluation job(s).")
+            wait(outstanding, timeout=timeout)
+        return self.collect()
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _run_in_background(fn, *args):
+    with llm_priority(BACKGROUND):
+        return fn(*args)
+
+
+class PrefetchScheduler:
+    """
+    Starts work the interview will need later (e.g. the technical question set once the
+    domain is confirmed) on background threads. take() hands the result over, waiting
+    only for whatever is still running; cancel() drops work that is no longer wanted.
+    stats() reports how much latency was hidden from the candidate.
+    LLM calls made by prefetch jobs queue behind interactive ones.
+    """
+
+    def __init__(self, max_workers=PREFETCH_WORKERS):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self.jobs = {}  # key -> (future, submitted_at)
+        self.timings = {"scheduled": 0, "hits": 0, "misses": 0, "discarded": 0,
+                        "hidden_seconds": 0.0, "waited_seconds": 0.0}
+
+    def schedule(self, key, fn, *args):
+        """Starts `fn(*args)` under `key` unless that key is already in flight."""
+        if key in self.jobs:
+            return self.jobs[key][0]
+        logger.info(f"Prefetching {key}.")
+        submitted = time.perf_counter()
+        future = self.executor.submit(contextvars.copy_context().run, _run_in_background, fn, *args)
+        future.add_done_callback(lambda f: setattr(f, "finished_at", time.perf_counter()))
+        self.jobs[key] = (future, submitted)
+        self.timings["scheduled"] += 1
+        return future
+
+    def take(self, key, timeout=None):
+        """
+        Returns (True, result) for prefetched work, blocking until it finishes, or
+        (False, None) when nothing was scheduled under `key` or the work failed.
+        """
+        if key not in self.jobs:
+            self.timings["misses"] += 1
+            return False, None
+        future, submitted = self.jobs.pop(key)
+        taken = time.perf_counter()
+        try:
+            result = future.result(timeout=timeout)
+        except Exception as e:
+            logger.error(f"Prefetch {key} failed, falling back to a direct call: {e}")
+            self.timings["misses"] += 1
+            return False, None
+        finished = getattr(future, "finished_at", time.perf_counter())
+        hidden = max(0.0, min(finished, taken) - submitted)
+        waited = max(0.0, finished - taken)
+        self.timings["hits"] += 1
+        self.timings["hidden_seconds"] += hidden
+        self.timings["waited_seconds"] += waited
+        logger.info(f"Prefetch {key} used: {hidden:.2f}s hidden, {waited:.2f}s waited.")
+        return True, result
+
+    def cancel(self, key=None):
+        """Drops the work under `key` (all work when None); running jobs finish but are ignored."""
+        for job_key in [key] if key is not None else list(self.jobs):
+            job = self.jobs.pop(job_key, None)
+            if job is None:
+                continue
+            job[0].cancel()
+            self.timings["discarded"] += 1
+            logger.info(f"Discarded prefetch {job_key}.")
+
+    def stats(self):
+        return dict(self.timings, in_flight=sum(1 for future, _ in self.jobs.values() if not future.done()))
+
+    def shutdown(self):
+        self.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def warm_up_evaluation():
+    """Loads the transcription engine ahead of the first recorded answer."""
+    started = time.perf_counter()
+    warm_up_transcription()
+    return time.perf_counter() - started
@@ -1,15 +1,11 @@
-import os
+import time
 import random
 import logging
-import re
-from groq import Groq
-from dotenv import load_dotenv
-
-#---------logging----------
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
-
-load_dotenv()
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+from llm import get_gateway
+from parsing import Schema, Field, complete_structured, finish_structured, parse_stats
+from prompts import PromptTemplate, normalize_transcript
+from routing import get_router
+from question_bank import get_question_bank, reserved_domain
 
 #-----------HR quetsions-------------------
 HR_QUESTIONS = [
@@ -25,54 +21,93 @@ HR_QUESTIONS = [
     "How do you handle stress or pressure?"
 ]
 
+# Skill each HR question probes, used for the per-skill breakdown in the report
+HR_SKILLS = {
+    "Tell me about yourself.": "Self-presentation",
+    "Why do you want this job?": "Motivation",
+    "What are your strengths and weaknesses?": "Self-awareness",
+    "Where do you see yourself in 5 years?": "Career goals",
+    "Why should we hire you?": "Self-presentation",
+    "Tell me about a challenge you faced and how you overcame it.": "Problem solving",
+    "What are your salary expectations?": "Negotiation",
+    "Do you prefer working independently or in a team?": "Teamwork",
+    "What motivates you?": "Motivation",
+    "How do you handle stress or pressure?": "Resilience"
+}
+
+# "@hr", so a technical domain called "HR" gets its own bank
+HR_BANK_DOMAIN = reserved_domain("hr")
+HR_QUESTIONS_VERSION = "1"  # bump when HR_QUESTIONS changes so the bank is seeded again
+
 #-----to generate hr questins-------------
 def generate_hr_questions():
-    """Returns 5 randomly selected HR questions."""
-    logging.info("Selecting 5 random HR questions from the list.")
-    questions = random.sample(HR_QUESTIONS, 5)
+    """
+    Returns 5 randomly selected HR questions from the question bank's HR domain,
+    which is seeded with HR_QUESTIONS and can be extended offline.
+    """
+    logging.info("Selecting 5 random HR questions from the question bank.")
+    try:
+        bank = get_question_bank()
+        bank.seed(HR_BANK_DOMAIN, HR_QUESTIONS, HR_QUESTIONS_VERSION)
+        questions = bank.sample(HR_BANK_DOMAIN, 5, difficulties=("easy", "medium", "hard"))
+    except Exception as e:
+        logging.error(f"Question bank unavailable, using the built-in HR list: {e}")
+        questions = []
+    if len(questions) < 5:
+        questions = random.sample(HR_QUESTIONS, 5)
     logging.debug(f"Selected questions: {questions}")
     return questions
 
+# Structured reply of the HR evaluator; bump the version whenever the prompt changes
+HR_EVAL_SCHEMA = Schema("hr_evaluation", version="v3", fields=[
+    Field("score", int, "<integer score out of 10>", minimum=0, maximum=10, default=0),
+    Field("feedback", str, '"<feedback on structure, clarity, and content>"', default="No feedback provided."),
+    Field("confidence", str, '"<Low, Medium or High, based on the tone of the answer>"',
+          choices=("Low", "Medium", "High"), default="Low", label="Confidence Level"),
+])
+
+HR_EVAL_PROMPT = PromptTemplate(
+    "hr_evaluation", HR_EVAL_SCHEMA.version,
+    instructions=f"as an expert HR evaluator, evaluate the answer to the HR question. "
+                 f"{HR_EVAL_SCHEMA.instructions()}",
+    body="Question: {question}\nAnswer: {answer}",
+)
+
+HR_ROUND_PROMPT = PromptTemplate(
+    "hr_round_evaluation", HR_EVAL_SCHEMA.version,
+    instructions=f"as an expert HR evaluator, evaluate each numbered answer to an HR question. "
+                 f"Return only a JSON array with one object per item, of the form "
+                 f"{HR_EVAL_SCHEMA.template(extra={'item': '<item number>'})}, and nothing else.",
+    body="{items}",
+)
+
+def _hr_messages(question, answer):
+    return HR_EVAL_PROMPT.messages(question=question, answer=normalize_transcript(answer))
+
+def _grade_hr(question, answer, model):
+    fields, result = complete_structured(get_gateway(), _hr_messages(question, answer), HR_EVAL_SCHEMA, model=model)
+    logging.debug(f"Raw evaluation result ({model}): {result}")
+    return fields
+
 #-to evaluate hr questions------------
-def evaluate_hr_answer(question, answer):
+def evaluate_hr_answer(question, answer, raise_errors=False):
     """
     Uses LLM to evaluate the HR answer.
-    Returns a score (0-10), feedback, and confidence level.
+    Returns a score (0-10), feedback, and confidence level. A failed evaluation
+    returns a zero score with an error message, or raises when `raise_errors` is set.
+    Fields missing from the reply are re-asked for individually rather than defaulted.
+    Empty answers are scored without a call; the rest go to the small model first and
+    borderline results are re-graded by the large one (see routing.py).
     """
     logging.info(f"Assessing HR answer for question: '{question}'")
     logging.debug(f"Candidate's answer: {answer}")
 
-    prompt = (
-        f"You are an HR evaluator assistant.\n"
-        f"Evaluate the following answer to the HR question.\n\n"
-        f"Question: {question}\n"
-        f"Answer: {answer}\n\n"
-        f"Return the result in this format strictly:\n"
-        f"Score: <score out of 10>\n"
-        f"Feedback: <feedback on structure, clarity, and content>\n"
-        f"Confidence Level: <Low, Medium, High> based on the tone of the answer.\n"
-        f"Don't include anything else."
-    )
-
     try:
-        response = client.chat.completions.create(
-            model="llama3-70b-8192",
-            messages=[
-                {"role": "system", "content": "You are an expert HR evaluator."},
-                {"role": "user", "content": prompt}
-            ]
+        fields = get_router().evaluate(
+            "hr_evaluation", HR_EVAL_SCHEMA, answer, lambda model: _grade_hr(question, answer, model)
         )
-        result = response.choices[0].message.content.strip()
-        logging.debug(f"Raw evaluation result: {result}")
 
-        score_match = re.search(r"^Score:\s*(\d+)", result, re.MULTILINE)
-        feedback_match = re.search(r"^Feedback:\s*(.+)", result, re.MULTILINE)
-        confidence_match = re.search(r"^Confidence Level:\s*(Low|Medium|High)", result, re.IGNORECASE | re.MULTILINE)
-
-        score = int(score_match.group(1)) if score_match else 0
-        score = max(0, min(10, score))  # Clamp score to 0–10
-        feedback = feedback_match.group(1).strip() if feedback_match else "No feedback provided."
-        confidence = confidence_match.group(1).capitalize() if confidence_match else "Low"
+        score, feedback, confidence = fields["score"], fields["feedback"], fields["confidence"]
 
         logging.info(f"HR answer assessed: Score={score}, Confidence={confidence}")
         logging.debug(f"Feedback: {feedback}")
@@ -81,4 +116,100 @@ def evaluate_hr_answer(question, answer):
 
     except Exception as e:
         logging.error(f"Error evaluating HR answer: {e}")
+        if raise_errors:
+            raise
         return 0, "Error during evaluation.", "Low"
+
+#-streaming variant for live feedback------------
+def stream_evaluate_hr_answer(question, answer):
+    """
+    Streaming variant of evaluate_hr_answer.
+    Yields (text, fields) as tokens arrive, where `fields` gains score/feedback/confidence
+    as soon as each JSON value is complete. The last item carries the final values, with
+    the same validation and re-asking as evaluate_hr_answer.
+    """
+    logging.info(f"Streaming HR assessment for question: '{question}'")
+    router = get_router()
+    fields = router.local_grade("hr_evaluation", HR_EVAL_SCHEMA, answer)
+    if fields is not None:
+        yield "", fields
+        return
+
+    parser = HR_EVAL_SCHEMA.stream_parser()
+    messages = _hr_messages(question, answer)
+    text = ""
+    started = time.perf_counter()
+
+    try:
+        gateway = get_gateway()
+        for chunk in gateway.stream(model=router.first_model, messages=messages):
+            text += chunk
+            yield text, parser.feed(chunk)
+        parser.close()
+        fields = router.review("hr_evaluation", HR_EVAL_SCHEMA,
+                               lambda: finish_structured(gateway, messages, text, HR_EVAL_SCHEMA,
+                                                         model=router.first_model),
+                               lambda model: _grade_hr(question, answer, model), started)
+    except Exception as e:
+        logging.error(f"Error evaluating HR answer: {e}")
+        yield text, {"score": 0, "feedback": "Error during evaluation.", "confidence": "Low"}
+        return
+
+    logging.info(f"HR answer assessed: Score={fields['score']}, Confidence={fields['confidence']}")
+    yield text, fields
+
+#-to evaluate a whole hr round in one call------------
+def evaluate_hr_round(qa_pairs):
+    """
+    Evaluates every (question, answer) pair of an HR round with a single LLM request.
+    Returns a list of (score, feedback, confidence) in the same order as `qa_pairs`.
+    Items the model's reply can't be parsed for are re-evaluated one by one.
+    Empty answers are scored locally and left out of the batch, which goes to the small
+    model; borderline items are then re-graded one by one on the large model.
+    """
+    if not qa_pairs:
+        return []
+
+    logging.info(f"Assessing {len(qa_pairs)} HR answers in one batch.")
+
+    router = get_router()
+    parsed = {}
+    for i, (question, answer) in enumerate(qa_pairs):
+        fields = router.local_grade("hr_round_evaluation", HR_EVAL_SCHEMA, answer)
+        if fields is not None:
+            parsed[i] = (fields["score"], fields["feedback"], fields["confidence"])
+    batch = [i for i in range(len(qa_pairs)) if i not in parsed]
+
+    items = "\n\n".join(
+        f"Item {number}\nQuestion: {qa_pairs[i][0]}\nAnswer: {normalize_transcript(qa_pairs[i][1])}"
+        for number, i in enumerate(batch, start=1)
+    )
+
+    started = time.perf_counter()
+    try:
+        if batch:
+            result = get_gateway().complete(model=router.first_model, messages=HR_ROUND_PROMPT.messages(items=items))
+            logging.debug(f"Raw batch evaluation result: {result}")
+
+            for number, item in HR_EVAL_SCHEMA.parse_many(result).items():
+                if 1 <= number <= len(batch) and not item.missing:
+                    fields = HR_EVAL_SCHEMA.with_defaults(item.values)
+                    i = batch[number - 1]
+                    question, answer = qa_pairs[i]
+                    fields = router.review("hr_round_evaluation", HR_EVAL_SCHEMA, lambda: fields,
+                                           lambda model: _grade_hr(question, answer, model), started)
+                    parsed[i] = (fields["score"], fields["feedback"], fields["confidence"])
+                    parse_stats.record(HR_EVAL_SCHEMA, "repaired" if item.repaired else "clean")
+
+    except Exception as e:
+        logging.error(f"Error evaluating HR round in batch: {e}")
+
+    results = []
+    for i, (question, answer) in enumerate(qa_pairs):
+        if i not in parsed:
+            logging.warning(f"Batch result for item {i + 1} missing; evaluating it on its own.")
+            parsed[i] = evaluate_hr_answer(question, answer)
+        results.append(parsed[i])
+
+    logging.info(f"HR round assessed: Scores={[r[0] for r in results]}")
+    return results
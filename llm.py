@@ -0,0 +1,352 @@
+import os
+import re
+import json
+import time
+import random
+import hashlib
+import logging
+import threading
+from concurrent.futures import Future
+from dotenv import load_dotenv
+from scheduler import (LLMScheduler, SchedulerOverloaded, estimate_tokens, current_priority,
+                       LLM_RESERVED_COMPLETION_TOKENS, PRIORITY_NAMES)
+from telemetry import span, traced, histogram, register_collector
+from prompts import count_tokens, record_usage
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "llama3-70b-8192"
+
+#---------gateway settings (overridable through the environment)---------
+LLM_BACKEND = os.getenv("LLM_BACKEND", "groq")
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "8"))
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "20"))
+LLM_KEEPALIVE = float(os.getenv("LLM_KEEPALIVE", "30"))
+LLM_FAKE_LATENCY = float(os.getenv("LLM_FAKE_LATENCY", "0"))
+
+# HTTP status codes worth another attempt; everything else is a caller error.
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+LLM_QUEUE_WAIT = histogram("llm_queue_wait_seconds", "Time LLM calls waited for admission", labels=("priority",))
+
+
+class LLMError(Exception):
+    """Raised when a completion could not be obtained after all retries."""
+
+
+#---------backends---------
+class GroqBackend:
+    """
+    Groq chat backend sharing one pooled HTTP client across every caller.
+    Retries are handled by the gateway, so the SDK's own retry loop is disabled.
+    """
+
+    def __init__(self, api_key=None, pool_size=LLM_POOL_SIZE, keepalive=LLM_KEEPALIVE,
+                 timeout=LLM_TIMEOUT, base_url=None):
+        import httpx
+        from groq import Groq
+
+        api_key = api_key or os.getenv("GROQ_API_KEY")
+        if not api_key:
+            raise ValueError("GROQ_API_KEY is not set in the environment variables.")
+
+        self.http_client = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=pool_size,
+                max_keepalive_connections=pool_size,
+                keepalive_expiry=keepalive,
+            ),
+            timeout=timeout,
+        )
+        self.client = Groq(
+            api_key=api_key,
+            base_url=base_url or os.getenv("GROQ_BASE_URL") or None,
+            http_client=self.http_client,
+            max_retries=0,
+            timeout=timeout,
+        )
+        self._usage = threading.local()
+
+    def last_usage(self):
+        """(prompt, completion) tokens the API reported for this thread's last call, if any."""
+        usage, self._usage.value = getattr(self._usage, "value", None), None
+        return usage
+
+    def _keep_usage(self, usage):
+        if usage is not None and getattr(usage, "prompt_tokens", None):
+            self._usage.value = (usage.prompt_tokens, usage.completion_tokens or 0)
+
+    def complete(self, messages, model, timeout, **kwargs):
+        response = self.client.chat.completions.create(
+            model=model, messages=messages, timeout=timeout, **kwargs
+        )
+        self._keep_usage(getattr(response, "usage", None))
+        return response.choices[0].message.content or ""
+
+    def stream(self, messages, model, timeout, **kwargs):
+        stream = self.client.chat.completions.create(
+            model=model, messages=messages, timeout=timeout, stream=True, **kwargs
+        )
+        for chunk in stream:
+            # Groq reports usage on the last chunk
+            self._keep_usage(getattr(getattr(chunk, "x_groq", None), "usage", None))
+            if not chunk.choices:
+                continue
+            content = chunk.choices[0].delta.content
+            if content:
+                yield content
+
+
+def fake_responder(messages, model):
+    """
+    Canned replies shaped like the real prompts expect, so the whole interview
+    flow can run offline.
+    """
+    prompt = "\n".join(message.get("content") or "" for message in messages)
+    if "numbered list" in prompt:
+        count = re.search(r"Generate (\d+)", prompt)
+        count = int(count.group(1)) if count else 10
+        return "\n".join(f"{i}. Sample technical question {i}?" for i in range(1, count + 1))
+    evaluation = {"score": 7, "feedback": "Clear answer with a reasonable structure."}
+    if '"confidence"' in prompt:
+        evaluation["confidence"] = "Medium"
+    items = re.findall(r"^Item (\d+)$", prompt, re.MULTILINE)
+    if items:
+        return json.dumps([dict(evaluation, item=int(i)) for i in items])
+    if '"score"' in prompt:
+        return json.dumps({name: value for name, value in evaluation.items() if f'"{name}"' in prompt})
+    return "Software Engineer"
+
+
+class FakeBackend:
+    """
+    Local stand-in for the LLM used for offline load tests.
+    `latency` is applied per call; `responder(messages, model)` builds the reply.
+    """
+
+    def __init__(self, latency=LLM_FAKE_LATENCY, responder=None):
+        self.latency = latency
+        self.responder = responder or fake_responder
+
+    def complete(self, messages, model, timeout, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        return self.responder(messages, model)
+
+    def stream(self, messages, model, timeout, **kwargs):
+        text = self.complete(messages, model, timeout, **kwargs)
+        for token in re.findall(r"\S+\s*|\s+", text):
+            yield token
+
+
+BACKENDS = {
+    "groq": GroqBackend,
+    "fake": FakeBackend,
+}
+
+
+#---------gateway---------
+def is_retryable(error):
+    """Connection problems and throttling/server errors are retried; bad requests are not."""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    if status is None:
+        return not isinstance(error, (ValueError, TypeError))
+    return status in RETRYABLE_STATUS
+
+
+def retry_after(error):
+    """Seconds the API asked us to wait (Retry-After header of a 429), if any."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class LLMGateway:
+    """
+    Single entry point for chat completions.
+    Adds per-call timeouts and retry with full-jitter exponential backoff on top of a backend.
+    Every attempt is admitted through the rate-limit `scheduler`, and identical
+    concurrent completions are coalesced into a single API call.
+    """
+
+    def __init__(self, backend, timeout=LLM_TIMEOUT, max_retries=LLM_MAX_RETRIES,
+                 backoff_base=LLM_BACKOFF_BASE, backoff_max=LLM_BACKOFF_MAX, scheduler=None):
+        self.backend = backend
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.scheduler = scheduler or LLMScheduler()
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+
+    def _backoff(self, attempt):
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _should_retry(self, error, attempt):
+        if attempt >= self.max_retries or not is_retryable(error):
+            return False
+        wait = retry_after(error)
+        if wait is not None:
+            # Throttled: hold the whole queue rather than letting every caller hit the limit again
+            self.scheduler.pause(wait)
+            return True
+        delay = self._backoff(attempt)
+        logger.warning(f"LLM call failed ({error}); retrying in {delay:.2f}s "
+                       f"[attempt {attempt + 1}/{self.max_retries}]")
+        time.sleep(delay)
+        return True
+
+    def _settle(self, reserved, messages, model, text):
+        """
+        Replaces the scheduler's reservation with the tokens actually used and books them
+        in the token ledger: the provider's count when the backend reports one, else an estimate.
+        """
+        usage = self.backend.last_usage() if hasattr(self.backend, "last_usage") else None
+        input_tokens, output_tokens = usage or (count_tokens(messages), estimate_tokens(text))
+        self.scheduler.settle(reserved, input_tokens + output_tokens)
+        record_usage(messages, model, input_tokens, output_tokens)
+
+    def _admit(self, reserved):
+        try:
+            waited = self.scheduler.acquire(reserved)
+            LLM_QUEUE_WAIT.observe(waited, priority=PRIORITY_NAMES.get(current_priority(), "interactive"))
+        except SchedulerOverloaded as e:
+            raise LLMError(f"LLM call dropped: {e}") from e
+
+    def _complete(self, messages, model, timeout, **kwargs):
+        reserved = count_tokens(messages) + LLM_RESERVED_COMPLETION_TOKENS
+        attempt = 0
+        while True:
+            self._admit(reserved)
+            settled = False
+            try:
+                text = self.backend.complete(messages, model, timeout, **kwargs).strip()
+                settled = True
+                self._settle(reserved, messages, model, text)
+                return text
+            except Exception as e:
+                if not self._should_retry(e, attempt):
+                    raise LLMError(f"LLM call failed after {attempt + 1} attempt(s): {e}") from e
+                attempt += 1
+            finally:
+                if not settled:
+                    self.scheduler.settle(reserved, 0)  # a failed attempt hands its reservation back
+
+    def complete(self, messages, model=DEFAULT_MODEL, timeout=None, **kwargs):
+        """
+        Returns the full completion text for `messages`.
+        A call identical to one already in flight waits for that call's result instead.
+        """
+        timeout = timeout or self.timeout
+        key = hashlib.sha256(json.dumps([model, messages, kwargs], sort_keys=True, default=str).encode()).hexdigest()
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+        if not leader:
+            self.scheduler.record_coalesced()
+            return future.result()
+
+        try:
+            with span("llm_complete"):
+                text = self._complete(messages, model, timeout, **kwargs)
+            future.set_result(text)
+            return text
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                del self._inflight[key]
+
+    @traced("llm_stream")
+    def stream(self, messages, model=DEFAULT_MODEL, timeout=None, **kwargs):
+        """
+        Yields completion text chunks as they arrive.
+        Retries only happen before the first chunk; a stream that breaks midway is raised.
+        The llm_stream span also covers the time the caller spends between chunks.
+        """
+        timeout = timeout or self.timeout
+        reserved = count_tokens(messages) + LLM_RESERVED_COMPLETION_TOKENS
+        attempt = 0
+        while True:
+            self._admit(reserved)
+            started = settled = False
+            text = ""
+            try:
+                for content in self.backend.stream(messages, model, timeout, **kwargs):
+                    started = True
+                    text += content
+                    yield content
+                settled = True
+                self._settle(reserved, messages, model, text)
+                return
+            except Exception as e:
+                if started or not self._should_retry(e, attempt):
+                    raise LLMError(f"LLM stream failed after {attempt + 1} attempt(s): {e}") from e
+                attempt += 1
+            finally:
+                # Failed or abandoned by the caller: keep only what was streamed before it stopped
+                if not settled:
+                    self.scheduler.settle(reserved, count_tokens(messages) + estimate_tokens(text) if started else 0)
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def build_backend(name=None, **options):
+    name = name or LLM_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown LLM backend '{name}'. Choose from: {', '.join(BACKENDS)}")
+    return BACKENDS[name](**options)
+
+
+def get_gateway():
+    """Returns the process-wide gateway, creating it on first use."""
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                _gateway = LLMGateway(build_backend())
+                logger.info(f"LLM gateway initialized with '{LLM_BACKEND}' backend.")
+    return _gateway
+
+
+def set_backend(backend):
+    """Swaps the backend of the shared gateway (e.g. a FakeBackend for load tests)."""
+    global _gateway
+    with _gateway_lock:
+        _gateway = LLMGateway(backend, scheduler=_gateway.scheduler if _gateway else None)
+    return _gateway
+
+
+def _collect_llm_metrics():
+    if _gateway is None:
+        return []
+    metrics = _gateway.scheduler.metrics()
+    return [
+        ("llm_queue_depth", "gauge", "LLM calls waiting for admission",
+         [({"priority": name}, metrics[f"queue_depth_{name}"]) for name in PRIORITY_NAMES.values()]),
+        ("llm_calls_total", "counter", "LLM calls by scheduler outcome",
+         [({"outcome": outcome}, metrics[outcome]) for outcome in ("admitted", "dropped", "coalesced", "rate_limited")]),
+    ]
+
+
+register_collector(_collect_llm_metrics)
+
+
+def llm_metrics():
+    """Queue depth, wait times, drops and coalesced calls of the shared gateway's scheduler."""
+    return get_gateway().scheduler.metrics()
@@ -1,220 +1,410 @@
 import streamlit as st
-from streamlit_chat import message
-from voice import transcribe_audio, record_audio
-from domain import identify_domain, client
-from hr import generate_hr_questions,evaluate_hr_answer
-from technical import generate_technical_questions, evaluate_technical_answer
+from telemetry import (configure_logging, start_metrics_server, write_metrics, span, session_context,
+                       session_timings, profiled, PROFILE_SESSIONS)
+from startup import start_warmup
+from prompts import session_usage
+from chat import render_chat
+from voice import transcribe_audio, record_audio, record_audio_streaming
+from domain import identify_domain, get_client
+from hr import generate_hr_questions,evaluate_hr_answer, evaluate_hr_round, stream_evaluate_hr_answer
+from technical import generate_technical_questions, evaluate_technical_answer, stream_evaluate_technical_answer
 from report import generate_report
-import os
+from evaluation import (EvaluationPipeline, PrefetchScheduler, transcribe_and_evaluate_hr,
+                        transcribe_and_evaluate_technical, warm_up_evaluation)
+from session import Answer, InterviewSession, get_session_store, new_session_id, valid_session_id
+from analytics import get_analytics_store
+from api_client import INTERVIEW_API_URL
+if INTERVIEW_API_URL:
+    # Thin client: the heavy calls run on the interview server's worker pools (see server.py)
+    from api_client import (get_client, identify_domain, generate_hr_questions, evaluate_hr_answer, evaluate_hr_round,
+                            stream_evaluate_hr_answer, generate_technical_questions, evaluate_technical_answer,
+                            stream_evaluate_technical_answer, transcribe_audio, generate_report,
+                            transcribe_and_evaluate_hr, transcribe_and_evaluate_technical, warm_up_evaluation,
+                            get_analytics_store)
+import logging
+import time
+from contextlib import ExitStack
+
+configure_logging()
+session_store = get_session_store()
+analytics = get_analytics_store()
+start_metrics_server()
+# Heavy components (LLM client, audio stack, speech model) load in the background from boot;
+# a thin client leaves that to the server
+warmup = start_warmup() if not INTERVIEW_API_URL else None
+
+def load_session():
+    """
+    Returns this browser session's interview, resuming the snapshot named by the `sid`
+    query parameter when a session store is configured (e.g. after a worker restart).
+    """
+    session_id = st.query_params.get("sid")
+    session = None
+    if session_store and valid_session_id(session_id):
+        try:
+            session = session_store.load(session_id)
+        except Exception as e:
+            logging.error(f"Failed to restore session {session_id}: {e}")
+    if session is None:
+        session_id = new_session_id()
+        session = InterviewSession()
+    if session_store:
+        st.query_params["sid"] = session_id
+    return session_id, session
 
 def main():
     st.set_page_config(page_title="Mock Interview Bot", layout="centered")
     st.title("🧠 AI Interview Bot")
+    if warmup and warmup.pending():
+        st.caption(f"Warming up: {', '.join(warmup.pending())}…")
 
-    if 'stage' not in st.session_state:
-        st.session_state.stage = 'start'
-        st.session_state.jd = ''
-        st.session_state.domain = ''
-        st.session_state.hr_qns = []
-        st.session_state.hr_index = 0
-        st.session_state.tech_qns = []
-        st.session_state.tech_index = 0
-        st.session_state.tech_answers = []
-        st.session_state.chat_history = []
-        st.session_state.recording = False
-        st.session_state.audio_file = None
-        st.session_state.recording_duration = 20
-        st.session_state.hr_answers = []
-        st.session_state.tech_answers=[]
-        st.session_state.hr_confidence_scores=[]
-        st.session_state.tech_scores=[]
-        st.session_state.tech_feedbacks=[]
-        
+    if 'interview' not in st.session_state:
+        st.session_state.session_id, st.session_state.interview = load_session()
+    session = st.session_state.interview
+
+    if 'pipeline' not in st.session_state:
+        st.session_state.pipeline = EvaluationPipeline()
+
+    if 'prefetch' not in st.session_state:
+        st.session_state.prefetch = PrefetchScheduler()
+    prefetch = st.session_state.prefetch
+
+    def prefetch_technical_round():
+        """Prepares the technical round while the HR round runs; a no-op for work already in flight."""
+        prefetch.schedule(('tech_questions', session.domain), generate_technical_questions, session.domain)
+        prefetch.schedule(('warmup',), warm_up_evaluation)
 
     def display_chat():
-        for i, chat in enumerate(st.session_state.chat_history):
-            message(chat['msg'], is_user=chat['user'], key=f"chat_{i}")
+        with span("display_chat"):
+            render_chat(session.chat_history)
 
     def add_message(msg, is_user):
-        st.session_state.chat_history.append({'msg': msg, 'user': is_user})
-
-    # Start stage
-    if st.session_state.stage == 'start':
-        display_chat()
-        jd = st.text_input("Paste Job Description here:", key="jd_input")
-        if jd:
-            st.session_state.jd = jd
-            add_message(jd,True)
-            domain = identify_domain(jd, client)
-            st.session_state.domain = domain
-            add_message(f"Predicted domain is: **{domain}**. Is this correct? (yes/recheck)", False)
-            st.session_state.stage = 'confirm_domain'
-            st.rerun()
-
-    elif st.session_state.stage == 'confirm_domain':
-        display_chat()
-        user_input = st.text_input("", key="confirm_domain_input")
-        if user_input:
-            add_message(user_input, True)
-            if user_input.lower() == 'yes':
-                add_message("Shall we start the HR round? (yes/no)", False)
-                st.session_state.stage = 'start_hr_prompt'
-            elif user_input.lower() == 'recheck':
-                st.session_state.stage = 'start'
-            st.rerun()
-
-    elif st.session_state.stage == 'start_hr_prompt':
-        display_chat()
-        user_input = st.text_input("", key="start_hr_input")
-        if user_input:
-            add_message(user_input, True)
-            if user_input.lower() == 'yes':
-                st.session_state.hr_qns = generate_hr_questions()
-                question = st.session_state.hr_qns[0]
-                add_message(f"HR Q1: {question}", False)
-                st.session_state.stage = 'hr_round'
-            else:
-                add_message("Okay, come back when you're ready.", False)
-            st.rerun()
-
-    elif st.session_state.stage == 'hr_round':
-        display_chat()
-
-        if st.session_state.hr_index < len(st.session_state.hr_qns):
-            question = st.session_state.hr_qns[st.session_state.hr_index]
-            st.write(f"**HR Q{st.session_state.hr_index + 1}:** {question}")
-
-            if not st.session_state.recording:
-                if st.button("🎙️ Start Recording HR Answer"):
-                    st.session_state.recording = True
-                    add_message("Recording started... Speak now.", False)
-
-                    audio_path = record_audio(duration=st.session_state.recording_duration)
-                    st.session_state.audio_file = audio_path
-                    st.session_state.recording = False
-
-                    transcript = transcribe_audio(audio_path)
-                    score, feedback, confidence = evaluate_hr_answer(question, transcript)
-
-                    add_message(transcript, True)
-                    add_message(f"✅ Feedback: {feedback} (Score: {score}/10)", False)
-
-                    # If score is very low, offer recheck without incrementing index
-                    if score < 3:
-                        st.session_state.low_score_retry = True
-                        st.session_state.last_transcript = transcript
-                        st.session_state.last_feedback = feedback
-                        st.session_state.last_score = score
-                        st.session_state.last_confidence = confidence
-                        st.stop()
-
-                # Otherwise, store and move on
-                    st.session_state.hr_answers.append((transcript, score, feedback, confidence))
-                    st.session_state.hr_index += 1
-
-                    if st.session_state.hr_index < len(st.session_state.hr_qns):
-                        next_qn = st.session_state.hr_qns[st.session_state.hr_index]
-                        add_message(f"HR Q{st.session_state.hr_index + 1}: {next_qn}", False)
-                    else:
-                        add_message("HR round done! Ready for technical round? (yes/no)", False)
-                        st.session_state.stage = 'tech_prompt'
-
-                    st.rerun()
+        session.add_message(msg, is_user)
+
+    def save_snapshot():
+        if session_store:
+            try:
+                session_store.save(st.session_state.session_id, session)
+            except Exception as e:
+                logging.error(f"Failed to snapshot session: {e}")
+
+    def store_answer(answer):
+        """Keeps the answer in the session and appends it to the cohort analytics store."""
+        session.record_answer(answer)
+        if analytics:
+            try:
+                analytics.record_answer(st.session_state.session_id, session.domain, answer, answer.latency)
+            except Exception as e:
+                logging.error(f"Failed to record answer analytics: {e}")
+
+    def harvest_evaluations(results):
+        """Moves finished background evaluations into the chat and the ordered answer lists."""
+        for (round_name, index), result in sorted(results.items()):
+            label = "HR" if round_name == 'hr' else "Tech"
+            questions = session.hr_questions if round_name == 'hr' else session.tech_questions
+            if isinstance(result, Exception):
+                result = ("", 0, "Error during evaluation.", "Low" if round_name == 'hr' else None, None)
+            answer = Answer(round_name, index, questions[index], *result)
+            store_answer(answer)
+            add_message(f"🗣️ {label} Q{index + 1}: {answer.transcript}", True)
+            add_message(f"✅ {label} Q{index + 1} Feedback: {answer.feedback} (Score: {answer.score}/10)", False)
+
+    def next_hr_question():
+        session.hr_index += 1
+        if session.hr_index < len(session.hr_questions):
+            next_qn = session.hr_questions[session.hr_index]
+            add_message(f"HR Q{session.hr_index + 1}: {next_qn}", False)
+        else:
+            add_message("HR round done! Ready for technical round? (yes/no)", False)
+            session.stage = 'tech_prompt'
+
+    def next_tech_question():
+        session.tech_index += 1
+        if session.tech_index < len(session.tech_questions):
+            next_qn = session.tech_questions[session.tech_index]
+            add_message(f"Tech Q{session.tech_index + 1}: {next_qn}", False)
+        else:
+            add_message("Interview complete. Type 'show result' to see your report.", False)
+            session.stage = 'result_wait'
+
+    def capture_answer(round_name, index, question):
+        """
+        Records an answer. Returns (audio, transcript) where audio is a file path or, in
+        in-memory mode, the samples themselves; the transcript is None unless streaming
+        mode built it while the candidate was speaking.
+        The archived recording is tagged with the question so it can be re-graded offline.
+        """
+        metadata = {"round": round_name, "index": index, "question": question,
+                    "domain": session.domain, "session_id": st.session_state.session_id}
+        # A thin client only records: the server transcribes the uploaded audio, so no model loads here
+        if session.streaming_transcription and not INTERVIEW_API_URL:
+            live = st.empty()
+            return record_audio_streaming(
+                duration=session.recording_duration,
+                on_partial=lambda text: live.markdown(f"🗣️ {text}"),
+                metadata=metadata
+            )
+        audio = record_audio(duration=session.recording_duration,
+                             in_memory=session.in_memory_audio, metadata=metadata)
+        return audio, None
+
+    def render_streamed_feedback(events):
+        """
+        Shows evaluator output token by token in a live bubble, switching to the parsed
+        score/feedback once those lines arrive. Returns the final parsed fields.
+        """
+        live = st.empty()
+        fields = {}
+        for text, fields in events:
+            if "feedback" in fields:
+                preview = f"✅ Feedback: {fields['feedback']}"
+                if "score" in fields:
+                    preview += f" (Score: {fields['score']}/10)"
             else:
-                st.write("Recording in progress... Please wait.")
-
-    # Handle recheck if triggered
-        if st.session_state.get("low_score_retry"):
-            st.warning("Your previous answer scored less than 3. Would you like to try again?")
-            if st.button("🔁 Recheck Answer"):
-                st.session_state.low_score_retry = False
-                # Allow re-attempt of the same question (same index)
+                preview = f"🤖 {text}"
+            live.markdown(preview)
+        live.empty()
+        return fields
+
+    # Pick up any answers graded in the background since the last run
+    harvest_evaluations(st.session_state.pipeline.collect())
+
+    # Time this run under its stage, attributed to the session; ?profile=1 samples it too
+    run_scope = ExitStack()
+    run_scope.enter_context(session_context(st.session_state.session_id))
+    run_scope.enter_context(profiled(st.session_state.session_id,
+                                     enabled=PROFILE_SESSIONS or st.query_params.get("profile") == "1"))
+    run_scope.enter_context(span(f"stage_{session.stage}"))
+
+    # Snapshot after every run, including the ones cut short by st.rerun()/st.stop()
+    try:
+        # Start stage
+        if session.stage == 'start':
+            display_chat()
+            jd = st.text_input("Paste Job Description here:", key="jd_input")
+            if jd:
+                session.jd = jd
+                add_message(jd,True)
+                domain = identify_domain(jd, get_client())
+                session.domain = domain
+                add_message(f"Predicted domain is: **{domain}**. Is this correct? (yes/recheck)", False)
+                session.stage = 'confirm_domain'
                 st.rerun()
-            else:
-                # If not rechecking, store previous answer and continue
-                st.session_state.hr_answers.append((
-                    st.session_state.last_transcript,
-                    st.session_state.last_score,
-                    st.session_state.last_feedback,
-                    st.session_state.last_confidence
-                ))
-                st.session_state.hr_index += 1
-                st.session_state.low_score_retry = False
-
-                if st.session_state.hr_index < len(st.session_state.hr_qns):
-                    add_message(f"HR Q{st.session_state.hr_index + 1}: {st.session_state.hr_qns[st.session_state.hr_index]}", False)
-                else:
-                    add_message("HR round done! Ready for technical round? (yes/no)", False)
-                    st.session_state.stage = 'tech_prompt'
 
+        elif session.stage == 'confirm_domain':
+            display_chat()
+            user_input = st.text_input("", key="confirm_domain_input")
+            if user_input:
+                add_message(user_input, True)
+                if user_input.lower() == 'yes':
+                    # The domain is settled: prepare the technical round while the HR round runs
+                    prefetch_technical_round()
+                    add_message("Shall we start the HR round? (yes/no)", False)
+                    session.stage = 'start_hr_prompt'
+                elif user_input.lower() == 'recheck':
+                    # Ask the LLM again: the cached title and classifier example would only repeat the answer
+                    session.domain = identify_domain(session.jd, get_client(), refresh=True)
+                    add_message(f"Predicted domain is: **{session.domain}**. Is this correct? (yes/recheck)", False)
+                    del st.session_state["confirm_domain_input"]  # the same stage reruns; wait for a new reply
                 st.rerun()
 
-    elif st.session_state.stage == 'tech_prompt':
-        display_chat()
-        user_input = st.text_input("", key="start_tech_input")
-        if user_input:
-            add_message(user_input, True)
-            if user_input.lower() == 'yes':
-                st.session_state.tech_qns = generate_technical_questions(st.session_state.domain)
-                question = st.session_state.tech_qns[0]
-                add_message(f"Tech Q1: {question}", False)
-                st.session_state.stage = 'tech_round'
-            else:
-                add_message("Okay, come back when you're ready.", False)
-            st.rerun()
-
-    elif st.session_state.stage == 'tech_round':
-        display_chat()
-
-        if st.session_state.tech_index < len(st.session_state.tech_qns):
-            question = st.session_state.tech_qns[st.session_state.tech_index]
-            st.write(f"**Tech Q{st.session_state.tech_index + 1}:** {question}")
-
-            if not st.session_state.recording:
-                if st.button("🎙️ Start Recording Technical Answer"):
-                    st.session_state.recording = True
-                    add_message("Recording started... Speak now.", False)
-
-                    audio_path = record_audio(duration=st.session_state.recording_duration)
-                    st.session_state.audio_file = audio_path
-                    st.session_state.recording = False
-
-                    transcript = transcribe_audio(audio_path)
+        elif session.stage == 'start_hr_prompt':
+            display_chat()
+            batch_mode = st.checkbox("Answer all HR questions first and get feedback at the end of the round",
+                                     value=session.hr_batch_mode)
+            user_input = st.text_input("", key="start_hr_input")
+            if user_input:
+                add_message(user_input, True)
+                if user_input.lower() == 'yes':
+                    session.hr_batch_mode = batch_mode
+                    prefetch_technical_round()  # again, if an earlier "no" discarded it
+                    session.hr_questions = generate_hr_questions()
+                    question = session.hr_questions[0]
+                    add_message(f"HR Q1: {question}", False)
+                    session.stage = 'hr_round'
+                else:
+                    # The candidate is stepping away: drop the speculative work rather than hold it
+                    prefetch.cancel()
+                    add_message("Okay, come back when you're ready.", False)
+                    del st.session_state["start_hr_input"]  # the same stage reruns; wait for a new reply
+                st.rerun()
 
-                    domain = st.session_state.domain  
-                    score, feedback = evaluate_technical_answer(question, transcript, domain)
+        elif session.stage == 'hr_round':
+            display_chat()
+
+            if session.hr_index < len(session.hr_questions):
+                question = session.hr_questions[session.hr_index]
+                st.write(f"**HR Q{session.hr_index + 1}:** {question}")
+
+                if not session.recording:
+                    if st.button("🎙️ Start Recording HR Answer"):
+                        session.recording = True
+                        add_message("Recording started... Speak now.", False)
+
+                        audio, transcript = capture_answer('hr', session.hr_index, question)
+                        started = time.perf_counter()
+                        session.audio_file = audio if isinstance(audio, str) else None
+                        session.recording = False
+
+                        # Background mode: transcribe and grade off the request path, serve the next question now
+                        if session.background_eval and not session.hr_batch_mode:
+                            st.session_state.pipeline.submit(
+                                ('hr', session.hr_index), transcribe_and_evaluate_hr,
+                                question, audio, transcript
+                            )
+                            next_hr_question()
+                            st.rerun()
+
+                        if transcript is None:
+                            transcript = transcribe_audio(audio)
+
+                        # Batch mode: keep recording back to back and grade the whole round at the end
+                        if session.hr_batch_mode:
+                            add_message(transcript, True)
+                            session.hr_pending.append((question, transcript))
+
+                            if session.hr_index + 1 == len(session.hr_questions):
+                                with st.spinner("Grading your HR answers..."):
+                                    results = evaluate_hr_round(session.hr_pending)
+                                latency = (time.perf_counter() - started) / len(results)
+                                for i, ((pending_question, pending_transcript), result) in enumerate(
+                                        zip(session.hr_pending, results)):
+                                    answer = Answer('hr', i, pending_question, pending_transcript, *result, latency)
+                                    store_answer(answer)
+                                    add_message(f"✅ HR Q{i + 1} Feedback: {answer.feedback} (Score: {answer.score}/10)", False)
+                                session.hr_pending = []
+                            next_hr_question()
+                            st.rerun()
+
+                        if session.stream_feedback:
+                            fields = render_streamed_feedback(stream_evaluate_hr_answer(question, transcript))
+                            score, feedback, confidence = fields["score"], fields["feedback"], fields["confidence"]
+                        else:
+                            score, feedback, confidence = evaluate_hr_answer(question, transcript)
+
+                        add_message(transcript, True)
+                        add_message(f"✅ Feedback: {feedback} (Score: {score}/10)", False)
+                        answer = Answer('hr', session.hr_index, question, transcript, score, feedback, confidence,
+                                        time.perf_counter() - started)
+
+                        # If score is very low, offer recheck without incrementing index
+                        if score < 3:
+                            session.retry_answer = answer
+                            st.stop()
+
+                    # Otherwise, store and move on
+                        store_answer(answer)
+                        next_hr_question()
+                        st.rerun()
+                else:
+                    st.write("Recording in progress... Please wait.")
+
+        # Handle recheck if triggered
+            if session.retry_answer is not None:
+                st.warning("Your previous answer scored less than 3. Would you like to try again?")
+                if st.button("🔁 Recheck Answer"):
+                    session.retry_answer = None
+                    # Allow re-attempt of the same question (same index)
+                    st.rerun()
+                else:
+                    # If not rechecking, store previous answer and continue
+                    store_answer(session.retry_answer)
+                    session.retry_answer = None
+                    next_hr_question()
+                    st.rerun()
 
-                    st.session_state.tech_answers.append((transcript, score, feedback))
-                    add_message(transcript, True)
-                    add_message(f"✅ Feedback: {feedback} (Score: {score}/10)", False)
+        elif session.stage == 'tech_prompt':
+            display_chat()
+            user_input = st.text_input("", key="start_tech_input")
+            if user_input:
+                add_message(user_input, True)
+                if user_input.lower() == 'yes':
+                    prefetched, questions = prefetch.take(('tech_questions', session.domain))
+                    session.tech_questions = questions if prefetched else generate_technical_questions(session.domain)
+                    logging.info(f"Prefetch stats: {prefetch.stats()}")
+                    question = session.tech_questions[0]
+                    add_message(f"Tech Q1: {question}", False)
+                    session.stage = 'tech_round'
+                else:
+                    prefetch.cancel()
+                    add_message("Okay, come back when you're ready.", False)
+                    del st.session_state["start_tech_input"]
+                st.rerun()
 
-                    st.session_state.tech_index += 1
-                    if st.session_state.tech_index < len(st.session_state.tech_qns):
-                        next_qn = st.session_state.tech_qns[st.session_state.tech_index]
-                        add_message(f"Tech Q{st.session_state.tech_index + 1}: {next_qn}", False)
+        elif session.stage == 'tech_round':
+            display_chat()
+
+            if session.tech_index < len(session.tech_questions):
+                question = session.tech_questions[session.tech_index]
+                st.write(f"**Tech Q{session.tech_index + 1}:** {question}")
+
+                if not session.recording:
+                    if st.button("🎙️ Start Recording Technical Answer"):
+                        session.recording = True
+                        add_message("Recording started... Speak now.", False)
+
+                        audio, transcript = capture_answer('tech', session.tech_index, question)
+                        started = time.perf_counter()
+                        session.audio_file = audio if isinstance(audio, str) else None
+                        session.recording = False
+
+                        if session.background_eval:
+                            st.session_state.pipeline.submit(
+                                ('tech', session.tech_index), transcribe_and_evaluate_technical,
+                                question, audio, session.domain, transcript
+                            )
+                            next_tech_question()
+                            st.rerun()
+
+                        if transcript is None:
+                            transcript = transcribe_audio(audio)
+
+                        domain = session.domain
+                        if session.stream_feedback:
+                            fields = render_streamed_feedback(stream_evaluate_technical_answer(question, transcript, domain))
+                            score, feedback = fields["score"], fields["feedback"]
+                        else:
+                            score, feedback = evaluate_technical_answer(question, transcript, domain)
+
+                        store_answer(Answer('tech', session.tech_index, question, transcript, score, feedback,
+                                            None, time.perf_counter() - started))
+                        add_message(transcript, True)
+                        add_message(f"✅ Feedback: {feedback} (Score: {score}/10)", False)
+
+                        next_tech_question()
+                        st.rerun()
+                else:
+                    st.write("Recording in progress... Please wait.")
+
+
+        elif session.stage == 'result_wait':
+            display_chat()
+            user_input = st.text_input("", key="result_input")
+            if user_input:
+                add_message(user_input, True)
+                if user_input.lower() == 'show result':
+                    if st.session_state.pipeline.pending():
+                        with st.spinner("Finishing evaluation of your last answers..."):
+                            harvest_evaluations(st.session_state.pipeline.wait_all())
                     else:
-                        add_message("Interview complete. Type 'show result' to see your report.", False)
-                        st.session_state.stage = 'result_wait'
+                        harvest_evaluations(st.session_state.pipeline.collect())
+                    report = generate_report(session.hr_answers, session.tech_answers, analytics=analytics,
+                                             domain=session.domain, session_id=st.session_state.session_id)
+                    add_message(report, False)
+                    # Final stage, so the submitted input does not regenerate the report on every rerun
+                    session.stage = 'done'
+                    logging.info(f"Session {st.session_state.session_id} seconds by span: "
+                                 f"{session_timings(st.session_state.session_id)}")
+                    logging.info(f"Session {st.session_state.session_id} LLM usage: "
+                                 f"{session_usage(st.session_state.session_id)}")
+                st.rerun()
 
-                    st.rerun()
-            else:
-                st.write("Recording in progress... Please wait.")
-
-
-    elif st.session_state.stage == 'result_wait':
-        display_chat()
-        user_input = st.text_input("", key="result_input")
-        if user_input:
-            add_message(user_input, True)
-            if user_input.lower() == 'show result':
-                report = generate_report(st.session_state.hr_answers, 
-                                         st.session_state.tech_answers,
-                                         st.session_state.hr_confidence_scores,
-                                         st.session_state.tech_scores,
-                                         st.session_state.tech_feedbacks
-                                         )
-                add_message(report, False)
-            st.rerun()
+        elif session.stage == 'done':
+            display_chat()
+    finally:
+        save_snapshot()
+        run_scope.close()
+        write_metrics()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,339 @@
+import re
+import json
+import logging
+import threading
+from telemetry import span, register_collector
+
+logger = logging.getLogger(__name__)
+
+
+class IncrementalFieldParser:
+    """
+    Picks labelled fields (e.g. 'Score: 7/10') out of a streamed completion as soon as
+    the line carrying them is complete, so the UI can show them before the stream ends.
+    `patterns` maps field name -> regex with one group; `converters` optionally maps
+    field name -> callable applied to the matched text. With `line_buffered=False`
+    every chunk is scanned, for patterns that are complete on their own (e.g. JSON values).
+    """
+
+    def __init__(self, patterns, converters=None, line_buffered=True):
+        self.patterns = {
+            name: re.compile(pattern, re.MULTILINE | re.IGNORECASE) if isinstance(pattern, str) else pattern
+            for name, pattern in patterns.items()
+        }
+        self.converters = converters or {}
+        self.line_buffered = line_buffered
+        self.buffer = ""
+        self.scanned = 0
+        self.fields = {}
+
+    def _scan(self, text):
+        for name, pattern in self.patterns.items():
+            if name in self.fields:
+                continue
+            match = pattern.search(text)
+            if match:
+                value = match.group(1).strip()
+                convert = self.converters.get(name)
+                try:
+                    self.fields[name] = convert(value) if convert else value
+                except ValueError:
+                    logger.debug(f"Could not convert streamed field {name}={value!r}")
+
+    def feed(self, chunk):
+        """Adds a streamed chunk and returns the fields parsed so far."""
+        self.buffer += chunk
+        complete = self.buffer.rfind("\n") + 1 if self.line_buffered else len(self.buffer)
+        if complete > self.scanned:
+            self.scanned = complete
+            self._scan(self.buffer[:complete])
+        return dict(self.fields)
+
+    def close(self):
+        """Parses the trailing, unterminated line once the stream has ended."""
+        self._scan(self.buffer)
+        return dict(self.fields)
+
+
+#---------structured (JSON) output---------
+class Field:
+    """
+    One field of a structured reply. `kind` is int or str; ints are clamped to
+    [minimum, maximum] and strings with `choices` are snapped to the matching choice.
+    `hint` describes the expected value inside the prompt's JSON template.
+    """
+
+    __slots__ = ("name", "kind", "hint", "choices", "minimum", "maximum", "default", "label")
+
+    def __init__(self, name, kind=str, hint="", choices=None, minimum=None, maximum=None, default=None, label=None):
+        self.name = name
+        self.kind = kind
+        self.hint = hint
+        self.choices = choices
+        self.minimum = minimum
+        self.maximum = maximum
+        self.default = default
+        self.label = label or name.replace("_", " ").capitalize()
+
+    def coerce(self, value):
+        """Returns the validated value, repairing near-misses such as '7/10' or 'medium'; raises ValueError."""
+        if self.kind is int:
+            if isinstance(value, str):
+                match = re.search(r"-?\d+(?:\.\d+)?", value)
+                if not match:
+                    raise ValueError(f"{self.name}: no number in {value!r}")
+                value = match.group(0)
+            value = int(round(float(value)))
+            if self.minimum is not None:
+                value = max(self.minimum, value)
+            if self.maximum is not None:
+                value = min(self.maximum, value)
+            return value
+        value = str(value).strip()
+        if len(value) >= 2 and value[0] == value[-1] == '"':  # one surrounding pair, not quotes inside
+            value = value[1:-1].strip()
+        if not value:
+            raise ValueError(f"{self.name}: empty")
+        if self.choices:
+            for choice in self.choices:
+                if value.lower().startswith(choice.lower()):
+                    return choice
+            raise ValueError(f"{self.name}: {value!r} is not one of {', '.join(self.choices)}")
+        return value
+
+
+class ParseResult:
+    __slots__ = ("values", "missing", "repaired")
+
+    def __init__(self, values, missing, repaired):
+        self.values = values
+        self.missing = missing
+        self.repaired = repaired
+
+
+_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$", re.MULTILINE)
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_SINGLE_QUOTED_KEY = re.compile(r"'([A-Za-z_]\w*)'\s*:")
+_BARE_KEY = re.compile(r"([{,]\s*)([A-Za-z_]\w*)\s*:")
+_SINGLE_QUOTED_VALUE = re.compile(r":\s*'((?:[^'\\]|\\.)*)'")
+_SMART_QUOTES = str.maketrans({"“": '"', "”": '"', "‘": "'", "’": "'"})
+
+
+def _requote(text):
+    text = _SINGLE_QUOTED_KEY.sub(r'"\1":', text)
+    text = _SINGLE_QUOTED_VALUE.sub(lambda m: ": " + json.dumps(m.group(1)), text)
+    return _BARE_KEY.sub(r'\1"\2":', text)
+
+
+def _load_json(text, opening="{", closing="}"):
+    """
+    Finds and decodes the JSON value in a reply, repairing common near-misses locally
+    (code fences, surrounding prose, trailing commas, unquoted or single-quoted keys,
+    smart quotes, a missing closing bracket). Returns (value or None, repaired).
+    """
+    try:
+        return json.loads(text), False
+    except ValueError:
+        pass
+    candidate = _FENCE.sub("", text.strip()).translate(_SMART_QUOTES)
+    start = candidate.find(opening)
+    if start == -1:
+        return None, True
+    end = candidate.rfind(closing)
+    candidate = candidate[start:end + 1] if end > start else candidate[start:] + closing
+    for repair in (lambda s: s,
+                   lambda s: _TRAILING_COMMA.sub(r"\1", s),
+                   lambda s: _requote(_TRAILING_COMMA.sub(r"\1", s))):
+        try:
+            return json.loads(repair(candidate)), True
+        except ValueError:
+            continue
+    return None, True
+
+
+class Schema:
+    """
+    Compiled description of a structured reply: builds the JSON instructions for the
+    prompt, parses and validates replies, and knows the tiny prompt that re-asks for
+    individual fields. `version` names the prompt revision for failure-rate tracking.
+    """
+
+    def __init__(self, name, fields, version="v1"):
+        self.name = name
+        self.version = version
+        self.fields = {field.name: field for field in fields}
+        # Fallbacks for replies that drift out of JSON
+        self._json_values = {
+            name: re.compile(rf'["\']?{name}["\']?\s*:\s*"?(-?\d+(?:\.\d+)?)' if field.kind is int
+                             else rf'["\']?{name}["\']?\s*:\s*"((?:[^"\\]|\\.)*)"?', re.IGNORECASE)
+            for name, field in self.fields.items()
+        }
+        self._labelled = {
+            name: re.compile(rf"^\W*{re.escape(field.label)}\s*[:=-]\s*(.+)$", re.IGNORECASE | re.MULTILINE)
+            for name, field in self.fields.items()
+        }
+        # Self-terminating patterns, so streamed JSON yields fields before the reply ends
+        self.stream_patterns = {
+            name: re.compile(rf'"{name}"\s*:\s*"?(-?\d+)(?=[^\d.])' if field.kind is int
+                             else rf'"{name}"\s*:\s*"((?:[^"\\]|\\.)*)"', re.IGNORECASE)
+            for name, field in self.fields.items()
+        }
+
+    @property
+    def key(self):
+        return f"{self.name}@{self.version}"
+
+    def template(self, names=None, extra=None):
+        """JSON template for the prompt, e.g. {"score": <integer 0-10>}; `extra` maps leading keys to hints."""
+        hints = dict(extra or {})
+        hints.update((name, self.fields[name].hint) for name in (names or self.fields))
+        return "{" + ", ".join(f'"{name}": {hint}' for name, hint in hints.items()) + "}"
+
+    def instructions(self):
+        return f"Return only a JSON object of the form {self.template()} and nothing else."
+
+    def field_prompt(self, names):
+        return f"Return only this JSON object, with no other text: {self.template(names)}"
+
+    def validate(self, data):
+        """Coerces the known fields of a decoded object; returns (values, missing)."""
+        values = {}
+        for name, field in self.fields.items():
+            raw = next((v for k, v in data.items() if str(k).lower() == name), None) if isinstance(data, dict) else None
+            if raw is None:
+                continue
+            try:
+                values[name] = field.coerce(raw)
+            except (TypeError, ValueError) as e:
+                logger.debug(f"[{self.key}] invalid {e}")
+        return values, [name for name in self.fields if name not in values]
+
+    def parse(self, text):
+        """Parses a reply, falling back to per-field extraction for anything JSON decoding missed."""
+        data, repaired = _load_json(text or "")
+        values, missing = self.validate(data if isinstance(data, dict) else {})
+        for name in missing:
+            field = self.fields[name]
+            for pattern in (self._labelled[name], self._json_values[name]):
+                match = pattern.search(text or "")
+                if not match:
+                    continue
+                try:
+                    values[name] = field.coerce(match.group(1))
+                    repaired = True
+                    break
+                except ValueError:
+                    continue
+        return ParseResult(values, [name for name in self.fields if name not in values], repaired)
+
+    def parse_many(self, text, key="item"):
+        """Parses a JSON array of objects numbered by `key`; returns {number: ParseResult}."""
+        data, repaired = _load_json(text or "", "[", "]")
+        results = {}
+        for position, item in enumerate(data if isinstance(data, list) else [], start=1):
+            if not isinstance(item, dict):
+                continue
+            try:
+                number = int(item.get(key, position))
+            except (TypeError, ValueError):
+                number = position
+            values, missing = self.validate(item)
+            results[number] = ParseResult(values, missing, repaired)
+        return results
+
+    def with_defaults(self, values):
+        return {name: values.get(name, field.default) for name, field in self.fields.items()}
+
+    def stream_parser(self):
+        return IncrementalFieldParser(
+            self.stream_patterns,
+            {name: field.coerce for name, field in self.fields.items()},
+            line_buffered=False,
+        )
+
+
+#---------parse-failure tracking per prompt version---------
+class ParseStats:
+    """
+    Counts clean, locally repaired, re-asked and failed parses per schema version.
+    The failure rate is the share of replies that needed a re-ask or stayed incomplete.
+    """
+
+    OUTCOMES = ("clean", "repaired", "reasked", "failed")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def record(self, schema, outcome):
+        with self._lock:
+            counts = self._counts.setdefault(schema.key, dict.fromkeys(self.OUTCOMES, 0))
+            counts[outcome] += 1
+
+    def snapshot(self):
+        with self._lock:
+            report = {}
+            for key, counts in self._counts.items():
+                total = sum(counts.values())
+                # Replies local parsing and repair could not fully handle
+                failures = counts["reasked"] + counts["failed"]
+                report[key] = dict(counts, total=total, failure_rate=round(failures / total, 3) if total else 0.0)
+            return report
+
+
+parse_stats = ParseStats()
+
+
+def _collect_parse_stats():
+    return [("llm_parse_outcomes_total", "counter", "Structured replies by parse outcome and schema version",
+             [({"schema": key, "outcome": outcome}, counts[outcome])
+              for key, counts in parse_stats.snapshot().items() for outcome in ParseStats.OUTCOMES])]
+
+
+register_collector(_collect_parse_stats)
+
+
+class IncompleteReplyError(ValueError):
+    """Raised when a structured reply still lacks fields after the re-ask; `missing` names them."""
+
+    def __init__(self, schema, missing):
+        super().__init__(f"[{schema.key}] reply still missing {', '.join(missing)}")
+        self.missing = missing
+
+
+def finish_structured(gateway, messages, text, schema, **kwargs):
+    """
+    Parses a completed reply against `schema`. Fields still missing after local repair
+    are re-asked in the original conversation, with the reply as the assistant's turn,
+    so the model still sees the question and answer it is grading. Returns the values;
+    raises IncompleteReplyError when the re-ask does not supply every field, rather
+    than passing a default score off as the model's.
+    """
+    with span("parse_response"):
+        result = schema.parse(text)
+    outcome = "repaired" if result.repaired else "clean"
+    if result.missing:
+        logger.warning(f"[{schema.key}] reply missing {', '.join(result.missing)}; re-asking for them.")
+        followup = list(messages)
+        if text and text.strip():
+            followup.append({"role": "assistant", "content": text.strip()})
+        followup.append({"role": "user", "content": schema.field_prompt(result.missing)})
+        try:
+            retry = schema.parse(gateway.complete(messages=followup, **kwargs))
+            for name in result.missing:
+                if name in retry.values:
+                    result.values[name] = retry.values[name]
+        except Exception as e:
+            logger.error(f"[{schema.key}] re-ask failed: {e}")
+        still_missing = [name for name in schema.fields if name not in result.values]
+        outcome = "failed" if still_missing else "reasked"
+    parse_stats.record(schema, outcome)
+    if outcome == "failed":
+        raise IncompleteReplyError(schema, still_missing)
+    return result.values
+
+
+def complete_structured(gateway, messages, schema, **kwargs):
+    """Runs a completion and returns (values, raw_text) parsed against `schema`."""
+    text = gateway.complete(messages=messages, **kwargs)
+    return finish_structured(gateway, messages, text, schema, **kwargs), text
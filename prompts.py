@@ -0,0 +1,184 @@
+import os
+import re
+import string
+import logging
+import threading
+from collections import OrderedDict
+from scheduler import estimate_tokens
+from telemetry import current_session, register_collector
+
+logger = logging.getLogger(__name__)
+
+#---------prompt settings---------
+PROMPT_MAX_ANSWER_WORDS = int(os.getenv("PROMPT_MAX_ANSWER_WORDS", "250"))  # 0 sends transcripts uncapped
+PROMPT_STRIP_FILLERS = os.getenv("PROMPT_STRIP_FILLERS", "1") == "1"
+
+# USD per million (input, output) tokens, from the provider's price list
+MODEL_PRICES = {
+    "llama3-70b-8192": (0.59, 0.79),
+    "llama3-8b-8192": (0.05, 0.08),
+}
+
+# Identical, byte for byte, at the start of every request: providers cache a shared
+# prompt prefix, so nothing variable may appear before the task instructions.
+SYSTEM_PREFIX = (
+    "You run mock job interviews. Answers are speech transcripts. "
+    "Reply only in the requested format, without preamble."
+)
+
+
+#---------templates---------
+_templates = {}  # system text -> template, so the gateway can attribute a call to its prompt
+
+
+class PromptTemplate:
+    """
+    Versioned prompt compiled once at import: a static system message (the shared prefix
+    plus this task's instructions) followed by a user message holding only the variable
+    fields. Bump `version` whenever the wording changes so caches and comparisons split.
+    """
+
+    def __init__(self, name, version, instructions, body):
+        self.name = name
+        self.version = version
+        self.system = f"{SYSTEM_PREFIX}\n\nTask: {instructions}"
+        self.body = body
+        self.fields = [field for _, field, _, _ in string.Formatter().parse(body) if field]
+        self.static_tokens = estimate_tokens(self.system)
+        _templates[self.system] = self
+
+    @property
+    def key(self):
+        return f"{self.name}@{self.version}"
+
+    def messages(self, **values):
+        missing = [field for field in self.fields if field not in values]
+        if missing:
+            raise KeyError(f"[{self.key}] missing prompt fields: {', '.join(missing)}")
+        return [
+            {"role": "system", "content": self.system},
+            {"role": "user", "content": self.body.format(**values)},
+        ]
+
+
+def template_for(messages):
+    """The template `messages` were rendered from, or None (e.g. a parse re-ask)."""
+    if messages and messages[0].get("role") == "system":
+        return _templates.get(messages[0].get("content"))
+    return None
+
+
+#---------transcript normalization---------
+_FILLERS = re.compile(r"(?<![\w'])(?:u+m+|u+h+m*|e+r+m*|h+m+|a+h+|mm+)(?![\w'])[,.]*\s*", re.IGNORECASE)
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_transcript(text, max_words=PROMPT_MAX_ANSWER_WORDS, strip_fillers=PROMPT_STRIP_FILLERS):
+    """
+    Compacts a spoken answer before it is sent for grading: drops hesitation sounds
+    (um, uh, erm...), collapses whitespace and keeps the first `max_words` words.
+    """
+    text = text or ""
+    if strip_fillers:
+        text = _FILLERS.sub("", text)
+    words = _SPACES.sub(" ", text).strip().split(" ")
+    if max_words and len(words) > max_words:
+        return " ".join(words[:max_words]) + " [...]"
+    return " ".join(words)
+
+
+#---------token accounting---------
+def count_tokens(messages):
+    """Estimated prompt tokens of a chat request, on the scheduler's budgeting scale."""
+    return sum(estimate_tokens(message.get("content") or "") for message in messages)
+
+
+def call_cost(model, input_tokens, output_tokens):
+    input_price, output_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    return (input_tokens * input_price + output_tokens * output_price) / 1e6
+
+
+def _empty_usage():
+    return {"calls": 0, "input_tokens": 0, "static_input_tokens": 0, "output_tokens": 0, "cost_usd": 0.0}
+
+
+def _add_usage(usage, input_tokens, static_tokens, output_tokens, cost):
+    usage["calls"] += 1
+    usage["input_tokens"] += input_tokens
+    usage["static_input_tokens"] += static_tokens
+    usage["output_tokens"] += output_tokens
+    usage["cost_usd"] += cost
+
+
+class TokenLedger:
+    """
+    Cumulative input/output tokens and cost of completed LLM calls, per stage (the
+    prompt template a call was rendered from) and model for the whole process, and
+    per stage for each recent session. `static_input_tokens` is the part of the input
+    that was a template's fixed system message, i.e. eligible for provider prefix caching.
+    """
+
+    MAX_SESSIONS = 1000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = {}  # (stage, model) -> usage
+        self._sessions = OrderedDict()  # session id -> {stage: usage}
+
+    def record(self, stage, model, input_tokens, output_tokens, static_tokens=0, session_id=None):
+        cost = call_cost(model, input_tokens, output_tokens)
+        usage = (input_tokens, min(static_tokens, input_tokens), output_tokens, cost)
+        with self._lock:
+            _add_usage(self._totals.setdefault((stage, model), _empty_usage()), *usage)
+            if session_id is not None:
+                stages = self._sessions.pop(session_id, None) or {}
+                _add_usage(stages.setdefault(stage, _empty_usage()), *usage)
+                self._sessions[session_id] = stages
+                while len(self._sessions) > self.MAX_SESSIONS:
+                    self._sessions.popitem(last=False)
+
+    def session(self, session_id):
+        """{"stages": {stage: usage}, "total": usage} for one session."""
+        with self._lock:
+            stages = {stage: dict(usage) for stage, usage in self._sessions.get(session_id, {}).items()}
+        total = _empty_usage()
+        for usage in stages.values():
+            for name in total:
+                total[name] += usage[name]
+        for usage in list(stages.values()) + [total]:
+            usage["cost_usd"] = round(usage["cost_usd"], 6)
+        return {"stages": stages, "total": total}
+
+    def totals(self):
+        with self._lock:
+            return {key: dict(usage) for key, usage in self._totals.items()}
+
+
+token_ledger = TokenLedger()
+
+
+def record_usage(messages, model, input_tokens, output_tokens):
+    """Books one completed call against its stage and the current session."""
+    template = template_for(messages)
+    stage = template.name if template else "other"
+    static_tokens = template.static_tokens if template else 0
+    token_ledger.record(stage, model, input_tokens, output_tokens, static_tokens, current_session())
+    logger.debug(f"[{stage}] {model}: {input_tokens} input + {output_tokens} output tokens")
+
+
+def session_usage(session_id):
+    return token_ledger.session(session_id)
+
+
+def _collect_usage():
+    totals = token_ledger.totals()
+    return [
+        ("llm_tokens_total", "counter", "LLM tokens by stage, model and direction",
+         [({"stage": stage, "model": model, "direction": direction}, usage[f"{direction}_tokens"])
+          for (stage, model), usage in totals.items() for direction in ("input", "static_input", "output")]),
+        ("llm_cost_usd_total", "counter", "Estimated LLM spend by stage and model",
+         [({"stage": stage, "model": model}, round(usage["cost_usd"], 6)) for (stage, model), usage in totals.items()]),
+    ]
+
+
+register_collector(_collect_usage)
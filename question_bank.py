@@ -0,0 +1,298 @@
+import os
+import re
+import time
+import random
+import sqlite3
+import hashlib
+import logging
+import argparse
+import threading
+from array import array
+from llm import get_gateway, DEFAULT_MODEL
+from scheduler import llm_priority, BATCH
+from telemetry import configure_logging
+from prompts import PromptTemplate
+
+logger = logging.getLogger(__name__)
+
+#---------question bank settings---------
+QUESTION_BANK_DB = os.getenv("QUESTION_BANK_DB", "question_bank.sqlite")
+BANK_MIN_PER_DOMAIN = int(os.getenv("BANK_MIN_PER_DOMAIN", "30"))  # below this a domain is topped up
+BANK_TOPUP_BATCH = 20
+DEDUP_THRESHOLD = 0.6  # estimated Jaccard similarity above which two questions are duplicates
+DIFFICULTIES = ("easy", "medium", "hard")
+# Banks that are not a job domain (e.g. the HR round) live under this prefix, which no job title uses
+RESERVED_PREFIX = "@"
+
+# MinHash over character shingles, bucketed with LSH (16 bands x 4 rows)
+NUM_PERM = 64
+LSH_BANDS = 16
+LSH_ROWS = NUM_PERM // LSH_BANDS
+SHINGLE_SIZE = 5
+_PRIME = (1 << 61) - 1
+_rng = random.Random(1234)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+
+def normalize_domain(domain):
+    return " ".join(str(domain).split()).lower()
+
+
+def reserved_domain(name):
+    """Bank key for a non-job question set, kept apart from any job domain of the same name."""
+    return RESERVED_PREFIX + normalize_domain(name)
+
+
+def _shingles(text):
+    text = re.sub(r"[^a-z0-9 ]", "", " ".join(text.lower().split()))
+    if len(text) <= SHINGLE_SIZE:
+        return {text}
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def minhash(text):
+    """64-value MinHash signature of the question's character 5-gram set."""
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big")
+              for s in _shingles(text)]
+    return array("Q", (min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS))
+
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of two MinHash signatures."""
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+
+def _bands(signature):
+    return [(band, tuple(signature[band * LSH_ROWS:(band + 1) * LSH_ROWS])) for band in range(LSH_BANDS)]
+
+
+def estimate_difficulty(question):
+    """Keyword heuristic for questions that arrive without a difficulty tag."""
+    text = question.lower()
+    if re.search(r"\b(design|architect|optimi[sz]e|trade-?offs?|scale|scalab)", text):
+        return "hard"
+    if re.match(r"(what is|what are|define|name)\b", text):
+        return "easy"
+    return "medium"
+
+
+class _DomainIndex:
+    __slots__ = ("questions", "difficulties", "signatures", "by_difficulty", "buckets")
+
+    def __init__(self):
+        self.questions = []
+        self.difficulties = []
+        self.signatures = []
+        self.by_difficulty = {difficulty: [] for difficulty in DIFFICULTIES}
+        self.buckets = {}
+
+
+class QuestionBank:
+    """
+    Persistent per-domain question bank served from an in-memory index.
+    Questions are stored in SQLite with their difficulty and MinHash signature;
+    near-duplicates are rejected on insert through LSH buckets, and sampling is a
+    local lookup. Thin domains are topped up from the LLM on a background thread.
+    """
+
+    def __init__(self, path=QUESTION_BANK_DB):
+        self._lock = threading.Lock()
+        self._index = {}
+        self._topping_up = set()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS questions ("
+            "domain TEXT NOT NULL, question TEXT NOT NULL, difficulty TEXT NOT NULL, "
+            "signature BLOB NOT NULL, source TEXT, created REAL, PRIMARY KEY (domain, question))"
+        )
+        self._db.execute("CREATE TABLE IF NOT EXISTS seeds (domain TEXT PRIMARY KEY, version TEXT NOT NULL)")
+        self._db.commit()
+        self._seeds = dict(self._db.execute("SELECT domain, version FROM seeds"))
+        for domain, question, difficulty, signature in self._db.execute(
+                "SELECT domain, question, difficulty, signature FROM questions"):
+            self._remember(domain, question, difficulty, array("Q", signature))
+        logger.info(f"Question bank loaded: {sum(len(i.questions) for i in self._index.values())} "
+                    f"questions across {len(self._index)} domain(s).")
+
+    def _remember(self, domain, question, difficulty, signature):
+        index = self._index.setdefault(domain, _DomainIndex())
+        position = len(index.questions)
+        index.questions.append(question)
+        index.difficulties.append(difficulty)
+        index.signatures.append(signature)
+        index.by_difficulty.setdefault(difficulty, []).append(position)
+        for band in _bands(signature):
+            index.buckets.setdefault(band, []).append(position)
+
+    def _is_duplicate(self, index, signature):
+        candidates = {position for band in _bands(signature) for position in index.buckets.get(band, ())}
+        return any(similarity(signature, index.signatures[p]) >= DEDUP_THRESHOLD for p in candidates)
+
+    def size(self, domain):
+        index = self._index.get(normalize_domain(domain))
+        return len(index.questions) if index else 0
+
+    def domains(self):
+        return {domain: len(index.questions) for domain, index in self._index.items()}
+
+    def add_questions(self, domain, questions, source="llm"):
+        """
+        Adds questions (plain strings or (question, difficulty) pairs), skipping
+        near-duplicates of anything already banked for the domain. Returns the number added.
+        """
+        domain = normalize_domain(domain)
+        rows = []
+        with self._lock:
+            index = self._index.setdefault(domain, _DomainIndex())
+            for item in questions:
+                question, difficulty = item if isinstance(item, tuple) else (item, None)
+                question = question.strip()
+                if not question:
+                    continue
+                difficulty = difficulty if difficulty in DIFFICULTIES else estimate_difficulty(question)
+                signature = minhash(question)
+                if self._is_duplicate(index, signature):
+                    logger.debug(f"Skipping near-duplicate question: {question}")
+                    continue
+                self._remember(domain, question, difficulty, signature)
+                rows.append((domain, question, difficulty, signature.tobytes(), source, time.time()))
+            if rows:
+                self._db.executemany("INSERT OR IGNORE INTO questions VALUES (?, ?, ?, ?, ?, ?)", rows)
+                self._db.commit()
+        if rows:
+            logger.info(f"Added {len(rows)} question(s) to the '{domain}' bank.")
+        return len(rows)
+
+    def seed(self, domain, questions, version):
+        """
+        Adds a built-in question list once per `version`: later calls are a lookup, even
+        when deduplication kept the bank smaller than the list. Returns the number added.
+        """
+        domain = normalize_domain(domain)
+        if self._seeds.get(domain) == version:
+            return 0
+        added = self.add_questions(domain, questions, source="seed")
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO seeds VALUES (?, ?)", (domain, version))
+            self._db.commit()
+            self._seeds[domain] = version
+        return added
+
+    def sample(self, domain, n, difficulties=("easy", "medium")):
+        """
+        Picks `n` distinct questions for `domain`, preferring the given difficulties and
+        filling up from the rest when they run short. Returns [] for an unknown domain.
+        """
+        index = self._index.get(normalize_domain(domain))
+        if not index:
+            return []
+        preferred = [p for difficulty in difficulties for p in index.by_difficulty.get(difficulty, ())]
+        picked = random.sample(preferred, min(n, len(preferred)))
+        if len(picked) < n:
+            chosen = set(picked)
+            rest = [p for p in range(len(index.questions)) if p not in chosen]
+            picked += random.sample(rest, min(n - len(picked), len(rest)))
+        return [index.questions[p] for p in picked]
+
+    def top_up_async(self, domain, minimum=BANK_MIN_PER_DOMAIN):
+        """Generates more questions in the background when `domain` has fewer than `minimum`."""
+        domain = normalize_domain(domain)
+        if domain.startswith(RESERVED_PREFIX):
+            return False  # curated sets, not generated per job domain
+        with self._lock:
+            if self.size(domain) >= minimum or domain in self._topping_up:
+                return False
+            self._topping_up.add(domain)
+
+        def top_up():
+            try:
+                with llm_priority(BATCH):
+                    self.add_questions(domain, generate_tagged_questions(domain, BANK_TOPUP_BATCH))
+            except Exception as e:
+                logger.error(f"Background top-up for '{domain}' failed: {e}")
+            finally:
+                with self._lock:
+                    self._topping_up.discard(domain)
+
+        threading.Thread(target=top_up, name="bank-topup", daemon=True).start()
+        return True
+
+
+TAGGED_QUESTIONS_PROMPT = PromptTemplate(
+    "tagged_questions", "v2",
+    instructions="as a technical interviewer, write unique, non-repetitive interview questions for the "
+                 "job domain given. Mix beginner, intermediate and advanced questions and prefix each with its "
+                 "difficulty in square brackets: [easy], [medium] or [hard]. "
+                 "Return only a numbered list of questions.",
+    body="Generate {count} questions for the job domain: '{domain}'.",
+)
+
+
+def generate_tagged_questions(domain, count):
+    """Asks the LLM for `count` questions tagged [easy]/[medium]/[hard]; returns (question, difficulty) pairs."""
+    content = get_gateway().complete(
+        model=DEFAULT_MODEL, messages=TAGGED_QUESTIONS_PROMPT.messages(count=count, domain=domain)
+    )
+    questions = []
+    for line in content.split("\n"):
+        match = re.match(r"^\s*\d+\.\s*(?:\[(easy|medium|hard)\]\s*)?(.+)$", line, re.IGNORECASE)
+        if match:
+            difficulty = match.group(1).lower() if match.group(1) else None
+            questions.append((match.group(2).strip(), difficulty))
+    return questions
+
+
+_bank = None
+_bank_lock = threading.Lock()
+
+
+def get_question_bank():
+    """Returns the process-wide question bank, loading its index on first use."""
+    global _bank
+    if _bank is None:
+        with _bank_lock:
+            if _bank is None:
+                _bank = QuestionBank()
+    return _bank
+
+
+#---------offline bulk population---------
+def populate(domains, per_domain, max_rounds=10):
+    bank = get_question_bank()
+    for domain in domains:
+        for _ in range(max_rounds):
+            missing = per_domain - bank.size(domain)
+            if missing <= 0:
+                break
+            try:
+                added = bank.add_questions(domain, generate_tagged_questions(domain, min(BANK_TOPUP_BATCH, missing)))
+            except Exception as e:
+                logger.error(f"Generation for '{domain}' failed: {e}")
+                break
+            if not added:
+                logger.warning(f"No new unique questions for '{domain}'; stopping at {bank.size(domain)}.")
+                break
+        print(f"{domain}: {bank.size(domain)} question(s)")
+
+
+if __name__ == "__main__":
+    configure_logging()
+    parser = argparse.ArgumentParser(description="Offline management of the interview question bank.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    fill = commands.add_parser("populate", help="Generate and deduplicate questions for domains in bulk")
+    fill.add_argument("domains", nargs="*", help="Job domains to populate")
+    fill.add_argument("--domains-file", help="File with one domain per line")
+    fill.add_argument("--per-domain", type=int, default=60)
+    commands.add_parser("stats", help="Show banked question counts per domain")
+    args = parser.parse_args()
+
+    if args.command == "populate":
+        domains = list(args.domains)
+        if args.domains_file:
+            with open(args.domains_file, encoding="utf-8") as f:
+                domains += [line.strip() for line in f if line.strip()]
+        with llm_priority(BATCH):
+            populate(domains, args.per_domain)
+    else:
+        for domain, count in sorted(get_question_bank().domains().items()):
+            print(f"{domain}: {count}")
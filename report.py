@@ -1,89 +1,263 @@
+import os
+import glob
+import json
 import logging
+import argparse
+from string import Template
+import numpy as np
+from hr import HR_SKILLS
+from telemetry import traced, configure_logging
 
-#logging---
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("interview_report.log"),
-        logging.StreamHandler()
-    ]
-)
-
-def generate_report(hr_scores, hr_feedbacks, hr_confidence_scores, tech_scores, tech_feedbacks):
+# Confidence labels from the HR evaluator mapped onto the 0-10 report scale
+CONFIDENCE_POINTS = {"Low": 3.0, "Medium": 6.0, "High": 9.0}
+TECH_SKILL = "Technical knowledge"
+HR, TECH = 0, 1
+
+# -------final report template (compiled once) ---
+REPORT_TEMPLATE = Template("""
+==== INTERVIEW PERFORMANCE REPORT ====
+
+🧑‍💼 HR ROUND:
+- Average HR Score: ${avg_hr_score}/10 (spread ±${hr_spread})
+- Confidence Level: ${avg_confidence}/10
+- Feedback:
+${hr_feedback}
+
+💻 TECHNICAL ROUND:
+- Average Technical Score: ${avg_tech_score}/10 (spread ±${tech_spread})
+- Feedback:
+${tech_feedback}
+
+🧩 SKILL BREAKDOWN:
+${skills}
+
+📊 OVERALL PERFORMANCE:
+- Final Score: ${overall_score}/10
+${cohort_line}- ${confidence_remark}
+
+📌 Tips for Improvement:
+- Practice common interview questions to improve structure and clarity.
+- Strengthen your technical fundamentals in the predicted domain.
+- Improve confidence by doing more mock interviews.
+
+Good luck with your preparation! 🚀
+""")
+
+
+def skill_of(answer):
+    return HR_SKILLS.get(answer.question, "General") if answer.round == 'hr' else TECH_SKILL
+
+
+def _group_stats(values, groups, n_groups):
+    """Count, mean and standard deviation of `values` per group id, in one vectorised pass."""
+    counts = np.bincount(groups, minlength=n_groups)
+    sums = np.bincount(groups, weights=values, minlength=n_groups)
+    squares = np.bincount(groups, weights=values * values, minlength=n_groups)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = sums / counts
+        spread = np.sqrt(np.maximum(squares / counts - means * means, 0.0))
+    return counts, means, spread
+
+
+def _confidence_remark(avg_confidence):
+    # --- Suggestion Based on Confidence ---
+    if avg_confidence >= 8:
+        return "You appeared confident throughout the HR round."
+    elif avg_confidence >= 5:
+        return "You showed moderate confidence. Try to be more assertive and clear."
+    return "Your confidence seemed low. Practice speaking clearly and confidently."
+
+
+def _numbered(feedbacks, empty):
+    return "\n".join(f"{i+1}. {fb}" for i, fb in enumerate(feedbacks)) if feedbacks else empty
+
+
+class ReportEngine:
     """
-    Generate final report with scores, feedback, and suggestions for improvement.
-    Includes logging and exception handling for better traceability.
+    Aggregates answer records with NumPy and renders the text report.
+    Works on any number of sessions at once: all answers are flattened into arrays
+    and grouped per (session, round) and per (session, skill) with bincount, so a
+    weekly batch of thousands of archived sessions costs a handful of array passes.
+    `cohort_scores` are historical overall scores used for percentile ranking.
     """
-    try:
-        logging.info("Starting report generation...")
 
-        #----------HR Round Evaluation------
-        if not hr_scores or not hr_confidence_scores:
-            raise ValueError("HR scores or confidence scores are missing.")
+    def __init__(self, cohort_scores=None):
+        cohort = np.asarray(cohort_scores if cohort_scores is not None else [], dtype=float)
+        self.cohort = np.sort(cohort[~np.isnan(cohort)])
 
-        total_hr_score = sum(hr_scores)
-        avg_hr_score = round(total_hr_score / len(hr_scores), 2)
-        avg_confidence = round(sum(hr_confidence_scores) / len(hr_confidence_scores), 2)
+    def percentile(self, overall):
+        """Percentile rank of each overall score within the cohort (NaN without a cohort)."""
+        overall = np.asarray(overall, dtype=float)
+        if not len(self.cohort):
+            return np.full(overall.shape, np.nan)
+        return np.round(np.searchsorted(self.cohort, overall, side="right") / len(self.cohort) * 100, 1)
 
-        logging.info(f"HR Round - Avg Score: {avg_hr_score}, Avg Confidence: {avg_confidence}")
+    def aggregate(self, sessions):
+        """
+        `sessions` is a list of (hr_answers, tech_answers) pairs.
+        Returns a dict of per-session arrays plus per-session skill breakdowns.
+        """
+        n = len(sessions)
+        session_ids, rounds, scores, confidences, skill_keys = [], [], [], [], []
+        for sid, (hr_answers, tech_answers) in enumerate(sessions):
+            for round_id, answers in ((HR, hr_answers), (TECH, tech_answers)):
+                for answer in answers:
+                    session_ids.append(sid)
+                    rounds.append(round_id)
+                    scores.append(answer.score)
+                    confidences.append(CONFIDENCE_POINTS.get(answer.confidence, np.nan))
+                    skill_keys.append(skill_of(answer))
 
-        #------ Technical Round Evaluation---------
-        if not tech_scores:
-            raise ValueError("Technical scores are missing.")
+        session_ids = np.asarray(session_ids, dtype=np.int64)
+        rounds = np.asarray(rounds, dtype=np.int64)
+        scores = np.asarray(scores, dtype=float)
+        confidences = np.asarray(confidences, dtype=float)
 
-        total_tech_score = sum(tech_scores)
-        avg_tech_score = round(total_tech_score / len(tech_scores), 2)
+        # Per (session, round)
+        counts, means, spread = _group_stats(scores, session_ids * 2 + rounds, 2 * n)
+        counts, means, spread = counts.reshape(n, 2), means.reshape(n, 2), spread.reshape(n, 2)
 
-        logging.info(f"Technical Round - Avg Score: {avg_tech_score}")
+        # HR confidence per session (technical answers carry none)
+        has_confidence = ~np.isnan(confidences)
+        _, avg_confidence, _ = _group_stats(confidences[has_confidence], session_ids[has_confidence], n)
 
-        #-------- Overall Score ----------
-        overall_score = round((avg_hr_score + avg_tech_score) / 2, 2)
-        logging.info(f"Overall Score: {overall_score}")
+        overall = np.round((means[:, HR] + means[:, TECH]) / 2, 2)
 
-    
-        hr_feedback_str = "\n".join([f"{i+1}. {fb}" for i, fb in enumerate(hr_feedbacks)]) if hr_feedbacks else "No HR feedback available."
-        tech_feedback_str = "\n".join([f"{i+1}. {fb}" for i, fb in enumerate(tech_feedbacks)]) if tech_feedbacks else "No technical feedback available."
+        # Per (session, skill)
+        skill_names, skill_ids = np.unique(np.asarray(skill_keys, dtype=object).astype(str), return_inverse=True)
+        n_skills = len(skill_names)
+        skill_counts, skill_means, _ = _group_stats(scores, session_ids * n_skills + skill_ids, n * n_skills)
+        skill_counts, skill_means = skill_counts.reshape(n, n_skills), skill_means.reshape(n, n_skills)
+        skills = [
+            [(skill_names[k], round(float(skill_means[sid, k]), 2)) for k in np.flatnonzero(skill_counts[sid])]
+            for sid in range(n)
+        ]
 
-        # --- Suggestion Based on Confidence ---
-        if avg_confidence >= 8:
-            confidence_remark = "You appeared confident throughout the HR round."
-        elif avg_confidence >= 5:
-            confidence_remark = "You showed moderate confidence. Try to be more assertive and clear."
-        else:
-            confidence_remark = "Your confidence seemed low. Practice speaking clearly and confidently."
+        return {
+            "hr_count": counts[:, HR], "tech_count": counts[:, TECH],
+            "avg_hr_score": np.round(means[:, HR], 2), "hr_spread": np.round(spread[:, HR], 2),
+            "avg_tech_score": np.round(means[:, TECH], 2), "tech_spread": np.round(spread[:, TECH], 2),
+            "avg_confidence": np.round(avg_confidence, 2),
+            "overall_score": overall,
+            "percentile": self.percentile(overall),
+            "cohort_size": np.full(n, len(self.cohort)),
+            "skills": skills,
+        }
 
-        logging.info("Feedback and confidence remark generated.")
+    def render(self, stats, i, hr_answers, tech_answers):
+        """Renders the report of session `i` from aggregate()'s output."""
+        if not stats["hr_count"][i]:
+            raise ValueError("HR scores or confidence scores are missing.")
+        if not stats["tech_count"][i]:
+            raise ValueError("Technical scores are missing.")
 
-        # -------final report ---
-        report = f"""
-==== INTERVIEW PERFORMANCE REPORT ====
+        avg_confidence = float(np.nan_to_num(stats["avg_confidence"][i]))
+        percentile = stats["percentile"][i]
+        cohort_line = (f"- Cohort Percentile: {percentile}th (vs. {stats['cohort_size'][i]} past candidates)\n"
+                       if not np.isnan(percentile) else "")
+        return REPORT_TEMPLATE.substitute(
+            avg_hr_score=stats["avg_hr_score"][i],
+            hr_spread=stats["hr_spread"][i],
+            avg_confidence=round(avg_confidence, 2),
+            hr_feedback=_numbered([a.feedback for a in hr_answers], "No HR feedback available."),
+            avg_tech_score=stats["avg_tech_score"][i],
+            tech_spread=stats["tech_spread"][i],
+            tech_feedback=_numbered([a.feedback for a in tech_answers], "No technical feedback available."),
+            skills="\n".join(f"- {name}: {score}/10" for name, score in stats["skills"][i]),
+            overall_score=stats["overall_score"][i],
+            cohort_line=cohort_line,
+            confidence_remark=_confidence_remark(avg_confidence),
+        )
 
-🧑‍💼 HR ROUND:
-- Average HR Score: {avg_hr_score}/10
-- Confidence Level: {avg_confidence}/10
-- Feedback:
-{hr_feedback_str}
+    def generate_many(self, sessions):
+        """Reports for many (hr_answers, tech_answers) sessions; failed ones become error strings."""
+        stats = self.aggregate(sessions)
+        reports = []
+        for i, (hr_answers, tech_answers) in enumerate(sessions):
+            try:
+                reports.append(self.render(stats, i, hr_answers, tech_answers))
+            except Exception as e:
+                reports.append(f"⚠️ Error generating report: {e}")
+        return reports
 
-💻 TECHNICAL ROUND:
-- Average Technical Score: {avg_tech_score}/10
-- Feedback:
-{tech_feedback_str}
 
-📊 OVERALL PERFORMANCE:
-- Final Score: {overall_score}/10
-- {confidence_remark}
+@traced("generate_report")
+def generate_report(hr_answers, tech_answers, cohort_scores=None, analytics=None, domain=None, session_id=None):
+    """
+    Generate final report with scores, feedback, and suggestions for improvement
+    from the session's HR and technical Answer records.
+    With an `analytics` store and `domain`, the percentile comes from the indexed
+    cohort of past sessions in that domain, and this session is added to it once
+    its report has rendered.
+    Includes logging and exception handling for better traceability.
+    """
+    try:
+        logging.info("Starting report generation...")
+        engine = ReportEngine(cohort_scores)
+        stats = engine.aggregate([(hr_answers, tech_answers)])
+        overall = stats['overall_score'][0]
+        logging.info(f"HR Round - Avg Score: {stats['avg_hr_score'][0]}, Avg Confidence: {stats['avg_confidence'][0]}")
+        logging.info(f"Technical Round - Avg Score: {stats['avg_tech_score'][0]}")
+        logging.info(f"Overall Score: {overall}")
 
-📌 Tips for Improvement:
-- Practice common interview questions to improve structure and clarity.
-- Strengthen your technical fundamentals in the predicted domain.
-- Improve confidence by doing more mock interviews.
+        if analytics is not None and domain and not np.isnan(overall):
+            percentile, cohort_size = analytics.percentile(domain, overall)
+            if percentile is not None:
+                stats['percentile'][0], stats['cohort_size'][0] = percentile, cohort_size
 
-Good luck with your preparation! 🚀
-"""
+        report = engine.render(stats, 0, hr_answers, tech_answers)
+        # Only a session that got its report joins the cohort
+        if analytics is not None and domain and session_id and not np.isnan(overall):
+            analytics.record_session(session_id, domain, overall)
         logging.info("Report generated successfully.")
         return report
 
     except Exception as e:
         logging.error(f"Error generating report: {e}")
         return f"⚠️ Error generating report: {e}"
+
+
+#---------weekly batch over archived sessions---------
+def main():
+    from session import InterviewSession
+
+    parser = argparse.ArgumentParser(description="Batch-generate reports for archived interview sessions.")
+    parser.add_argument("sessions_dir", help="Directory of .session snapshots (see SESSION_STORE)")
+    parser.add_argument("--out", default="reports.jsonl", help="JSON-lines output file")
+    args = parser.parse_args()
+
+    ids, sessions = [], []
+    for path in sorted(glob.glob(os.path.join(args.sessions_dir, "*.session"))):
+        try:
+            with open(path, "rb") as f:
+                session = InterviewSession.loads(f.read())
+        except Exception as e:
+            logging.warning(f"Skipping unreadable session {path}: {e}")
+            continue
+        ids.append(os.path.splitext(os.path.basename(path))[0])
+        sessions.append((session.hr_answers, session.tech_answers))
+
+    # The archived sessions form the cohort they are ranked against
+    engine = ReportEngine()
+    stats = engine.aggregate(sessions)
+    engine.cohort = np.sort(stats["overall_score"][~np.isnan(stats["overall_score"])])
+    stats["percentile"] = engine.percentile(stats["overall_score"])
+
+    with open(args.out, "w", encoding="utf-8") as out:
+        for i, (session_id, (hr_answers, tech_answers)) in enumerate(zip(ids, sessions)):
+            try:
+                report = engine.render(stats, i, hr_answers, tech_answers)
+            except Exception as e:
+                report = f"⚠️ Error generating report: {e}"
+            out.write(json.dumps({
+                "session_id": session_id,
+                "overall_score": None if np.isnan(stats["overall_score"][i]) else float(stats["overall_score"][i]),
+                "percentile": None if np.isnan(stats["percentile"][i]) else float(stats["percentile"][i]),
+                "report": report,
+            }, ensure_ascii=False) + "\n")
+    logging.info(f"Wrote {len(ids)} report(s) to {args.out}")
+
+
+if __name__ == "__main__":
+    configure_logging()
+    main()
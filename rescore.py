@@ -0,0 +1,310 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import argparse
+import statistics
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from telemetry import configure_logging
+from scheduler import llm_priority, BATCH
+
+logger = logging.getLogger(__name__)
+
+#---------batch re-scoring settings---------
+RESCORE_MANIFEST = os.getenv("RESCORE_MANIFEST", "rescore_manifest.sqlite")
+RESCORE_WORKERS = int(os.getenv("RESCORE_WORKERS", "4"))
+RESCORE_FLUSH_EVERY = int(os.getenv("RESCORE_FLUSH_EVERY", "50"))
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def audio_seconds(path):
+    from transcription import wav_duration
+    try:
+        return wav_duration(path)
+    except (ValueError, OSError):
+        return None
+
+
+def read_metadata(path):
+    """The sidecar voice.write_metadata left next to a recording, or None."""
+    try:
+        with open(f"{os.path.splitext(path)[0]}.json", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+#---------manifest---------
+class Manifest:
+    """
+    SQLite checkpoint of a re-scoring run. File hashes are cached by (path, size, mtime),
+    transcripts by (content hash, transcriber) so a new prompt version reuses them, and
+    finished gradings by (content hash, run key) so an interrupted run resumes where it stopped.
+    """
+
+    def __init__(self, path=RESCORE_MANIFEST):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER, mtime REAL, sha256 TEXT);
+            CREATE TABLE IF NOT EXISTS transcripts (sha256 TEXT, transcriber TEXT, transcript TEXT, audio_s REAL,
+                                                    PRIMARY KEY (sha256, transcriber));
+            CREATE TABLE IF NOT EXISTS scored (sha256 TEXT, run_key TEXT, path TEXT, score INTEGER, finished_at REAL,
+                                               PRIMARY KEY (sha256, run_key));
+        """)
+
+    def sha256(self, path):
+        stat = os.stat(path)
+        row = self.conn.execute("SELECT sha256 FROM files WHERE path = ? AND size = ? AND mtime = ?",
+                                (path, stat.st_size, stat.st_mtime)).fetchone()
+        if row:
+            return row[0]
+        digest = file_sha256(path)
+        self.conn.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)", (path, stat.st_size, stat.st_mtime, digest))
+        return digest
+
+    def transcript(self, sha256, transcriber):
+        row = self.conn.execute("SELECT transcript, audio_s FROM transcripts WHERE sha256 = ? AND transcriber = ?",
+                                (sha256, transcriber)).fetchone()
+        return row if row else (None, None)
+
+    def done(self, run_key):
+        return {row[0] for row in self.conn.execute("SELECT sha256 FROM scored WHERE run_key = ?", (run_key,))}
+
+    def record(self, results, transcriber, run_key):
+        """Stores a flushed batch: transcripts always, gradings only when they succeeded."""
+        self.conn.executemany("INSERT OR REPLACE INTO transcripts VALUES (?, ?, ?, ?)",
+                              [(r["sha256"], transcriber, r["transcript"], r["audio_s"]) for r in results])
+        self.conn.executemany("INSERT OR REPLACE INTO scored VALUES (?, ?, ?, ?, ?)",
+                              [(r["sha256"], run_key, r["path"], r["score"], time.time())
+                               for r in results if not r["failed"]])
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+
+#---------pipeline---------
+def run_key(transcriber):
+    """Identifies one grading setup: prompt/schema versions, model routing and transcriber."""
+    from hr import HR_EVAL_SCHEMA
+    from technical import TECH_EVAL_SCHEMA
+    from routing import get_router
+    return f"{HR_EVAL_SCHEMA.key}+{TECH_EVAL_SCHEMA.key}|{get_router().key}|{transcriber}"
+
+
+def scan(recordings_dir, manifest, run, default_question=None, limit=None):
+    """
+    Lists (path, sha256, metadata) still to grade for `run`, skipping finished files,
+    duplicate content and recordings without a sidecar; returns (jobs, skip counts).
+    """
+    done, seen = manifest.done(run), set()
+    jobs, skipped = [], {"done": 0, "duplicate": 0, "no_metadata": 0}
+    for name in sorted(os.listdir(recordings_dir)):
+        if not name.endswith(".wav"):
+            continue
+        path = os.path.join(recordings_dir, name)
+        metadata = read_metadata(path)
+        if metadata is None and default_question:
+            metadata = {"round": "hr", "question": default_question}
+        if metadata is None:
+            skipped["no_metadata"] += 1
+            continue
+        digest = manifest.sha256(path)
+        if digest in done:
+            skipped["done"] += 1
+        elif digest in seen:
+            skipped["duplicate"] += 1
+        else:
+            seen.add(digest)
+            jobs.append((path, digest, metadata))
+        if limit and len(jobs) >= limit:
+            break
+    manifest.conn.commit()
+    return jobs, skipped
+
+
+def rescore_file(path, sha256, metadata, cached_transcript=None, cached_audio_s=None):
+    """Transcribes (unless cached) and grades one recording; returns its result record."""
+    from transcription import transcribe
+    from hr import evaluate_hr_answer, HR_EVAL_SCHEMA
+    from technical import evaluate_technical_answer, TECH_EVAL_SCHEMA
+
+    transcript, audio_s, transcribe_s = cached_transcript, cached_audio_s, 0.0
+    if transcript is None:
+        started = time.perf_counter()
+        transcript = transcribe(path)
+        transcribe_s = time.perf_counter() - started
+        audio_s = audio_seconds(path)
+
+    started = time.perf_counter()
+    confidence, failed = None, False
+    tech = metadata.get("round") == "tech"
+    prompt = TECH_EVAL_SCHEMA.key if tech else HR_EVAL_SCHEMA.key
+    # Evaluation errors are raised rather than returned as feedback, so a failed grading is never
+    # mistaken for a score; the transcript is still recorded and the file retried on the next run
+    try:
+        with llm_priority(BATCH):  # contextvars do not cross into pool threads, so set it here
+            if tech:
+                score, feedback = evaluate_technical_answer(metadata["question"], transcript, metadata.get("domain"),
+                                                            raise_errors=True)
+            else:
+                score, feedback, confidence = evaluate_hr_answer(metadata["question"], transcript, raise_errors=True)
+    except Exception as e:
+        score, feedback, failed = 0, f"Evaluation failed: {e}", True
+    return {
+        "path": path, "sha256": sha256, "round": metadata.get("round", "hr"), "question": metadata["question"],
+        "domain": metadata.get("domain"), "session_id": metadata.get("session_id"), "prompt": prompt,
+        "transcript": transcript, "score": score, "feedback": feedback, "confidence": confidence,
+        "audio_s": audio_s, "transcribe_s": round(transcribe_s, 4),
+        "evaluate_s": round(time.perf_counter() - started, 4), "transcript_cached": cached_transcript is not None,
+        "failed": failed,
+    }
+
+
+def _flush(out_path, buffer, manifest, transcriber, run):
+    """Appends the buffered results to the JSONL file, then checkpoints them in the manifest."""
+    if not buffer:
+        return
+    with open(out_path, "a", encoding="utf-8") as out:
+        out.write("".join(json.dumps(record) + "\n" for record in buffer))
+    manifest.record(buffer, transcriber, run)
+    buffer.clear()
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(q * len(values)))], 3)
+
+
+def rescore(recordings_dir, out_path, manifest_path=RESCORE_MANIFEST, workers=RESCORE_WORKERS,
+            flush_every=RESCORE_FLUSH_EVERY, default_question=None, limit=None):
+    """Re-grades every archived recording not yet graded under the current run key; returns a summary."""
+    from transcription import EngineConfig
+
+    transcriber = repr(EngineConfig())
+    run = run_key(transcriber)
+    manifest = Manifest(manifest_path)
+    jobs, skipped = scan(recordings_dir, manifest, run, default_question, limit)
+    logger.warning(f"Run {run}: {len(jobs)} file(s) to grade, skipped {skipped}")
+
+    results, buffer, errors = [], [], 0  # errors: files that raised, so have no result record
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rescore") as pool:
+            pending, queue = set(), iter(jobs)
+            while True:
+                # Keep a bounded number of files in flight so memory stays flat on large archives
+                for path, digest, metadata in queue:
+                    pending.add(pool.submit(rescore_file, path, digest, metadata, *manifest.transcript(digest, transcriber)))
+                    if len(pending) >= workers * 2:
+                        break
+                if not pending:
+                    break
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    try:
+                        record = future.result()
+                    except Exception as e:
+                        errors += 1
+                        logger.error(f"Re-scoring failed: {e}")
+                        continue
+                    results.append(record)
+                    buffer.append(record)
+                if len(buffer) >= flush_every:
+                    _flush(out_path, buffer, manifest, transcriber, run)
+    finally:
+        _flush(out_path, buffer, manifest, transcriber, run)
+        manifest.close()
+
+    elapsed = time.perf_counter() - started
+    audio_total = sum(record["audio_s"] or 0 for record in results)
+    scores = {}
+    for record in results:
+        if not record["failed"]:
+            scores.setdefault(record["prompt"], []).append(record["score"])
+    failed = sum(record["failed"] for record in results)
+    fresh = [record["transcribe_s"] for record in results if not record["transcript_cached"]]
+    return {
+        # failed: the grader returned an error result; errors: transcribing or grading raised
+        "run_key": run, "graded": len(results) - failed, "failed": failed, "errors": errors, "skipped": skipped,
+        "seconds": round(elapsed, 2),
+        "files_per_min": round(len(results) / elapsed * 60, 1) if elapsed else None,
+        "audio_x_realtime": round(audio_total / elapsed, 1) if elapsed and audio_total else None,
+        "transcribe_s": {"p50": _percentile(fresh, 0.5), "p95": _percentile(fresh, 0.95)},
+        "evaluate_s": {"p50": _percentile([r["evaluate_s"] for r in results], 0.5),
+                       "p95": _percentile([r["evaluate_s"] for r in results], 0.95)},
+        "mean_score": {prompt: round(statistics.mean(values), 2) for prompt, values in scores.items()},
+    }
+
+
+#---------prompt comparison---------
+def load_results(path):
+    """Latest successful result per recording (by content hash) from a results file."""
+    results = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                if not record.get("failed"):
+                    results[record["sha256"]] = record
+    return results
+
+
+def compare(path_a, path_b):
+    """Agreement between two result files on the recordings they share."""
+    a, b = load_results(path_a), load_results(path_b)
+    shared = sorted(set(a) & set(b))
+    if not shared:
+        return {"n": 0}
+    xs, ys = [a[key]["score"] for key in shared], [b[key]["score"] for key in shared]
+    diffs = [abs(x - y) for x, y in zip(xs, ys)]
+    try:
+        correlation = round(statistics.correlation(xs, ys), 3)
+    except (statistics.StatisticsError, AttributeError):  # constant scores, or Python < 3.10
+        correlation = None
+    return {
+        "n": len(shared),
+        "prompts_a": sorted({a[key]["prompt"] for key in shared}),
+        "prompts_b": sorted({b[key]["prompt"] for key in shared}),
+        "mean_a": round(statistics.mean(xs), 2), "mean_b": round(statistics.mean(ys), 2),
+        "mean_abs_diff": round(statistics.mean(diffs), 2),
+        "changed_by_2_or_more": round(sum(d >= 2 for d in diffs) / len(diffs), 3),
+        "pearson": correlation,
+    }
+
+
+if __name__ == "__main__":
+    configure_logging(level=logging.WARNING)
+    parser = argparse.ArgumentParser(description="Offline re-scoring of archived interview recordings.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="Transcribe and grade every recording not yet graded by this setup")
+    run.add_argument("--recordings", default="recordings", help="Directory of archived .wav files and sidecars")
+    run.add_argument("--out", default="rescore_results.jsonl", help="JSONL file results are appended to")
+    run.add_argument("--manifest", default=RESCORE_MANIFEST, help="SQLite checkpoint shared between runs")
+    run.add_argument("--workers", type=int, default=RESCORE_WORKERS)
+    run.add_argument("--flush-every", type=int, default=RESCORE_FLUSH_EVERY, help="Results per bulk write")
+    run.add_argument("--limit", type=int, help="Grade at most this many files")
+    run.add_argument("--default-question", help="Grade recordings without a sidecar as HR answers to this question")
+    diff = commands.add_parser("compare", help="Compare the scores of two result files (e.g. two prompt versions)")
+    diff.add_argument("results_a")
+    diff.add_argument("results_b")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        summary = rescore(args.recordings, args.out, args.manifest, args.workers, args.flush_every,
+                          args.default_question, args.limit)
+    else:
+        summary = compare(args.results_a, args.results_b)
+    print(json.dumps(summary, indent=2))
@@ -0,0 +1,207 @@
+import os
+import json
+import time
+import logging
+import threading
+from collections import Counter
+from llm import DEFAULT_MODEL
+from prompts import normalize_transcript
+from parsing import IncompleteReplyError
+from telemetry import histogram, register_collector, current_session
+
+logger = logging.getLogger(__name__)
+
+#---------routing settings---------
+LLM_ROUTING = os.getenv("LLM_ROUTING", "1") == "1"  # 0 sends every call straight to DEFAULT_MODEL
+SMALL_MODEL = os.getenv("LLM_SMALL_MODEL", "llama3-8b-8192")
+LARGE_MODEL = os.getenv("LLM_LARGE_MODEL", DEFAULT_MODEL)
+ROUTER_MIN_WORDS = int(os.getenv("ROUTER_MIN_WORDS", "3"))  # shorter answers are scored locally
+# Small-model scores in this band are re-graded by the large model
+ROUTER_BORDERLINE_LOW = int(os.getenv("ROUTER_BORDERLINE_LOW", "4"))
+ROUTER_BORDERLINE_HIGH = int(os.getenv("ROUTER_BORDERLINE_HIGH", "6"))
+ROUTER_LOG = os.getenv("ROUTER_LOG")  # JSONL file of every routing decision, for offline analysis
+
+NO_ANSWER_FEEDBACK = "No answer was detected in the recording."
+SHORT_ANSWER_FEEDBACK = "The answer was too short to assess."
+
+ROUTE_SECONDS = histogram("llm_route_seconds", "Time to a final answer by routing decision", labels=("stage", "route"))
+
+
+class ModelRouter:
+    """
+    Picks the model for each LLM call. Empty or near-empty answers are scored locally
+    with no call at all; everything else goes to the small model first and is only
+    re-run on the large model when the result looks unreliable (a borderline score,
+    a reply still missing fields after the re-ask, a failed call). Every decision is logged with
+    its latency and, for escalations, both models' scores, so the savings can be
+    weighed against how often the two models disagree.
+    """
+
+    def __init__(self, small_model=SMALL_MODEL, large_model=LARGE_MODEL, enabled=LLM_ROUTING,
+                 min_words=ROUTER_MIN_WORDS, borderline=(ROUTER_BORDERLINE_LOW, ROUTER_BORDERLINE_HIGH),
+                 log_file=ROUTER_LOG):
+        self.small_model = small_model
+        self.large_model = large_model
+        self.enabled = enabled
+        self.min_words = min_words
+        self.borderline = borderline
+        self.log_file = log_file
+        self.decisions = Counter()  # (stage, route) -> count
+        self._lock = threading.Lock()
+
+    @property
+    def key(self):
+        """Names the routing setup, for cache keys and re-scoring run keys."""
+        return f"{self.small_model}>{self.large_model}" if self.enabled else self.large_model
+
+    @property
+    def first_model(self):
+        return self.small_model if self.enabled else self.large_model
+
+    #---------decisions---------
+    def quick_grade(self, schema, answer):
+        """Fields for an answer too short to be worth an LLM call, or None."""
+        if not self.enabled:
+            return None
+        words = len(normalize_transcript(answer).split())
+        if words >= self.min_words:
+            return None
+        feedback = NO_ANSWER_FEEDBACK if words == 0 else SHORT_ANSWER_FEEDBACK
+        return schema.with_defaults({"score": 0, "feedback": feedback})
+
+    def grading_escalation(self, schema, fields):
+        """Why a small-model grading should be re-run on the large model, or None."""
+        low, high = self.borderline
+        if any(name not in fields for name in schema.fields):
+            return "incomplete"
+        if low <= fields["score"] <= high:
+            return "borderline"
+        return None
+
+    def record(self, stage, route, seconds, reason=None, small=None, large=None):
+        """Logs one decision: route is "local", "small", "escalated" or "direct" (routing disabled)."""
+        with self._lock:
+            self.decisions[(stage, route)] += 1
+        ROUTE_SECONDS.observe(seconds, stage=stage, route=route)
+        logger.info(f"[route] {stage}: {route}{f' ({reason})' if reason else ''} in {seconds:.2f}s"
+                    f"{f' small={small}' if small is not None else ''}{f' large={large}' if large is not None else ''}")
+        if self.log_file:
+            entry = {"ts": round(time.time(), 3), "session_id": current_session(), "stage": stage, "route": route,
+                     "reason": reason, "seconds": round(seconds, 4), "small": small, "large": large,
+                     "small_model": self.small_model, "large_model": self.large_model}
+            try:
+                with self._lock, open(self.log_file, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(entry, default=str) + "\n")
+            except OSError as e:
+                logger.error(f"Could not write routing decision to {self.log_file}: {e}")
+
+    #---------routing---------
+    def route(self, stage, run, escalation, summary=None):
+        """
+        Runs `run(model)` on the small model and again on the large one when
+        `escalation(result)` names a reason (or the small call raised).
+        `summary(result)` picks what is logged for each model, e.g. the score.
+        """
+        summary = summary or (lambda result: None)
+        started = time.perf_counter()
+        if not self.enabled:
+            result = run(self.large_model)
+            self.record(stage, "direct", time.perf_counter() - started, large=summary(result))
+            return result
+        try:
+            small = run(self.small_model)
+            reason = escalation(small)
+        except IncompleteReplyError as e:
+            logger.warning(f"[route] {stage}: {e}; escalating.")
+            small, reason = None, "incomplete"
+        except Exception as e:
+            logger.warning(f"[route] {stage}: small model failed ({e}); escalating.")
+            small, reason = None, "error"
+        if reason is None:
+            self.record(stage, "small", time.perf_counter() - started, small=summary(small))
+            return small
+        result = run(self.large_model)
+        self.record(stage, "escalated", time.perf_counter() - started, reason,
+                    small=summary(small) if small is not None else None, large=summary(result))
+        return result
+
+    def local_grade(self, stage, schema, answer):
+        """quick_grade(), logged as a "local" decision when it applies."""
+        started = time.perf_counter()
+        fields = self.quick_grade(schema, answer)
+        if fields is not None:
+            self.record(stage, "local", time.perf_counter() - started, small=fields["score"])
+        return fields
+
+    def evaluate(self, stage, schema, answer, grade):
+        """Grades `answer` with `grade(model) -> fields`: locally when trivial, else small then large if needed."""
+        fields = self.local_grade(stage, schema, answer)
+        if fields is not None:
+            return fields
+        return self.route(stage, grade, lambda result: self.grading_escalation(schema, result),
+                          lambda result: result["score"])
+
+    def review(self, stage, schema, finish, grade, started):
+        """
+        Escalation check for a grading `first_model` already produced (e.g. streamed
+        to the candidate): `finish()` turns it into fields, which are returned unless
+        they are incomplete or unreliable, in which case the large model's grading is.
+        """
+        if not self.enabled:
+            fields = finish()
+            self.record(stage, "direct", time.perf_counter() - started, large=fields["score"])
+            return fields
+        try:
+            fields = finish()
+            reason = self.grading_escalation(schema, fields)
+        except IncompleteReplyError as e:
+            logger.warning(f"[route] {stage}: {e}; escalating.")
+            fields, reason = None, "incomplete"
+        if reason is None:
+            self.record(stage, "small", time.perf_counter() - started, small=fields["score"])
+            return fields
+        final = grade(self.large_model)
+        self.record(stage, "escalated", time.perf_counter() - started, reason,
+                    small=fields["score"] if fields is not None else None, large=final["score"])
+        return final
+
+    def stats(self):
+        with self._lock:
+            decisions = dict(self.decisions)
+        stages = {}
+        for (stage, route), count in decisions.items():
+            stages.setdefault(stage, {})[route] = count
+        for routes in stages.values():
+            routes["escalation_rate"] = round(routes.get("escalated", 0) / max(1, sum(routes.values())), 3)
+        return stages
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_router():
+    """Returns the process-wide model router."""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = ModelRouter()
+    return _router
+
+
+def routing_stats():
+    """Decision counts and escalation rate per stage."""
+    return get_router().stats()
+
+
+def _collect_routing():
+    if _router is None:
+        return []
+    with _router._lock:
+        decisions = dict(_router.decisions)
+    return [("llm_route_decisions_total", "counter", "Model routing decisions by stage and route",
+             [({"stage": stage, "route": route}, count) for (stage, route), count in decisions.items()])]
+
+
+register_collector(_collect_routing)
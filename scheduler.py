@@ -0,0 +1,181 @@
+import os
+import time
+import heapq
+import logging
+import itertools
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+logger = logging.getLogger(__name__)
+
+#---------rate limits of the shared API key (0 disables a limit)---------
+LLM_RPM = float(os.getenv("LLM_RPM", "30"))
+LLM_TPM = float(os.getenv("LLM_TPM", "6000"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "200"))
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "120"))
+# Completion tokens reserved per call until the real size is known
+LLM_RESERVED_COMPLETION_TOKENS = int(os.getenv("LLM_RESERVED_COMPLETION_TOKENS", "256"))
+
+# Priority classes, served lowest first
+INTERACTIVE, BACKGROUND, BATCH = 0, 1, 2
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background", BATCH: "batch"}
+
+_priority = ContextVar("llm_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def llm_priority(level):
+    """Runs the enclosed LLM calls at `level` (e.g. BACKGROUND for prefetch jobs)."""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority():
+    return _priority.get()
+
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token) used for budgeting."""
+    return max(1, len(text) // 4)
+
+
+class SchedulerOverloaded(Exception):
+    """Raised when a request is dropped because the queue is full or it waited too long."""
+
+
+class TokenBucket:
+    """Refills `per_minute` units evenly over a minute, holding at most one minute's worth."""
+
+    def __init__(self, per_minute):
+        self.rate = per_minute / 60.0
+        self.capacity = per_minute
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount, now):
+        """Seconds until `amount` units are available (0 when they are)."""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount):
+        self.level -= min(amount, self.capacity)
+
+    def give(self, amount):
+        self.level = min(self.capacity, self.level + amount)
+
+
+class LLMScheduler:
+    """
+    Admission control for every LLM call sharing one API key.
+    Calls queue by priority class (FIFO within a class) and are released only when
+    both the request and token buckets allow it, so bursts wait instead of failing
+    with 429s. Token reservations are estimates and are settled against the real
+    size once the reply is in. Calls are only dropped when the queue is full or a
+    call has waited longer than `max_wait`.
+    """
+
+    def __init__(self, requests_per_minute=LLM_RPM, tokens_per_minute=LLM_TPM,
+                 max_queue=LLM_MAX_QUEUE, max_wait=LLM_QUEUE_TIMEOUT):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._cond = threading.Condition()
+        self._waiting = []
+        self._tickets = itertools.count()
+        self._paused_until = 0.0
+        self._metrics = {
+            "admitted": 0, "dropped": 0, "coalesced": 0, "rate_limited": 0,
+            "wait_seconds_total": 0.0, "wait_seconds_max": 0.0, "queue_depth_max": 0,
+        }
+
+    def _delay(self, tokens, now):
+        delays = [self._paused_until - now]
+        if self.requests:
+            delays.append(self.requests.delay(1, now))
+        if self.tokens:
+            delays.append(self.tokens.delay(tokens, now))
+        return max(0.0, *delays)
+
+    def _drop(self, ticket, reason):
+        self._waiting.remove(ticket)
+        heapq.heapify(self._waiting)
+        self._metrics["dropped"] += 1
+        self._cond.notify_all()
+        logger.error(f"Dropped {PRIORITY_NAMES.get(ticket[0], ticket[0])} LLM call: {reason}")
+        raise SchedulerOverloaded(reason)
+
+    def acquire(self, tokens, priority=None):
+        """Blocks until a call of about `tokens` tokens may be sent; returns the seconds waited."""
+        priority = current_priority() if priority is None else priority
+        ticket = (priority, next(self._tickets))
+        enqueued = time.monotonic()
+        with self._cond:
+            if len(self._waiting) >= self.max_queue:
+                self._metrics["dropped"] += 1
+                raise SchedulerOverloaded(f"LLM queue is full ({self.max_queue} waiting)")
+            heapq.heappush(self._waiting, ticket)
+            self._metrics["queue_depth_max"] = max(self._metrics["queue_depth_max"], len(self._waiting))
+            while True:
+                now = time.monotonic()
+                delay = self._delay(tokens, now) if self._waiting[0] == ticket else None
+                if delay == 0.0:
+                    break
+                remaining = enqueued + self.max_wait - now
+                if remaining <= 0:
+                    self._drop(ticket, f"waited more than {self.max_wait:.0f}s in the LLM queue")
+                self._cond.wait(remaining if delay is None else min(delay, remaining))
+
+            heapq.heappop(self._waiting)
+            if self.requests:
+                self.requests.take(1)
+            if self.tokens:
+                self.tokens.take(tokens)
+            waited = time.monotonic() - enqueued
+            self._metrics["admitted"] += 1
+            self._metrics["wait_seconds_total"] += waited
+            self._metrics["wait_seconds_max"] = max(self._metrics["wait_seconds_max"], waited)
+            self._cond.notify_all()
+        if waited > 1:
+            logger.info(f"LLM call queued for {waited:.2f}s ({PRIORITY_NAMES.get(priority, priority)}).")
+        return waited
+
+    def settle(self, reserved, used):
+        """Corrects the token bucket once the real size of a call is known."""
+        if not self.tokens:
+            return
+        with self._cond:
+            if used < reserved:
+                self.tokens.give(reserved - used)
+            else:
+                self.tokens.take(used - reserved)
+            self._cond.notify_all()
+
+    def pause(self, seconds):
+        """Holds every queued call for `seconds`, e.g. after the API answers 429 with Retry-After."""
+        with self._cond:
+            self._metrics["rate_limited"] += 1
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        logger.warning(f"LLM rate limit hit; pausing the queue for {seconds:.1f}s.")
+
+    def record_coalesced(self):
+        with self._cond:
+            self._metrics["coalesced"] += 1
+
+    def metrics(self):
+        with self._cond:
+            metrics = dict(self._metrics)
+            metrics["queue_depth"] = len(self._waiting)
+            for level, name in PRIORITY_NAMES.items():
+                metrics[f"queue_depth_{name}"] = sum(1 for priority, _ in self._waiting if priority == level)
+        metrics["wait_seconds_avg"] = metrics["wait_seconds_total"] / metrics["admitted"] if metrics["admitted"] else 0.0
+        return metrics
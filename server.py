@@ -0,0 +1,679 @@
+import os
+import re
+import json
+import time
+import uuid
+import base64
+import logging
+import inspect
+import argparse
+import threading
+import contextvars
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from domain import identify_domain, get_client
+from hr import generate_hr_questions, evaluate_hr_answer, evaluate_hr_round
+from technical import generate_technical_questions, evaluate_technical_answer
+from report import generate_report
+from voice import transcribe_audio, load_wav_bytes
+from session import Answer, InterviewSession, get_session_store, new_session_id, valid_session_id, SESSION_TTL
+from analytics import get_analytics_store
+from startup import start_warmup, readiness, WARMUP_STEPS
+from telemetry import configure_logging, span, session_context, export_metrics, register_collector
+from prompts import session_usage
+
+logger = logging.getLogger(__name__)
+
+#---------server settings---------
+SERVER_HOST = os.getenv("SERVER_HOST", "127.0.0.1")
+SERVER_PORT = int(os.getenv("SERVER_PORT", "8000"))
+# Transcription runs on the CPU pool and LLM calls on their own pool, so each scales separately.
+# Several API processes can also share one transcription process (TRANSCRIBE_SERVER_ADDRESS).
+SERVER_CPU_WORKERS = int(os.getenv("SERVER_CPU_WORKERS", str(os.cpu_count() or 2)))
+SERVER_LLM_WORKERS = int(os.getenv("SERVER_LLM_WORKERS", "16"))
+SERVER_MAX_QUEUE = int(os.getenv("SERVER_MAX_QUEUE", "500"))  # unfinished jobs across all tenants
+TENANT_MAX_JOBS = int(os.getenv("TENANT_MAX_JOBS", "100"))  # unfinished jobs per tenant
+SERVER_JOB_TTL = int(os.getenv("SERVER_JOB_TTL", "3600"))  # seconds finished jobs stay readable
+SERVER_MAX_BODY = int(os.getenv("SERVER_MAX_BODY", str(25 * 1024 * 1024)))
+SERVER_MAX_WAIT = 30  # longest ?wait= a client may long-poll a job for
+# "tenant:key,tenant:key"; unset runs a single open "default" tenant
+SERVER_API_KEYS = os.getenv("SERVER_API_KEYS", "")
+
+CPU, LLM = "cpu", "llm"
+
+
+class APIError(Exception):
+    """An error reported to the client with an HTTP status."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+#---------job queue---------
+class Job:
+    __slots__ = ("id", "tenant", "task", "status", "result", "error", "future",
+                 "created", "started", "finished")
+
+    def __init__(self, tenant, task):
+        self.id = uuid.uuid4().hex
+        self.tenant = tenant
+        self.task = task
+        self.status = "queued"
+        self.result = None
+        self.error = None
+        self.future = Future()
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+
+    def view(self):
+        view = {"job_id": self.id, "task": self.task, "status": self.status}
+        if self.status == "done":
+            view["result"] = self.result
+        elif self.status == "failed":
+            view["error"] = self.error
+        if self.started:
+            view["queued_s"] = round(self.started - self.created, 3)
+        if self.finished:
+            view["run_s"] = round(self.finished - self.started, 3)
+        return view
+
+
+class JobQueue:
+    """
+    Runs jobs on named worker pools (CPU for transcription, LLM for model calls).
+    A job can wait for other jobs (`after`) without holding a worker, so chained work
+    such as transcribe -> evaluate never deadlocks the pools. Unfinished jobs are capped
+    globally and per tenant; finished jobs are kept for `ttl` seconds for polling.
+    """
+
+    def __init__(self, workers=None, max_queue=SERVER_MAX_QUEUE, tenant_limit=TENANT_MAX_JOBS, ttl=SERVER_JOB_TTL):
+        workers = workers or {CPU: SERVER_CPU_WORKERS, LLM: SERVER_LLM_WORKERS}
+        self.pools = {name: ThreadPoolExecutor(max_workers=n, thread_name_prefix=f"{name}-worker")
+                      for name, n in workers.items()}
+        self.max_queue = max_queue
+        self.tenant_limit = tenant_limit
+        self.ttl = ttl
+        self.jobs = {}
+        self.active = {}  # tenant -> unfinished jobs
+        self.counts = {"submitted": 0, "done": 0, "failed": 0, "rejected": 0}
+        self._lock = threading.Lock()
+
+    def submit(self, tenant, task, pool, fn, *args, after=(), on_done=None):
+        """Queues `fn(*args)` on `pool` once every job in `after` has finished; returns the Job."""
+        job = Job(tenant, task)
+        with self._lock:
+            self._purge()
+            if sum(self.active.values()) >= self.max_queue:
+                self.counts["rejected"] += 1
+                raise APIError(503, "Server is at capacity, retry shortly")
+            if self.active.get(tenant, 0) >= self.tenant_limit:
+                self.counts["rejected"] += 1
+                raise APIError(429, f"Tenant has {self.tenant_limit} unfinished jobs")
+            self.active[tenant] = self.active.get(tenant, 0) + 1
+            self.jobs[job.id] = job
+            self.counts["submitted"] += 1
+
+        context = contextvars.copy_context()
+        start = lambda: self.pools[pool].submit(context.run, self._run, job, fn, args, on_done)
+        waiting = [dep.future for dep in after if not dep.future.done()]
+        if not waiting:
+            start()
+            return job
+        remaining = [len(waiting)]
+        lock = threading.Lock()
+
+        def dependency_done(_):
+            with lock:
+                remaining[0] -= 1
+                ready = remaining[0] == 0
+            if ready:
+                start()
+
+        for future in waiting:
+            future.add_done_callback(dependency_done)
+        return job
+
+    def _run(self, job, fn, args, on_done):
+        job.status, job.started = "running", time.time()
+        try:
+            with span(f"job_{job.task}"):
+                job.result = fn(*args)
+            if on_done:
+                on_done(job.result)
+            job.status = "done"
+            job.future.set_result(job.result)
+        except Exception as e:
+            logger.error(f"Job {job.task} {job.id} failed: {e}")
+            job.status, job.error = "failed", str(e)
+            job.future.set_exception(e)
+        finally:
+            job.finished = time.time()
+            with self._lock:
+                self.active[job.tenant] -= 1
+                self.counts[job.status] += 1
+
+    def get(self, tenant, job_id):
+        job = self.jobs.get(job_id)
+        if job is None or job.tenant != tenant:
+            raise APIError(404, "Unknown job")
+        return job
+
+    def _purge(self):
+        cutoff = time.time() - self.ttl
+        for job_id in [job_id for job_id, job in self.jobs.items() if job.finished and job.finished < cutoff]:
+            del self.jobs[job_id]
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counts, unfinished=sum(self.active.values()),
+                        tenants_active=sum(1 for n in self.active.values() if n))
+
+    def shutdown(self):
+        for pool in self.pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+#---------interview service---------
+def _decode_audio(data):
+    """WAV bytes (raw or base64) -> Whisper-ready array."""
+    if isinstance(data, str):
+        data = base64.b64decode(data)
+    if not data:
+        raise APIError(400, "Empty audio")
+    try:
+        return load_wav_bytes(data)
+    except Exception as e:
+        raise APIError(400, f"Audio must be a WAV file: {e}")
+
+
+def _transcribe(audio):
+    return transcribe_audio(audio) if audio is not None else ""
+
+
+def _evaluate(round_name, question, transcript, domain, started):
+    if round_name == 'hr':
+        score, feedback, confidence = evaluate_hr_answer(question, transcript)
+    else:
+        (score, feedback), confidence = evaluate_technical_answer(question, transcript, domain), None
+    return {"transcript": transcript, "score": score, "feedback": feedback, "confidence": confidence,
+            "latency": round(time.perf_counter() - started, 3)}
+
+
+def _record_answer(session_id, domain, answer):
+    """Adds a graded answer to this server's cohort analytics store, when there is one."""
+    analytics = get_analytics_store()
+    if analytics is not None:
+        analytics.record_answer(session_id, domain, answer, answer.latency)
+
+
+def _report(hr_answers, tech_answers, domain=None, session_id=None):
+    hr_answers = [Answer.from_state(state) for state in hr_answers]
+    tech_answers = [Answer.from_state(state) for state in tech_answers]
+    return generate_report(hr_answers, tech_answers, analytics=get_analytics_store(),
+                           domain=domain, session_id=session_id)
+
+
+# Stateless tasks for thin clients: name -> (pool, function taking the JSON arguments)
+TASKS = {
+    "identify_domain": (LLM, lambda job_description, refresh=False: identify_domain(job_description, get_client(), refresh)),
+    "generate_hr_questions": (LLM, generate_hr_questions),
+    "generate_technical_questions": (LLM, generate_technical_questions),
+    "evaluate_hr_answer": (LLM, lambda question, answer: list(evaluate_hr_answer(question, answer))),
+    "evaluate_technical_answer": (LLM, lambda question, answer, domain: list(evaluate_technical_answer(question, answer, domain))),
+    "evaluate_hr_round": (LLM, lambda qa_pairs: [list(result) for result in evaluate_hr_round(qa_pairs)]),
+    "transcribe_audio": (CPU, lambda audio: _transcribe(_decode_audio(audio))),
+    "record_answer": (CPU, lambda session_id, domain, answer: _record_answer(session_id, domain, Answer.from_state(answer))),
+    "generate_report": (CPU, _report),
+}
+
+
+class InterviewService:
+    """
+    The interview flow as an API. Sessions are InterviewSession objects owned by a
+    tenant, snapshotted to the SESSION_STORE after every change when one is configured;
+    all heavy work (domain, questions, transcription, grading, report) runs as jobs.
+    """
+
+    def __init__(self, queue=None, store=None):
+        self.queue = queue or JobQueue()
+        self.store = store
+        self.sessions = {}  # session id -> [session, lock, last_used]
+        self.pending = {}  # session id -> answer jobs the report must wait for
+        self._lock = threading.Lock()
+
+    #---------sessions---------
+    def _entry(self, tenant, session_id):
+        if not valid_session_id(session_id):
+            raise APIError(404, "Unknown session")
+        with self._lock:
+            entry = self.sessions.get(session_id)
+            if entry is None and self.store:
+                try:
+                    session = self.store.load(session_id)
+                except Exception as e:
+                    logger.error(f"Failed to restore session {session_id}: {e}")
+                    session = None
+                if session is not None:
+                    entry = self.sessions[session_id] = [session, threading.Lock(), time.time()]
+            if entry is None or entry[0].tenant != tenant:
+                raise APIError(404, "Unknown session")
+            entry[2] = time.time()
+            return entry
+
+    def _save(self, session_id, session):
+        if self.store:
+            try:
+                self.store.save(session_id, session)
+            except Exception as e:
+                logger.error(f"Failed to snapshot session {session_id}: {e}")
+
+    def _update(self, tenant, session_id, change):
+        """Applies `change(session)` under the session's lock and snapshots the result."""
+        session, lock, _ = self._entry(tenant, session_id)
+        with lock:
+            result = change(session)
+            self._save(session_id, session)
+        return result
+
+    def _pending_jobs(self, session_id, add=None):
+        """
+        Unfinished answer jobs of a session, after adding `add`. Finished jobs have already
+        recorded their answer in the session, so they are dropped from `pending` here.
+        """
+        with self._lock:
+            jobs = [job for job in self.pending.pop(session_id, []) + ([add] if add else []) if not job.future.done()]
+            if jobs:
+                self.pending[session_id] = jobs
+            return jobs
+
+    def expire_sessions(self):
+        cutoff = time.time() - SESSION_TTL
+        with self._lock:
+            for session_id in [sid for sid, entry in self.sessions.items() if entry[2] < cutoff]:
+                del self.sessions[session_id]
+                self.pending.pop(session_id, None)
+
+    def create_session(self, tenant):
+        session_id, session = new_session_id(), InterviewSession()
+        session.tenant = tenant
+        with self._lock:
+            self.sessions[session_id] = [session, threading.Lock(), time.time()]
+        self._save(session_id, session)
+        return {"session_id": session_id, "stage": session.stage}
+
+    def session_view(self, tenant, session_id):
+        session, lock, _ = self._entry(tenant, session_id)
+        with lock:
+            return {
+                "session_id": session_id, "stage": session.stage, "domain": session.domain,
+                "hr": {"questions": len(session.hr_questions), "index": session.hr_index,
+                       "answered": len(session.hr_answers)},
+                "tech": {"questions": len(session.tech_questions), "index": session.tech_index,
+                         "answered": len(session.tech_answers)},
+                "pending_jobs": [job.id for job in self._pending_jobs(session_id)],
+                "usage": session_usage(session_id),
+            }
+
+    #---------flow---------
+    def submit_jd(self, tenant, session_id, job_description, refresh=False):
+        if not isinstance(job_description, str) or not job_description.strip():
+            raise APIError(400, "job_description is required")
+
+        def finish(domain):
+            def change(session):
+                session.jd, session.domain, session.stage = job_description, domain, 'confirm_domain'
+            self._update(tenant, session_id, change)
+            return domain
+
+        self._entry(tenant, session_id)  # ownership check before queueing
+        return self.queue.submit(tenant, "identify_domain", LLM, identify_domain, job_description, get_client(), refresh,
+                                 on_done=finish)
+
+    def confirm_domain(self, tenant, session_id, domain=None):
+        """Settles the domain and queues both question sets; returns their jobs."""
+        def change(session):
+            if session.stage != 'confirm_domain':
+                raise APIError(409, f"Session is in stage '{session.stage}'")
+            if domain:
+                session.domain = domain
+            session.stage = 'hr_round'
+            return session.domain
+
+        settled = self._update(tenant, session_id, change)
+
+        def store(field):
+            return lambda questions: self._update(tenant, session_id, lambda s: setattr(s, field, questions))
+
+        return [
+            self.queue.submit(tenant, "generate_hr_questions", LLM, generate_hr_questions,
+                              on_done=store("hr_questions")),
+            self.queue.submit(tenant, "generate_technical_questions", LLM, generate_technical_questions, settled,
+                              on_done=store("tech_questions")),
+        ]
+
+    @staticmethod
+    def _current(session):
+        """(round, index, question) the candidate should answer next, moving through the rounds."""
+        if session.stage == 'hr_round':
+            if not session.hr_questions:
+                raise APIError(409, "Questions are still being generated")
+            if session.hr_index < len(session.hr_questions):
+                return 'hr', session.hr_index, session.hr_questions[session.hr_index]
+            session.stage = 'tech_round'
+        if session.stage == 'tech_round':
+            if not session.tech_questions:
+                raise APIError(409, "Questions are still being generated")
+            if session.tech_index < len(session.tech_questions):
+                return 'tech', session.tech_index, session.tech_questions[session.tech_index]
+            session.stage = 'result_wait'
+        if session.stage in ('result_wait', 'done'):
+            return None
+        raise APIError(409, f"No question in stage '{session.stage}'")
+
+    def question(self, tenant, session_id):
+        current = self._update(tenant, session_id, self._current)
+        if current is None:
+            return {"done": True}
+        round_name, index, question = current
+        return {"done": False, "round": round_name, "index": index, "question": question}
+
+    def submit_answer_jobs(self, tenant, round_name, question, domain, audio=None, transcript=None, on_done=None):
+        """Transcription on the CPU pool, then grading on the LLM pool; returns the grading job."""
+        started = time.perf_counter()
+        after = ()
+        if transcript is None:
+            transcription = self.queue.submit(tenant, "transcribe_audio", CPU, _transcribe, audio)
+            after = (transcription,)
+            get_transcript = transcription.future.result
+        else:
+            get_transcript = lambda: transcript
+        return self.queue.submit(tenant, f"evaluate_{round_name}_answer", LLM,
+                                 lambda: _evaluate(round_name, question, get_transcript(), domain, started),
+                                 after=after, on_done=on_done)
+
+    def answer(self, tenant, session_id, audio=None, transcript=None):
+        """Grades the answer to the current question in the background and moves the session on."""
+        if audio is None and transcript is None:
+            raise APIError(400, "Send WAV audio or a JSON transcript")
+
+        def advance(session):
+            current = self._current(session)
+            if current is None:
+                raise APIError(409, "Interview is complete")
+            if current[0] == 'hr':
+                session.hr_index += 1
+            else:
+                session.tech_index += 1
+            return current, session.domain
+
+        (round_name, index, question), domain = self._update(tenant, session_id, advance)
+
+        def record(result):
+            answer = Answer(round_name, index, question, result["transcript"], result["score"],
+                            result["feedback"], result["confidence"], result["latency"])
+            self._update(tenant, session_id, lambda session: session.record_answer(answer))
+            _record_answer(session_id, domain, answer)
+
+        job = self.submit_answer_jobs(tenant, round_name, question, domain, audio, transcript, on_done=record)
+
+        self._pending_jobs(session_id, add=job)
+        return job, round_name, index
+
+    def evaluations(self, tenant, session_id):
+        session, lock, _ = self._entry(tenant, session_id)
+        with lock:
+            answers = session.hr_answers + session.tech_answers
+            return [{name: getattr(answer, name) for name in Answer.__slots__} for answer in answers]
+
+    def report(self, tenant, session_id):
+        """Queues the report once every outstanding answer of the session has been graded."""
+        after = self._pending_jobs(session_id)
+
+        def build():
+            session, lock, _ = self._entry(tenant, session_id)
+            with lock:
+                hr_answers = [answer.to_state() for answer in session.hr_answers]
+                tech_answers = [answer.to_state() for answer in session.tech_answers]
+                domain = session.domain
+            return _report(hr_answers, tech_answers, domain, session_id)
+
+        def finish(report):
+            def change(session):
+                session.add_message(report, False)
+                session.stage = 'done'
+            self._update(tenant, session_id, change)
+
+        self._entry(tenant, session_id)
+        return self.queue.submit(tenant, "generate_report", CPU, build, after=after, on_done=finish)
+
+    def run_task(self, tenant, name, args):
+        if name not in TASKS:
+            raise APIError(404, f"Unknown task '{name}'")
+        pool, fn = TASKS[name]
+        try:
+            inspect.signature(fn).bind(**args)
+        except TypeError as e:
+            raise APIError(400, f"Bad arguments for '{name}': {e}")
+        return self.queue.submit(tenant, name, pool, lambda: fn(**args))
+
+    def run_answer_task(self, tenant, round_name, args):
+        """Stateless transcribe -> grade for thin clients that keep their own session."""
+        audio = _decode_audio(args["audio"]) if args.get("audio") else None
+        if audio is None and args.get("transcript") is None:
+            raise APIError(400, "audio or transcript is required")
+        return self.submit_answer_jobs(tenant, round_name, args.get("question", ""), args.get("domain"),
+                                       audio, args.get("transcript"))
+
+
+#---------HTTP API---------
+def _api_keys(spec=SERVER_API_KEYS):
+    keys = {}
+    for pair in filter(None, (item.strip() for item in spec.split(","))):
+        tenant, _, key = pair.partition(":")
+        keys[key] = tenant
+    return keys
+
+
+ROUTES = [
+    ("GET", r"/health", "health"),
+    ("GET", r"/ready", "ready"),
+    ("GET", r"/metrics", "metrics"),
+    ("POST", r"/sessions", "create_session"),
+    ("GET", r"/sessions/(?P<sid>\w+)", "get_session"),
+    ("POST", r"/sessions/(?P<sid>\w+)/jd", "post_jd"),
+    ("POST", r"/sessions/(?P<sid>\w+)/confirm", "post_confirm"),
+    ("GET", r"/sessions/(?P<sid>\w+)/question", "get_question"),
+    ("POST", r"/sessions/(?P<sid>\w+)/answer", "post_answer"),
+    ("GET", r"/sessions/(?P<sid>\w+)/evaluations", "get_evaluations"),
+    ("POST", r"/sessions/(?P<sid>\w+)/report", "post_report"),
+    ("GET", r"/jobs/(?P<job_id>\w+)", "get_job"),
+    ("POST", r"/tasks/(?P<name>\w+)", "post_task"),
+]
+ROUTES = [(method, re.compile(f"^{pattern}$"), name) for method, pattern, name in ROUTES]
+
+
+def make_handler(service, api_keys):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            logger.debug(f"{self.address_string()} {format % args}")
+
+        #---------plumbing---------
+        def _send(self, status, body, content_type="application/json"):
+            data = body if isinstance(body, bytes) else json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _tenant(self):
+            if not api_keys:
+                return "default"
+            key = self.headers.get("X-API-Key") or self.headers.get("Authorization", "").removeprefix("Bearer ")
+            if key not in api_keys:
+                raise APIError(401, "Missing or invalid API key")
+            return api_keys[key]
+
+        def _body(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            if length > SERVER_MAX_BODY:
+                raise APIError(413, f"Body larger than {SERVER_MAX_BODY} bytes")
+            return self.rfile.read(length) if length else b""
+
+        def _json(self, body):
+            if not body:
+                return {}
+            try:
+                data = json.loads(body)
+            except ValueError:
+                raise APIError(400, "Body must be JSON")
+            if not isinstance(data, dict):
+                raise APIError(400, "Body must be a JSON object")
+            return data
+
+        def _dispatch(self, method):
+            url = urlparse(self.path)
+            self.query = parse_qs(url.query)
+            try:
+                body = self._body() if method == "POST" else b""
+                for route_method, pattern, name in ROUTES:
+                    match = pattern.match(url.path)
+                    if match and route_method == method:
+                        tenant = None if name in ("health", "ready", "metrics") else self._tenant()
+                        with session_context(match.groupdict().get("sid")):
+                            status, result = getattr(self, name)(tenant, body, **match.groupdict())
+                        break
+                else:
+                    raise APIError(404, "Not found")
+            except APIError as e:
+                status, result = e.status, {"error": str(e)}
+            except Exception as e:
+                logger.error(f"{method} {url.path} failed: {e}")
+                status, result = 500, {"error": "Internal server error"}
+            if isinstance(result, str):
+                self._send(status, result.encode(), "text/plain; version=0.0.4")
+            else:
+                self._send(status, result)
+
+        def do_GET(self):
+            self._dispatch("GET")
+
+        def do_POST(self):
+            self._dispatch("POST")
+
+        #---------endpoints---------
+        def health(self, tenant, body):
+            return 200, {"ok": True, "jobs": service.queue.stats()}
+
+        def ready(self, tenant, body):
+            report = readiness()
+            return (200 if report.get("ready") else 503), report
+
+        def metrics(self, tenant, body):
+            return 200, export_metrics()
+
+        def create_session(self, tenant, body):
+            return 201, service.create_session(tenant)
+
+        def get_session(self, tenant, body, sid):
+            return 200, service.session_view(tenant, sid)
+
+        def post_jd(self, tenant, body, sid):
+            args = self._json(body)
+            job = service.submit_jd(tenant, sid, args.get("job_description"), bool(args.get("refresh")))
+            return 202, {"job": job.view()}
+
+        def post_confirm(self, tenant, body, sid):
+            jobs = service.confirm_domain(tenant, sid, self._json(body).get("domain"))
+            return 202, {"jobs": [job.view() for job in jobs]}
+
+        def get_question(self, tenant, body, sid):
+            return 200, service.question(tenant, sid)
+
+        def post_answer(self, tenant, body, sid):
+            if self.headers.get("Content-Type", "").startswith("application/json"):
+                job, round_name, index = service.answer(tenant, sid, transcript=self._json(body).get("transcript"))
+            else:
+                job, round_name, index = service.answer(tenant, sid, audio=_decode_audio(body))
+            return 202, {"job": job.view(), "round": round_name, "index": index}
+
+        def get_evaluations(self, tenant, body, sid):
+            return 200, {"answers": service.evaluations(tenant, sid)}
+
+        def post_report(self, tenant, body, sid):
+            return 202, {"job": service.report(tenant, sid).view()}
+
+        def get_job(self, tenant, body, job_id):
+            job = service.queue.get(tenant, job_id)
+            try:
+                wait = float(self.query.get("wait", ["0"])[0] or 0)
+            except ValueError:
+                raise APIError(400, "wait must be a number of seconds")
+            if not 0 <= wait < float("inf"):
+                raise APIError(400, "wait must be a number of seconds")
+            wait = min(wait, SERVER_MAX_WAIT)
+            if wait:
+                try:
+                    job.future.exception(timeout=wait)  # long-poll; the outcome is read from the job
+                except Exception:
+                    pass
+            return 200, job.view()
+
+        def post_task(self, tenant, body, name):
+            args = self._json(body)
+            if name in ("transcribe_and_evaluate_hr", "transcribe_and_evaluate_technical"):
+                job = service.run_answer_task(tenant, "hr" if name.endswith("_hr") else "tech", args)
+            else:
+                job = service.run_task(tenant, name, args)
+            return 202, {"job": job.view()}
+
+    return Handler
+
+
+def _collect_jobs(service):
+    def collect():
+        stats = service.queue.stats()
+        return [("server_jobs_total", "counter", "Interview server jobs by outcome",
+                 [({"outcome": outcome}, stats[outcome]) for outcome in ("submitted", "done", "failed", "rejected")]),
+                ("server_jobs_unfinished", "gauge", "Queued or running interview server jobs",
+                 [({}, stats["unfinished"])])]
+    return collect
+
+
+def serve(host=SERVER_HOST, port=SERVER_PORT):
+    service = InterviewService(store=get_session_store())
+    register_collector(_collect_jobs(service))
+    # No microphone on the server: skip the recording stack
+    start_warmup([step for step in WARMUP_STEPS if step[0] != "audio"])
+    httpd = ThreadingHTTPServer((host, port), make_handler(service, _api_keys()))
+    httpd.daemon_threads = True
+
+    def expire():
+        while True:
+            time.sleep(300)
+            service.expire_sessions()
+
+    threading.Thread(target=expire, name="session-expiry", daemon=True).start()
+    logger.info(f"Interview API listening on http://{host}:{port}")
+    try:
+        httpd.serve_forever()
+    finally:
+        service.queue.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless interview API: sessions, jobs and worker pools.")
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    args = parser.parse_args()
+    serve(args.host, args.port)
+
+
+if __name__ == "__main__":
+    configure_logging()
+    main()
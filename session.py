@@ -0,0 +1,209 @@
+import os
+import re
+import json
+import zlib
+import uuid
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Bump when the slot layout changes; older snapshots are then ignored instead of misread.
+SCHEMA_VERSION = 3
+SESSION_STORE = os.getenv("SESSION_STORE")  # directory path or redis:// URL; unset disables snapshots
+SESSION_TTL = int(os.getenv("SESSION_TTL", str(24 * 3600)))
+
+
+class Answer:
+    """
+    One graded answer. `confidence` is only set for HR answers; `latency` is the
+    seconds spent transcribing and grading it, when known.
+    """
+
+    __slots__ = ("round", "index", "question", "transcript", "score", "feedback", "confidence", "latency")
+
+    def __init__(self, round, index, question, transcript="", score=0, feedback="", confidence=None, latency=None):
+        self.round = round
+        self.index = index
+        self.question = question
+        self.transcript = transcript
+        self.score = score
+        self.feedback = feedback
+        self.confidence = confidence
+        self.latency = latency
+
+    def to_state(self):
+        return [getattr(self, name) for name in self.__slots__]
+
+    @classmethod
+    def from_state(cls, state):
+        return cls(*state)
+
+    def __repr__(self):
+        return f"Answer({self.round} Q{self.index + 1}, score={self.score})"
+
+
+class InterviewSession:
+    """
+    Everything the interview flow needs to resume, in one compact object.
+    Serialises to a positional list (see to_state), so snapshots stay small and
+    carry no LLM or transcription work that would have to be redone.
+    """
+
+    __slots__ = (
+        "stage", "jd", "domain",
+        "hr_questions", "hr_index", "tech_questions", "tech_index",
+        "hr_answers", "tech_answers", "hr_pending", "retry_answer",
+        "chat_history", "recording", "audio_file", "recording_duration",
+        "hr_batch_mode", "background_eval", "streaming_transcription", "in_memory_audio", "stream_feedback",
+        "tenant",
+    )
+
+    def __init__(self):
+        self.stage = 'start'
+        self.jd = ''
+        self.domain = ''
+        self.hr_questions = []
+        self.hr_index = 0
+        self.tech_questions = []
+        self.tech_index = 0
+        self.hr_answers = []
+        self.tech_answers = []
+        self.hr_pending = []  # (question, transcript) pairs awaiting batch grading
+        self.retry_answer = None  # low-scoring HR answer the candidate may re-record
+        self.chat_history = []  # (message, is_user) pairs
+        self.recording = False
+        self.audio_file = None
+        self.recording_duration = 20
+        self.hr_batch_mode = os.getenv("HR_BATCH_EVAL", "0") == "1"
+        # Off by default: grading in the background serves the next question at once, but the
+        # candidate then gets no streamed feedback and no offer to re-record a low-scoring answer
+        self.background_eval = os.getenv("BACKGROUND_EVAL", "0") == "1"
+        self.streaming_transcription = os.getenv("STREAMING_TRANSCRIPTION", "0") == "1"
+        self.in_memory_audio = os.getenv("IN_MEMORY_AUDIO", "1") == "1"
+        self.stream_feedback = os.getenv("STREAM_FEEDBACK", "1") == "1"
+        self.tenant = ''  # owner of sessions created through the API server
+
+    #---------chat and answers---------
+    def add_message(self, msg, is_user):
+        self.chat_history.append((msg, is_user))
+
+    def answers(self, round_name):
+        return self.hr_answers if round_name == 'hr' else self.tech_answers
+
+    def record_answer(self, answer):
+        """Stores an answer in question order, replacing an earlier attempt at the same question."""
+        answers = self.answers(answer.round)
+        for i, existing in enumerate(answers):
+            if existing.index == answer.index:
+                answers[i] = answer
+                return
+            if existing.index > answer.index:
+                answers.insert(i, answer)
+                return
+        answers.append(answer)
+
+    #---------serialisation---------
+    def to_state(self):
+        state = []
+        for name in self.__slots__:
+            value = getattr(self, name)
+            if name in ("hr_answers", "tech_answers"):
+                value = [answer.to_state() for answer in value]
+            elif name == "retry_answer" and value is not None:
+                value = value.to_state()
+            state.append(value)
+        return [SCHEMA_VERSION, state]
+
+    @classmethod
+    def from_state(cls, data):
+        version, state = data
+        if version != SCHEMA_VERSION:
+            raise ValueError(f"Unsupported session schema version {version}")
+        session = cls.__new__(cls)
+        for name, value in zip(cls.__slots__, state):
+            if name in ("hr_answers", "tech_answers"):
+                value = [Answer.from_state(answer) for answer in value]
+            elif name == "retry_answer" and value is not None:
+                value = Answer.from_state(value)
+            elif name in ("hr_pending", "chat_history"):
+                value = [tuple(item) for item in value]
+            setattr(session, name, value)
+        return session
+
+    def dumps(self):
+        """Compact snapshot: zlib-compressed JSON of the positional state."""
+        return zlib.compress(json.dumps(self.to_state(), separators=(",", ":")).encode("utf-8"))
+
+    @classmethod
+    def loads(cls, data):
+        return cls.from_state(json.loads(zlib.decompress(data).decode("utf-8")))
+
+
+#---------snapshot stores---------
+def new_session_id():
+    return uuid.uuid4().hex
+
+
+def valid_session_id(session_id):
+    return isinstance(session_id, str) and re.fullmatch(r"[0-9a-f]{32}", session_id) is not None
+
+
+class FileSessionStore:
+    """One snapshot file per session under `directory`, replaced atomically on save."""
+
+    def __init__(self, directory="sessions"):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, session_id):
+        if not valid_session_id(session_id):
+            raise ValueError(f"Invalid session id: {session_id!r}")
+        return os.path.join(self.directory, f"{session_id}.session")
+
+    def save(self, session_id, session):
+        path = self._path(session_id)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(session.dumps())
+        os.replace(tmp_path, path)
+
+    def load(self, session_id):
+        path = self._path(session_id)
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            return InterviewSession.loads(f.read())
+
+
+class RedisSessionStore:
+    """Snapshots kept in Redis (or any server speaking its protocol) with a TTL."""
+
+    def __init__(self, url, ttl=SESSION_TTL):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+
+    def save(self, session_id, session):
+        if not valid_session_id(session_id):
+            raise ValueError(f"Invalid session id: {session_id!r}")
+        self.client.set(f"interview:{session_id}", session.dumps(), ex=self.ttl)
+
+    def load(self, session_id):
+        if not valid_session_id(session_id):
+            raise ValueError(f"Invalid session id: {session_id!r}")
+        data = self.client.get(f"interview:{session_id}")
+        return InterviewSession.loads(data) if data else None
+
+
+def get_session_store(location=SESSION_STORE):
+    """Builds the store configured by SESSION_STORE, or returns None when snapshots are off."""
+    if not location:
+        return None
+    try:
+        if location.startswith(("redis://", "rediss://", "unix://")):
+            return RedisSessionStore(location)
+        return FileSessionStore(location)
+    except Exception as e:
+        logger.error(f"Session store '{location}' unavailable, snapshots disabled: {e}")
+        return None
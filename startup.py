@@ -0,0 +1,145 @@
+import os
+import time
+import logging
+import threading
+from telemetry import span, register_collector, set_readiness_probe
+
+logger = logging.getLogger(__name__)
+
+#---------warmup settings---------
+WARMUP_ON_BOOT = os.getenv("WARMUP_ON_BOOT", "1") == "1"
+
+
+#---------warmup steps (imports stay inside, so importing this module is free)---------
+def _warm_llm():
+    from llm import get_gateway
+    get_gateway()
+
+
+def _warm_audio():
+    from voice import preload_audio_stack
+    preload_audio_stack()
+
+
+def _warm_transcription():
+    from transcription import warmup
+    warmup()
+
+
+def _warm_question_bank():
+    from question_bank import get_question_bank
+    get_question_bank()
+
+
+def _warm_domain_classifier():
+    from domain_classifier import get_domain_classifier
+    get_domain_classifier()
+
+
+# Cheapest first, so the components the first screens need are ready soonest
+WARMUP_STEPS = [
+    ("llm", _warm_llm),
+    ("domain_classifier", _warm_domain_classifier),
+    ("question_bank", _warm_question_bank),
+    ("audio", _warm_audio),
+    ("transcription", _warm_transcription),
+]
+
+
+class Warmup:
+    """
+    Runs warmup steps in order on one background thread and tracks each component's
+    state (pending, running, ready or failed). Nothing blocks on it: every component
+    still loads itself on first use, so warmup only moves that cost off the request path.
+    The process is ready once every step succeeded.
+    """
+
+    def __init__(self, steps=None):
+        self.steps = list(steps or WARMUP_STEPS)
+        self.state = {name: "pending" for name, _ in self.steps}
+        self.seconds = {}
+        self.errors = {}
+        self._done = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="warmup", daemon=True)
+                self._thread.start()
+        return self
+
+    def _run(self):
+        started = time.perf_counter()
+        for name, step in self.steps:
+            self.state[name] = "running"
+            step_started = time.perf_counter()
+            try:
+                with span(f"warmup_{name}"):
+                    step()
+                self.state[name] = "ready"
+            except Exception as e:
+                self.errors[name] = str(e)
+                self.state[name] = "failed"
+                logger.error(f"Warmup of {name} failed: {e}")
+            self.seconds[name] = round(time.perf_counter() - step_started, 3)
+        self._done.set()
+        logger.info(f"Warmup finished in {time.perf_counter() - started:.2f}s: {self.seconds}")
+
+    def is_ready(self, name=None):
+        if name is not None:
+            return self.state.get(name) == "ready"
+        return all(state == "ready" for state in self.state.values())
+
+    def pending(self):
+        return [name for name, state in self.state.items() if state in ("pending", "running")]
+
+    def wait(self, timeout=None):
+        """Blocks until every step has finished (successfully or not); returns is_ready()."""
+        self._done.wait(timeout)
+        return self.is_ready()
+
+    def status(self):
+        return {"ready": self.is_ready(), "components": dict(self.state),
+                "seconds": dict(self.seconds), "errors": dict(self.errors)}
+
+
+_warmup = None
+_warmup_lock = threading.Lock()
+
+
+def get_warmup(steps=None):
+    """Returns the process-wide warmup, creating (but not starting) it on first use."""
+    global _warmup
+    if _warmup is None:
+        with _warmup_lock:
+            if _warmup is None:
+                _warmup = Warmup(steps)
+    return _warmup
+
+
+def start_warmup(steps=None):
+    """Kicks off the process-wide warmup once (over `steps`, default WARMUP_STEPS); later calls just return it."""
+    warmup = get_warmup(steps)
+    if WARMUP_ON_BOOT:
+        warmup.start()
+    return warmup
+
+
+def _collect_readiness():
+    if _warmup is None:
+        return []
+    return [("app_component_ready", "gauge", "1 once a component has been warmed up",
+             [({"component": name}, int(state == "ready")) for name, state in _warmup.state.items()])]
+
+
+def readiness():
+    """Readiness report for load balancers (served on /ready by the metrics endpoint)."""
+    if not WARMUP_ON_BOOT:
+        return {"ready": True, "components": {}, "warmup": "disabled"}
+    return get_warmup().status()
+
+
+register_collector(_collect_readiness)
+set_readiness_probe(readiness)
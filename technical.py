@@ -1,51 +1,84 @@
-import os
 import re
+import time
+import random
 import logging
-from dotenv import load_dotenv
-from groq import Groq
+from llm import get_gateway
+from cache import ResponseCache, make_key
+from parsing import Schema, Field, complete_structured, finish_structured
+from prompts import PromptTemplate, normalize_transcript
+from routing import get_router
+from question_bank import get_question_bank
+
+# Bump when the generation prompt changes so cached pools are regenerated.
+TECH_PROMPT_VERSION = "v2"
+# Questions are generated once per domain into a larger pool and sampled per session.
+QUESTION_POOL_SIZE = 20
+question_cache = ResponseCache("technical_questions")
+
+
+QUESTION_POOL_PROMPT = PromptTemplate(
+    "technical_questions", TECH_PROMPT_VERSION,
+    instructions="as a technical interviewer, write unique, non-repetitive interview questions for the "
+                 "job domain given, at beginner to intermediate level and relevant for a mock interview. "
+                 "Return only a numbered list of questions.",
+    body="Generate {count} questions for the job domain: '{domain}'.",
+)
+
+
+def _question_pool(domain, pool_size, model):
+    content = get_gateway().complete(
+        model=model, messages=QUESTION_POOL_PROMPT.messages(count=pool_size, domain=domain)
+    )
+    logging.debug(f"Raw response from model: {content}")
+
+    return [
+        q.strip().split('. ', 1)[-1]
+        for q in content.split('\n')
+        if q.strip() and re.match(r"^\d+\.", q.strip())
+    ]
 
-# Setup logging
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
+def _request_question_pool(domain, pool_size):
+    """
+    Asks the LLM for `pool_size` questions and returns them parsed from the numbered list.
+    The small model writes them unless it returns fewer than half as many.
+    """
+    return get_router().route(
+        "technical_questions", lambda model: _question_pool(domain, pool_size, model),
+        lambda pool: "short list" if len(pool) < pool_size // 2 else None, len
+    )
 
-load_dotenv()
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
 
 def generate_technical_questions(domain, num_questions=10):
     """
     Generate a list of beginner to intermediate-level technical interview questions
     based on the specified job domain.
+    Questions come from the precomputed question bank when it covers the domain (thin
+    domains are topped up in the background); otherwise they are sampled from a cached
+    per-domain LLM pool, which is then added to the bank.
     """
     logging.info(f"Generating {num_questions} technical questions for domain: '{domain}'")
 
-    prompt = (
-        f"You are a technical interviewer. Generate {num_questions} unique, non-repetitive, "
-        f"interview questions related to the job domain: '{domain}'. "
-        f"Make sure these are beginner to intermediate level and relevant for a mock interview. "
-        f"Return only a numbered list of questions. Do not include any introduction, explanations, or extra text."
-    )
+    pool_size = max(QUESTION_POOL_SIZE, num_questions)
 
     try:
-        response = client.chat.completions.create(
-            model="llama3-70b-8192",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant that generates technical interview questions."},
-                {"role": "user", "content": prompt}
-            ]
+        bank = get_question_bank()
+        if bank.size(domain) >= num_questions:
+            questions = bank.sample(domain, num_questions)
+            bank.top_up_async(domain)
+            logging.info(f"Served {len(questions)} questions from the question bank.")
+            return questions
+
+        key = make_key(domain, get_router().key, TECH_PROMPT_VERSION, pool_size)
+        pool = question_cache.get_or_compute(
+            key, lambda: _request_question_pool(domain, pool_size), cacheable=bool
         )
 
-        content = response.choices[0].message.content.strip()
-        logging.debug(f"Raw response from model: {content}")
-
-        questions = [
-            q.strip().split('. ', 1)[-1]
-            for q in content.split('\n')
-            if q.strip() and re.match(r"^\d+\.", q.strip())
-        ]
-
-        if questions:
+        if pool:
+            bank.add_questions(domain, pool)
+            questions = random.sample(pool, min(num_questions, len(pool)))
             logging.info(f"Generated {len(questions)} questions successfully.")
-            return questions[:num_questions]
+            return questions
         else:
             logging.warning("No questions extracted from the model response.")
             return ["Failed to generate questions."]
@@ -54,48 +87,94 @@ def generate_technical_questions(domain, num_questions=10):
         logging.error(f"Error generating technical questions: {e}")
         return [f"Error generating questions: {e}"]
 
-def evaluate_technical_answer(question, answer, domain):
+# Structured reply of the technical evaluator; bump the version whenever the prompt changes
+TECH_EVAL_SCHEMA = Schema("technical_evaluation", version="v3", fields=[
+    Field("score", int, "<integer score out of 10>", minimum=0, maximum=10, default=0),
+    Field("feedback", str, '"<1-2 lines of feedback>"', default="No feedback provided."),
+])
+
+TECH_EVAL_PROMPT = PromptTemplate(
+    "technical_evaluation", TECH_EVAL_SCHEMA.version,
+    instructions=f"as a technical interview evaluator, score the answer out of 10 based on:\n"
+                 f"1. Correctness\n"
+                 f"2. Keyword relevance\n\n"
+                 f"{TECH_EVAL_SCHEMA.instructions()} Example:\n"
+                 f'{{"score": 7, "feedback": "Correct concept but lacks depth."}}',
+    body="Domain: {domain}\nQuestion: {question}\nCandidate's Answer: {answer}",
+)
+
+def _technical_messages(question, answer, domain):
+    return TECH_EVAL_PROMPT.messages(domain=domain, question=question, answer=normalize_transcript(answer))
+
+def _grade_technical(question, answer, domain, model):
+    fields, result = complete_structured(
+        get_gateway(), _technical_messages(question, answer, domain), TECH_EVAL_SCHEMA, model=model
+    )
+    logging.debug(f"Raw evaluation result ({model}): {result}")
+    return fields
+
+def evaluate_technical_answer(question, answer, domain, raise_errors=False):
     """
-    Evaluate a technical answer using an LLM. Returns a score out of 10 and feedback.
+    Evaluate a technical answer using an LLM. Returns a score out of 10 and feedback;
+    a failed evaluation scores zero with an error message, or raises when `raise_errors` is set.
     Evaluation is based on correctness and presence of relevant keywords.
+    Fields missing from the reply are re-asked for individually rather than defaulted.
+    Empty answers are scored without a call; the rest go to the small model first and
+    borderline results are re-graded by the large one (see routing.py).
     """
     logging.info(f"Assessing technical answer for domain '{domain}'")
     logging.debug(f"Question: {question}")
     logging.debug(f"Answer: {answer}")
 
-    prompt = (
-        f"You are evaluating a technical interview answer.\n\n"
-        f"Domain: {domain}\n"
-        f"Question: {question}\n"
-        f"Candidate's Answer: {answer}\n\n"
-        f"Evaluate this answer out of 10 based on:\n"
-        f"1. Correctness\n"
-        f"2. Keyword relevance\n\n"
-        f"Return strictly the score (out of 10) and 1-2 lines of feedback. Example:\n"
-        f"Score: 7/10\nFeedback: Correct concept but lacks depth."
-    )
-
     try:
-        response = client.chat.completions.create(
-            model="llama3-70b-8192",
-            messages=[
-                {"role": "system", "content": "You are a technical interview evaluator."},
-                {"role": "user", "content": prompt}
-            ]
+        fields = get_router().evaluate(
+            "technical_evaluation", TECH_EVAL_SCHEMA, answer,
+            lambda model: _grade_technical(question, answer, domain, model)
         )
 
-        result = response.choices[0].message.content.strip()
-        logging.debug(f"Raw evaluation result: {result}")
-
-        score_match = re.search(r"Score:\s*(\d+)/10", result)
-        feedback_match = re.search(r"Feedback:\s*(.+)", result, re.DOTALL)
-
-        score = int(score_match.group(1)) if score_match else 0
-        feedback = feedback_match.group(1).strip() if feedback_match else "No feedback provided."
+        score, feedback = fields["score"], fields["feedback"]
 
         logging.info(f"Evaluation complete. Score: {score}, Feedback: {feedback}")
         return score, feedback
 
     except Exception as e:
         logging.error(f"Error evaluating technical answer: {e}")
+        if raise_errors:
+            raise
         return 0, f"Error evaluating technical answer: {e}"
+
+def stream_evaluate_technical_answer(question, answer, domain):
+    """
+    Streaming variant of evaluate_technical_answer.
+    Yields (text, fields) as tokens arrive, where `fields` gains score/feedback as soon as
+    their JSON values are complete. The last item carries the final values.
+    """
+    logging.info(f"Streaming technical assessment for domain '{domain}'")
+    router = get_router()
+    fields = router.local_grade("technical_evaluation", TECH_EVAL_SCHEMA, answer)
+    if fields is not None:
+        yield "", fields
+        return
+
+    parser = TECH_EVAL_SCHEMA.stream_parser()
+    messages = _technical_messages(question, answer, domain)
+    text = ""
+    started = time.perf_counter()
+
+    try:
+        gateway = get_gateway()
+        for chunk in gateway.stream(model=router.first_model, messages=messages):
+            text += chunk
+            yield text, parser.feed(chunk)
+        parser.close()
+        fields = router.review("technical_evaluation", TECH_EVAL_SCHEMA,
+                               lambda: finish_structured(gateway, messages, text, TECH_EVAL_SCHEMA,
+                                                         model=router.first_model),
+                               lambda model: _grade_technical(question, answer, domain, model), started)
+    except Exception as e:
+        logging.error(f"Error evaluating technical answer: {e}")
+        yield text, {"score": 0, "feedback": f"Error evaluating technical answer: {e}"}
+        return
+
+    logging.info(f"Evaluation complete. Score: {fields['score']}, Feedback: {fields['feedback']}")
+    yield text, fields
@@ -0,0 +1,322 @@
+import os
+import sys
+import json
+import time
+import bisect
+import logging
+import threading
+import functools
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+logger = logging.getLogger(__name__)
+
+#---------telemetry settings---------
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FILE = os.getenv("LOG_FILE", "interview_bot.log")  # empty string logs to the console only
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))  # serves /metrics on 127.0.0.1 when set
+METRICS_FILE = os.getenv("METRICS_FILE")  # Prometheus text snapshot written by write_metrics()
+PROFILE_SESSIONS = os.getenv("PROFILE_SESSIONS", "0") == "1"  # profile every session, not just ?profile=1
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+#---------logging---------
+_logging_configured = False
+
+
+def configure_logging(level=LOG_LEVEL, log_file=LOG_FILE):
+    """One logging setup for the whole process (console plus optional file); later calls are no-ops."""
+    global _logging_configured
+    if _logging_configured:
+        return
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        handlers.append(logging.FileHandler(log_file))
+    logging.basicConfig(level=level, format="%(asctime)s - %(levelname)s - %(name)s - %(message)s",
+                        handlers=handlers, force=True)
+    _logging_configured = True
+
+
+#---------metrics---------
+def _label_value(value):
+    """Escapes a label value for the text exposition format: backslash, double quote and newline."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_label_value(value)}"' for name, value in labels) + "}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus model, keyed by label values."""
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):  # larger values only count towards +Inf
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def collect(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+        for key, values in sorted(series.items()):
+            labels = list(zip(self.label_names, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_label_text(labels + [('le', bound)])} {cumulative}")
+            lines.append(f"{self.name}_bucket{_label_text(labels + [('le', '+Inf')])} {values[-1]}")
+            lines.append(f"{self.name}_sum{_label_text(labels)} {values[-2]:.6f}")
+            lines.append(f"{self.name}_count{_label_text(labels)} {values[-1]}")
+        return lines
+
+
+_histograms = {}
+_collectors = []
+_registry_lock = threading.Lock()
+
+
+def histogram(name, help, labels=(), buckets=DEFAULT_BUCKETS):
+    """Returns the process-wide histogram `name`, creating it on first use."""
+    with _registry_lock:
+        if name not in _histograms:
+            _histograms[name] = Histogram(name, help, labels, buckets)
+        return _histograms[name]
+
+
+def register_collector(collect):
+    """
+    Adds a callable producing (name, type, help, [(labels_dict, value)]) tuples at
+    export time, for state other modules already track (queue depth, cache hits...).
+    """
+    _collectors.append(collect)
+
+
+def export_metrics():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for hist in list(_histograms.values()):
+        lines += hist.collect()
+    for collect in _collectors:
+        try:
+            for name, kind, help, samples in collect():
+                lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+                lines += [f"{name}{_label_text(sorted(labels.items()))} {value}" for labels, value in samples]
+        except Exception as e:
+            logger.error(f"Metrics collector failed: {e}")
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics(path=METRICS_FILE):
+    """Writes a metrics snapshot to `path` atomically (for node_exporter's textfile collector)."""
+    if not path:
+        return
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(export_metrics())
+    os.replace(tmp_path, path)
+
+
+_metrics_server = None
+_readiness_probe = None
+
+
+def set_readiness_probe(probe):
+    """Registers a callable returning {"ready": bool, ...} for the /ready endpoint."""
+    global _readiness_probe
+    _readiness_probe = probe
+
+
+def start_metrics_server(port=METRICS_PORT, host="127.0.0.1"):
+    """
+    Serves /metrics (and /ready, 200 or 503 from the readiness probe) on a local port
+    once per process; a no-op without a port.
+    """
+    global _metrics_server
+    if not port or _metrics_server is not None:
+        return _metrics_server
+    with _registry_lock:
+        if _metrics_server is not None:
+            return _metrics_server
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                path = self.path.split("?")[0]
+                if path == "/metrics":
+                    status, content_type, body = 200, "text/plain; version=0.0.4", export_metrics().encode()
+                elif path == "/ready":
+                    report = _readiness_probe() if _readiness_probe else {"ready": True}
+                    status, content_type = (200 if report.get("ready") else 503), "application/json"
+                    body = json.dumps(report).encode()
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        try:
+            _metrics_server = ThreadingHTTPServer((host, port), Handler)
+        except OSError as e:
+            logger.warning(f"Metrics endpoint not started on {host}:{port}: {e}")
+            _metrics_server = False
+            return None
+        threading.Thread(target=_metrics_server.serve_forever, name="metrics", daemon=True).start()
+        logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+    return _metrics_server
+
+
+#---------spans---------
+SPAN_SECONDS = histogram("interview_span_seconds", "Duration of instrumented operations", labels=("span",))
+
+_session = ContextVar("telemetry_session", default=None)
+_session_totals = OrderedDict()  # session id -> Counter of seconds per span
+_SESSION_TOTALS_MAX = 1000
+_totals_lock = threading.Lock()
+
+
+@contextmanager
+def session_context(session_id):
+    """Attributes the spans of the enclosed code (and jobs submitted from it) to `session_id`."""
+    token = _session.set(session_id)
+    try:
+        yield
+    finally:
+        _session.reset(token)
+
+
+def current_session():
+    """The session id set by the innermost session_context(), or None."""
+    return _session.get()
+
+
+def session_timings(session_id):
+    """Seconds spent per span for one session, largest first."""
+    with _totals_lock:
+        return dict(_session_totals.get(session_id, Counter()).most_common())
+
+
+@contextmanager
+def span(name):
+    """Times the enclosed block into interview_span_seconds{span=name} and the current session's totals."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        SPAN_SECONDS.observe(elapsed, span=name)
+        session_id = _session.get()
+        if session_id is not None:
+            with _totals_lock:
+                totals = _session_totals.pop(session_id, None) or Counter()
+                totals[name] += elapsed
+                _session_totals[session_id] = totals
+                while len(_session_totals) > _SESSION_TOTALS_MAX:
+                    _session_totals.popitem(last=False)
+        logger.debug(f"span {name} took {elapsed:.3f}s")
+
+
+def traced(name):
+    """Decorator form of span(); generator functions are timed until they are exhausted."""
+    def decorate(fn):
+        if fn.__code__.co_flags & 0x20:  # generator function
+            @functools.wraps(fn)
+            def generator(*args, **kwargs):
+                with span(name):
+                    yield from fn(*args, **kwargs)
+            return generator
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+#---------sampling profiler---------
+class SamplingProfiler:
+    """
+    Samples one thread's Python stack every `interval` seconds and counts the stacks
+    in collapsed ("folded") form, ready for flamegraph.pl or speedscope.
+    """
+
+    def __init__(self, thread_id=None, interval=PROFILE_INTERVAL):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._sample, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.stacks
+
+    def dump(self, path):
+        """Appends the collected stacks to a folded-stack file."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            for stack, count in self.stacks.items():
+                f.write(f"{stack} {count}\n")
+
+
+@contextmanager
+def profiled(session_id, enabled=True, directory=PROFILE_DIR):
+    """Samples the current thread while the block runs and appends to <directory>/<session_id>.folded."""
+    if not enabled:
+        yield
+        return
+    profiler = SamplingProfiler().start()
+    try:
+        yield
+    finally:
+        profiler.stop()
+        try:
+            profiler.dump(os.path.join(directory, f"{session_id}.folded"))
+        except OSError as e:
+            logger.error(f"Could not write profile for session {session_id}: {e}")
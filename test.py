@@ -1,14 +1,15 @@
 import streamlit
 from streamlit_audiorecorder import audiorecorder
 import streamlit as st
+from voice import load_wav_bytes, transcribe_audio
 
 st.title("HR Q1: Why do you want this job?")
 
 # Record
 audio = audiorecorder("Click to record", "Click to stop")
 
-# Playback
+# Playback, then transcribe straight from memory (no hr_answer.wav round-trip)
 if audio:
     st.audio(audio.tobytes(), format="audio/wav")
-    with open("hr_answer.wav", "wb") as f:
-        f.write(audio.tobytes())
+    transcript = transcribe_audio(load_wav_bytes(audio.tobytes()))
+    st.write(transcript)
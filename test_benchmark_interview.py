@@ -0,0 +1,66 @@
+import json
+import numpy as np
+import httpx
+import pytest
+from benchmark_interview import FakeLLMServer, WavMicrophone, summarise, MAX_ANSWER_SECONDS
+
+MESSAGES = [{"role": "system", "content": "Task: identify the job title."},
+            {"role": "user", "content": "We need a Python developer."}]
+
+
+@pytest.fixture
+def server():
+    server = FakeLLMServer(latency=0, rpm=2).start()
+    yield server
+    server.stop()
+
+
+def test_fake_server_answers_like_the_chat_api(server):
+    reply = httpx.post(f"{server.url}/chat/completions", json={"model": "m", "messages": MESSAGES}).json()
+    assert reply["choices"][0]["message"]["content"]
+    assert reply["usage"]["total_tokens"] == reply["usage"]["prompt_tokens"] + reply["usage"]["completion_tokens"]
+    assert server.stats["requests"] == 1
+
+
+def test_fake_server_streams_and_rate_limits(server):
+    with httpx.stream("POST", f"{server.url}/chat/completions",
+                      json={"model": "m", "messages": MESSAGES, "stream": True}) as response:
+        events = [line[6:] for line in response.iter_lines() if line.startswith("data: ")]
+    assert events[-1] == "[DONE]"
+    text = "".join(json.loads(event)["choices"][0]["delta"]["content"] for event in events[:-1])
+    assert text.strip()
+
+    # rpm=2: the stream and this call use up the minute, the next one is throttled
+    assert httpx.post(f"{server.url}/chat/completions", json={"model": "m", "messages": MESSAGES}).status_code == 200
+    limited = httpx.post(f"{server.url}/chat/completions", json={"model": "m", "messages": MESSAGES})
+    assert limited.status_code == 429
+    assert float(limited.headers["retry-after"]) > 0
+    assert server.stats["rate_limited"] == 1
+
+
+def test_microphone_replays_clips_in_turn():
+    clips = [np.full(100, 0.1, dtype="float32"), np.full(50, 0.2, dtype="float32")]
+    microphone = WavMicrophone(clips)
+    assert microphone.rec(80).shape == (80, 1)
+    assert float(microphone.rec(80)[0, 0]) == pytest.approx(0.2)
+    blocks = []
+    with microphone.InputStream(samplerate=1000, blocksize=100, callback=lambda block, *_: blocks.append(block)):
+        pass
+    audio = np.concatenate(blocks)
+    # The clip, then silence past the longest answer window so capture ends on a pause
+    assert len(audio) == MAX_ANSWER_SECONDS * 1000 + 1000
+    assert float(np.abs(audio[:100]).min()) == pytest.approx(0.1) and not audio[100:].any()
+
+
+def test_summarise_reports_stage_percentiles():
+    results = [
+        {"samples": [("start", 0.1), ("start", 0.3), ("candidate", 2.0)], "completed": 1,
+         "peak_rss_mb": 300.0, "errors": []},
+        {"samples": [("start", 0.2), ("candidate", 4.0)], "completed": 0,
+         "peak_rss_mb": 310.0, "errors": ["candidate 1: no report produced"]},
+    ]
+    summary = summarise(results, wall_seconds=30)
+    assert summary["stages"]["start"] == {"n": 3, "p50_ms": 200.0, "p95_ms": 290.0, "p99_ms": 298.0}
+    assert list(summary["stages"]) == ["start", "candidate"]
+    assert summary["completed"] == 1 and summary["candidates_per_min"] == 2.0
+    assert summary["errors"] == ["candidate 1: no report produced"]
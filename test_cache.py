@@ -0,0 +1,45 @@
+import time
+from cache import ResponseCache, make_key
+
+
+def test_lru_evicts_the_least_recently_used():
+    cache = ResponseCache("test_lru", max_entries=2, disk_path=None)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+
+
+def test_expired_entries_are_misses(monkeypatch):
+    cache = ResponseCache("test_ttl", ttl=60, disk_path=None)
+    cache.set("a", 1)
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 120)
+    assert cache.get("a") is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_disk_tier_survives_a_new_process(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    ResponseCache("test_disk", disk_path=path).set("a", {"title": "Data Engineer"})
+    cache = ResponseCache("test_disk", disk_path=path)
+    assert cache.get("a") == {"title": "Data Engineer"}
+    assert cache.stats()["disk_hits"] == 1
+    assert ResponseCache("test_other", disk_path=path).get("a") is None
+
+
+def test_get_or_compute_only_stores_cacheable_values():
+    cache = ResponseCache("test_compute", disk_path=None)
+    calls = []
+    compute = lambda: calls.append(1) or ""
+    cache.get_or_compute("a", compute, cacheable=bool)
+    cache.get_or_compute("a", compute, cacheable=bool)
+    assert len(calls) == 2
+    assert cache.get_or_compute("b", lambda: "x") == cache.get_or_compute("b", compute) == "x"
+
+
+def test_make_key_normalises_text():
+    assert make_key("Senior  Python\nDeveloper", "v1") == make_key("senior python developer", "v1")
+    assert make_key("a", "v1") != make_key("a", "v2")
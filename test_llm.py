@@ -0,0 +1,49 @@
+import pytest
+from llm import LLMGateway, FakeBackend, LLMError
+from scheduler import LLMScheduler
+
+MESSAGES = [{"role": "user", "content": "Name one sorting algorithm."}]
+TPM = 6_000_000  # large enough that refill during a test is negligible
+
+
+class FailingBackend(FakeBackend):
+    def complete(self, messages, model, timeout, **kwargs):
+        raise ValueError("bad request")
+
+
+class BrokenStreamBackend(FakeBackend):
+    def stream(self, messages, model, timeout, **kwargs):
+        yield "Quick"
+        raise ConnectionError("stream dropped")
+
+
+def _gateway(backend):
+    return LLMGateway(backend, max_retries=0, scheduler=LLMScheduler(requests_per_minute=0, tokens_per_minute=TPM))
+
+
+def test_successful_call_keeps_only_the_tokens_used():
+    gateway = _gateway(FakeBackend(latency=0, responder=lambda messages, model: "Merge sort"))
+    gateway.complete(MESSAGES)
+    assert TPM - 100 < gateway.scheduler.tokens.level < TPM
+
+
+def test_failed_call_releases_its_reservation():
+    gateway = _gateway(FailingBackend(latency=0))
+    with pytest.raises(LLMError):
+        gateway.complete(MESSAGES)
+    assert gateway.scheduler.tokens.level == pytest.approx(TPM)
+
+
+def test_broken_stream_keeps_only_what_was_streamed():
+    gateway = _gateway(BrokenStreamBackend(latency=0))
+    with pytest.raises(LLMError):
+        list(gateway.stream(MESSAGES))
+    assert TPM - 100 < gateway.scheduler.tokens.level < TPM
+
+
+def test_abandoned_stream_settles_its_reservation():
+    gateway = _gateway(FakeBackend(latency=0, responder=lambda messages, model: "Quick sort and merge sort " * 50))
+    chunks = gateway.stream(MESSAGES)
+    next(chunks)
+    chunks.close()
+    assert TPM - 100 < gateway.scheduler.tokens.level < TPM
@@ -0,0 +1,102 @@
+import pytest
+from parsing import Schema, Field, IncompleteReplyError, finish_structured, complete_structured
+
+SCHEMA = Schema("test_evaluation", version="t1", fields=[
+    Field("score", int, "<integer score out of 10>", minimum=0, maximum=10, default=0),
+    Field("feedback", str, '"<feedback>"', default="No feedback provided."),
+    Field("confidence", str, '"<Low, Medium or High>"', choices=("Low", "Medium", "High"), default="Low"),
+])
+
+
+class RecordingGateway:
+    """Answers complete() from a list of canned replies and keeps the requests."""
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.requests = []
+
+    def complete(self, messages, **kwargs):
+        self.requests.append(messages)
+        return self.replies.pop(0)
+
+
+def test_clean_json():
+    result = SCHEMA.parse('{"score": 7, "feedback": "Good.", "confidence": "High"}')
+    assert result.values == {"score": 7, "feedback": "Good.", "confidence": "High"}
+    assert not result.missing and not result.repaired
+
+
+def test_repairs_fenced_single_quoted_json():
+    result = SCHEMA.parse("```json\n{'score': '8/10', 'feedback': 'Fine', 'confidence': 'medium',}\n```")
+    assert result.values == {"score": 8, "feedback": "Fine", "confidence": "Medium"}
+    assert result.repaired
+
+
+def test_labelled_fallback():
+    result = SCHEMA.parse("Score: 6\nFeedback: Decent structure.\nConfidence: low")
+    assert result.values["score"] == 6
+    assert result.values["confidence"] == "Low"
+
+
+def test_score_is_clamped():
+    assert SCHEMA.parse('{"score": 14}').values["score"] == 10
+    assert SCHEMA.parse('{"score": -3}').values["score"] == 0
+
+
+def test_missing_fields_are_reported():
+    result = SCHEMA.parse('{"score": 5}')
+    assert result.missing == ["feedback", "confidence"]
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ('He said "hi"', 'He said "hi"'),
+    ('"quoted"', "quoted"),
+    ('"He said "hi""', 'He said "hi"'),
+    ('  plain  ', "plain"),
+    ('"unbalanced', '"unbalanced'),
+])
+def test_coerce_keeps_inner_quotes(raw, expected):
+    assert SCHEMA.fields["feedback"].coerce(raw) == expected
+
+
+def test_coerce_rejects_empty_and_unknown_choice():
+    with pytest.raises(ValueError):
+        SCHEMA.fields["feedback"].coerce('""')
+    with pytest.raises(ValueError):
+        SCHEMA.fields["confidence"].coerce("Maybe")
+
+
+def test_parse_many_numbers_items():
+    results = SCHEMA.parse_many('[{"item": 2, "score": 4, "feedback": "b", "confidence": "Low"},'
+                                ' {"item": 1, "score": 9, "feedback": "a", "confidence": "High"}]')
+    assert results[1].values["score"] == 9
+    assert results[2].values["score"] == 4
+
+
+def test_stream_parser_yields_fields_before_the_reply_ends():
+    parser = SCHEMA.stream_parser()
+    fields = {}
+    for chunk in ['{"sco', 're": 7, "feed', 'back": "Clear', ' answer", ']:
+        fields = parser.feed(chunk)
+    assert fields == {"score": 7, "feedback": "Clear answer"}
+
+
+def test_reask_resends_the_original_conversation():
+    messages = [{"role": "system", "content": "Grade it."}, {"role": "user", "content": "Question: Q\nAnswer: A"}]
+    gateway = RecordingGateway('{"score": 6, "confidence": "High"}', '{"feedback": "Needs examples."}')
+    fields, _ = complete_structured(gateway, messages, SCHEMA)
+    assert fields == {"score": 6, "feedback": "Needs examples.", "confidence": "High"}
+    followup = gateway.requests[1]
+    assert followup[:2] == messages
+    assert followup[2] == {"role": "assistant", "content": '{"score": 6, "confidence": "High"}'}
+    assert followup[3]["role"] == "user" and '"feedback"' in followup[3]["content"]
+
+
+def test_reask_after_empty_reply_and_raise_when_still_missing():
+    messages = [{"role": "user", "content": "Question: Q\nAnswer: A"}]
+    gateway = RecordingGateway("not json at all")
+    with pytest.raises(IncompleteReplyError) as error:
+        finish_structured(gateway, messages, "", SCHEMA)
+    assert gateway.requests[0][:1] == messages
+    assert len(gateway.requests[0]) == 2
+    assert error.value.missing == ["score", "feedback", "confidence"]
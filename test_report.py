@@ -0,0 +1,53 @@
+import numpy as np
+from analytics import AnalyticsStore
+from report import ReportEngine, generate_report
+from session import Answer
+
+
+def _answers(round_name, scores, confidence=None):
+    return [Answer(round_name, i, f"Q{i}", score=score, feedback=f"Feedback {i}", confidence=confidence)
+            for i, score in enumerate(scores)]
+
+
+def test_percentile_rank_within_the_cohort():
+    engine = ReportEngine([2, 4, 6, 8, float("nan")])
+    assert engine.percentile([1, 4, 5, 8, 9]).tolist() == [0.0, 50.0, 50.0, 100.0, 100.0]
+
+
+def test_percentile_without_a_cohort_is_nan():
+    assert np.isnan(ReportEngine().percentile([5])).all()
+
+
+def test_aggregate_groups_per_session_and_round():
+    stats = ReportEngine([5.0]).aggregate([
+        (_answers('hr', [6, 8], "High"), _answers('tech', [4])),
+        (_answers('hr', [10], "Low"), _answers('tech', [2, 4])),
+    ])
+    assert stats["avg_hr_score"].tolist() == [7.0, 10.0]
+    assert stats["avg_tech_score"].tolist() == [4.0, 3.0]
+    assert stats["overall_score"].tolist() == [5.5, 6.5]
+    assert stats["percentile"].tolist() == [100.0, 100.0]
+    assert stats["hr_spread"][0] == 1.0
+
+
+def test_report_needs_both_rounds():
+    assert generate_report(_answers('hr', [7], "High"), []).startswith("⚠️ Error generating report")
+    report = generate_report(_answers('hr', [7], "High"), _answers('tech', [5]), cohort_scores=[4, 8])
+    assert "Final Score: 6.0/10" in report
+    assert "Cohort Percentile: 50.0th" in report
+
+
+def test_session_joins_the_cohort_only_after_its_report_renders(tmp_path, monkeypatch):
+    analytics = AnalyticsStore(str(tmp_path / "analytics.sqlite"))
+    hr_answers, tech_answers = _answers('hr', [7], "High"), _answers('tech', [5])
+
+    def broken_render(self, *args):
+        raise RuntimeError("template error")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(ReportEngine, "render", broken_render)
+        assert generate_report(hr_answers, tech_answers, analytics=analytics, domain="Backend",
+                               session_id="s1").startswith("⚠️ Error generating report")
+    assert analytics.percentile("Backend", 6.0) == (None, 0)
+    generate_report(hr_answers, tech_answers, analytics=analytics, domain="Backend", session_id="s1")
+    assert analytics.percentile("Backend", 6.0)[1] == 1
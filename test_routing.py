@@ -0,0 +1,82 @@
+import time
+import pytest
+from parsing import Schema, Field, IncompleteReplyError
+from routing import ModelRouter, NO_ANSWER_FEEDBACK, SHORT_ANSWER_FEEDBACK
+
+SCHEMA = Schema("test_grading", version="t1", fields=[
+    Field("score", int, "<integer score out of 10>", minimum=0, maximum=10, default=0),
+    Field("feedback", str, '"<feedback>"', default="No feedback provided."),
+])
+ANSWER = "I would profile the slow endpoint first and then add an index."
+
+
+def _router(**options):
+    return ModelRouter(small_model="small", large_model="large", min_words=3, borderline=(4, 6), log_file=None,
+                       **options)
+
+
+def _grader(scores):
+    """grade(model) returning `scores[model]`, recording which models were asked."""
+    calls = []
+
+    def grade(model):
+        calls.append(model)
+        score = scores[model]
+        if isinstance(score, Exception):
+            raise score
+        return {"score": score, "feedback": f"{model} feedback"}
+
+    return grade, calls
+
+
+@pytest.mark.parametrize("answer, feedback", [("", NO_ANSWER_FEEDBACK), ("um yes", SHORT_ANSWER_FEEDBACK)])
+def test_trivial_answers_are_graded_locally(answer, feedback):
+    router = _router()
+    grade, calls = _grader({})
+    assert router.evaluate("test", SCHEMA, answer, grade) == {"score": 0, "feedback": feedback}
+    assert calls == []
+    assert router.stats()["test"]["local"] == 1
+
+
+def test_clear_small_model_grade_is_kept():
+    router = _router()
+    grade, calls = _grader({"small": 9, "large": 5})
+    assert router.evaluate("test", SCHEMA, ANSWER, grade)["score"] == 9
+    assert calls == ["small"]
+
+
+@pytest.mark.parametrize("small", [5, RuntimeError("timeout")])
+def test_borderline_or_failed_small_grade_escalates(small):
+    router = _router()
+    grade, calls = _grader({"small": small, "large": 8})
+    assert router.evaluate("test", SCHEMA, ANSWER, grade)["score"] == 8
+    assert calls == ["small", "large"]
+    assert router.stats()["test"]["escalation_rate"] == 1.0
+
+
+def test_incomplete_small_grade_escalates():
+    router = _router()
+    grade, calls = _grader({"small": IncompleteReplyError(SCHEMA, ["score"]), "large": 8})
+    assert router.evaluate("test", SCHEMA, ANSWER, grade)["score"] == 8
+    assert calls == ["small", "large"]
+    assert router.grading_escalation(SCHEMA, {"feedback": "Fine."}) == "incomplete"
+
+
+def test_review_escalates_an_incomplete_streamed_grade():
+    router = _router()
+    grade, calls = _grader({"large": 7})
+
+    def finish():
+        raise IncompleteReplyError(SCHEMA, ["score"])
+
+    assert router.review("test", SCHEMA, finish, grade, time.perf_counter())["score"] == 7
+    assert calls == ["large"]
+    assert router.stats()["test"]["escalated"] == 1
+
+
+def test_disabled_routing_goes_straight_to_the_large_model():
+    router = _router(enabled=False)
+    grade, calls = _grader({"small": 9, "large": 7})
+    assert router.evaluate("test", SCHEMA, "", grade)["score"] == 7
+    assert calls == ["large"]
+    assert router.key == "large"
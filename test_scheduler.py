@@ -0,0 +1,53 @@
+import threading
+import pytest
+from scheduler import LLMScheduler, TokenBucket, SchedulerOverloaded, estimate_tokens
+
+
+def test_token_bucket_waits_for_refill():
+    bucket = TokenBucket(60)  # one unit per second
+    bucket.take(60)
+    assert bucket.delay(3, bucket.updated) == pytest.approx(3)
+    bucket.give(1000)
+    assert bucket.level == 60
+
+
+def test_settle_corrects_the_reservation():
+    scheduler = LLMScheduler(requests_per_minute=0, tokens_per_minute=6000)
+    scheduler.acquire(1000)
+    scheduler.settle(1000, 200)
+    assert scheduler.tokens.level == pytest.approx(5800, abs=1)
+    scheduler.settle(100, 600)
+    assert scheduler.tokens.level == pytest.approx(5300, abs=1)
+
+
+def test_full_queue_drops_new_calls():
+    scheduler = LLMScheduler(requests_per_minute=0, tokens_per_minute=0, max_queue=0)
+    with pytest.raises(SchedulerOverloaded):
+        scheduler.acquire(10)
+    assert scheduler.metrics()["dropped"] == 1
+
+
+def test_calls_that_wait_too_long_are_dropped():
+    scheduler = LLMScheduler(requests_per_minute=1, tokens_per_minute=0, max_wait=0.05)
+    scheduler.acquire(10)  # spends the only request of this minute
+    with pytest.raises(SchedulerOverloaded):
+        scheduler.acquire(10)
+    assert scheduler.metrics()["queue_depth"] == 0
+
+
+def test_waiting_calls_are_released_by_priority():
+    scheduler = LLMScheduler(requests_per_minute=0, tokens_per_minute=0)
+    scheduler.pause(0.2)
+    order = []
+    threads = [threading.Thread(target=lambda p=p: (scheduler.acquire(1, priority=p), order.append(p)))
+               for p in (2, 1, 0)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert order == [0, 1, 2]
+
+
+def test_estimate_tokens_is_never_zero():
+    assert estimate_tokens("") == 1
+    assert estimate_tokens("x" * 40) == 10
@@ -0,0 +1,104 @@
+import json
+import time
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+import pytest
+from server import JobQueue, InterviewService, APIError, make_handler, CPU, LLM
+
+
+@pytest.fixture
+def queue():
+    queue = JobQueue(workers={CPU: 2, LLM: 2}, max_queue=10, tenant_limit=2, ttl=3600)
+    yield queue
+    queue.shutdown()
+
+
+def test_job_runs_and_reports_its_result(queue):
+    done = []
+    job = queue.submit("acme", "add", LLM, lambda a, b: a + b, 2, 3, on_done=done.append)
+    assert job.future.result(timeout=5) == 5
+    assert job.view()["status"] == "done" and job.view()["result"] == 5
+    assert done == [5]
+    assert queue.get("acme", job.id) is job
+    with pytest.raises(APIError):
+        queue.get("other", job.id)
+
+
+def test_failed_job_keeps_its_error(queue):
+    def boom():
+        raise ValueError("bad audio")
+
+    job = queue.submit("acme", "transcribe", CPU, boom)
+    with pytest.raises(ValueError):
+        job.future.result(timeout=5)
+    assert job.view() == dict(job.view(), status="failed", error="bad audio")
+    assert queue.stats()["failed"] == 1
+
+
+def test_dependent_job_waits_for_its_dependency(queue):
+    release = threading.Event()
+    first = queue.submit("acme", "transcribe", CPU, lambda: release.wait(5) and "transcript")
+    second = queue.submit("acme", "evaluate", LLM, lambda: first.future.result(), after=(first,))
+    time.sleep(0.05)
+    assert second.status == "queued"
+    release.set()
+    assert second.future.result(timeout=5) == "transcript"
+
+
+def test_tenant_limit_rejects_extra_jobs(queue):
+    release = threading.Event()
+    for _ in range(2):
+        queue.submit("acme", "slow", LLM, release.wait, 5)
+    with pytest.raises(APIError) as error:
+        queue.submit("acme", "slow", LLM, release.wait, 5)
+    assert error.value.status == 429
+    queue.submit("other", "fast", CPU, lambda: None).future.result(timeout=5)
+    release.set()
+
+
+@pytest.fixture
+def api(queue):
+    service = InterviewService(queue=queue)
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(service, {}))
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield service, f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _get(url):
+    try:
+        with urllib.request.urlopen(url, timeout=5) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+@pytest.mark.parametrize("wait", ["soon", "nan", "-1"])
+def test_job_poll_rejects_a_bad_wait(api, wait):
+    service, url = api
+    job = service.queue.submit("default", "add", LLM, lambda: 1)
+    assert _get(f"{url}/jobs/{job.id}?wait={wait}")[0] == 400
+
+
+def test_job_poll_long_polls(api):
+    service, url = api
+    job = service.queue.submit("default", "slow", LLM, lambda: time.sleep(0.1) or "done")
+    status, view = _get(f"{url}/jobs/{job.id}?wait=5")
+    assert status == 200 and view["result"] == "done"
+
+
+def test_finished_answer_jobs_are_pruned(queue):
+    service = InterviewService(queue=queue)
+    release = threading.Event()
+    finished = queue.submit("acme", "evaluate", LLM, lambda: None)
+    finished.future.result(timeout=5)
+    running = queue.submit("acme", "evaluate", LLM, release.wait, 5)
+    service._pending_jobs("s1", add=finished)
+    assert service._pending_jobs("s1", add=running) == [running]
+    release.set()
+    running.future.result(timeout=5)
+    assert service._pending_jobs("s1") == []
+    assert "s1" not in service.pending
@@ -0,0 +1,65 @@
+import pytest
+from session import Answer, InterviewSession, FileSessionStore, new_session_id, SCHEMA_VERSION
+
+
+def _session():
+    session = InterviewSession()
+    session.stage = 'tech_round'
+    session.jd = "Backend engineer, Python and PostgreSQL"
+    session.domain = "Backend Engineer"
+    session.hr_questions = ["Tell me about yourself.", "What motivates you?"]
+    session.hr_index = 2
+    session.tech_questions = ["What is an index?"]
+    session.record_answer(Answer('hr', 0, "Tell me about yourself.", "I build APIs.", 7, "Clear.", "High", 1.5))
+    session.record_answer(Answer('hr', 1, "What motivates you?", "Shipping.", 6, "Short.", "Medium"))
+    session.hr_pending = [("What motivates you?", "Shipping.")]
+    session.retry_answer = Answer('tech', 0, "What is an index?", "A lookup table.", 2, "Too vague.")
+    session.chat_history = [("Hello", False), ("Hi", True)]
+    return session
+
+
+def _assert_same(a, b):
+    for name in InterviewSession.__slots__:
+        left, right = getattr(a, name), getattr(b, name)
+        if name in ("hr_answers", "tech_answers"):
+            left, right = [x.to_state() for x in left], [x.to_state() for x in right]
+        elif name == "retry_answer" and left is not None:
+            left, right = left.to_state(), right.to_state()
+        assert left == right, name
+
+
+def test_state_round_trip():
+    session = _session()
+    _assert_same(InterviewSession.from_state(session.to_state()), session)
+
+
+def test_compressed_snapshot_round_trip():
+    session = _session()
+    restored = InterviewSession.loads(session.dumps())
+    _assert_same(restored, session)
+    assert restored.hr_pending == [("What motivates you?", "Shipping.")]
+    assert isinstance(restored.retry_answer, Answer)
+
+
+def test_other_schema_versions_are_rejected():
+    version, state = _session().to_state()
+    with pytest.raises(ValueError):
+        InterviewSession.from_state([SCHEMA_VERSION + 1, state])
+
+
+def test_record_answer_keeps_question_order_and_replaces_retries():
+    session = InterviewSession()
+    for index in (2, 0, 1):
+        session.record_answer(Answer('tech', index, f"Q{index}", score=index))
+    session.record_answer(Answer('tech', 1, "Q1", score=9))
+    assert [(a.index, a.score) for a in session.tech_answers] == [(0, 0), (1, 9), (2, 2)]
+
+
+def test_file_store(tmp_path):
+    store = FileSessionStore(str(tmp_path))
+    session_id = new_session_id()
+    assert store.load(session_id) is None
+    store.save(session_id, _session())
+    _assert_same(store.load(session_id), _session())
+    with pytest.raises(ValueError):
+        store.load("../escape")
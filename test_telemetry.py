@@ -0,0 +1,17 @@
+from telemetry import histogram, register_collector, export_metrics
+
+
+def test_label_values_are_escaped():
+    register_collector(lambda: [("test_escape_total", "counter", "Escaping check",
+                                 [({"domain": 'Data "Platform"\nEngineer\\Ops'}, 1)])])
+    assert 'test_escape_total{domain="Data \\"Platform\\"\\nEngineer\\\\Ops"} 1' in export_metrics()
+
+
+def test_histogram_buckets_are_cumulative():
+    seconds = histogram("test_seconds", "Histogram check", labels=("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        seconds.observe(value, stage="grade")
+    text = export_metrics()
+    assert 'test_seconds_bucket{stage="grade",le="0.1"} 1' in text
+    assert 'test_seconds_bucket{stage="grade",le="1.0"} 2' in text
+    assert 'test_seconds_count{stage="grade"} 3' in text
@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+from transcription import TranscriptionServer, EngineConfig, FakeEngine, ENGINES
+
+AUDIO = np.zeros(16000, dtype=np.float32)
+
+
+class ShortBatchEngine(FakeEngine):
+    """Drops the last transcript of every batch."""
+
+    def transcribe_batch(self, inputs):
+        return super().transcribe_batch(inputs)[:-1]
+
+
+def _submit(backend, count):
+    server = TranscriptionServer(EngineConfig(backend=backend), max_batch=count, batch_wait=0.2)
+    return [server.submit(AUDIO) for _ in range(count)]
+
+
+def test_concurrent_requests_are_answered_in_order():
+    futures = _submit("fake", 3)
+    assert [future.result(timeout=5) for future in futures] == [FakeEngine.TRANSCRIPT] * 3
+
+
+def test_short_engine_result_fails_every_request_in_the_batch(monkeypatch):
+    monkeypatch.setitem(ENGINES, "short", ShortBatchEngine)
+    for future in _submit("short", 3):
+        with pytest.raises(RuntimeError, match="2 transcript"):
+            future.result(timeout=5)
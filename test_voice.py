@@ -0,0 +1,66 @@
+import numpy as np
+from voice import SpeechSegmenter, SAMPLE_RATE
+
+BLOCK = int(0.1 * SAMPLE_RATE)
+
+
+def _tone(seconds, amplitude=0.2):
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (amplitude * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+def _silence(seconds, amplitude=0.001):
+    return np.random.default_rng(0).normal(0, amplitude, int(seconds * SAMPLE_RATE)).astype(np.float32)
+
+
+def _run(audio, **options):
+    segmenter = SpeechSegmenter(**options)
+    segments, ended = [], False
+    for start in range(0, len(audio), BLOCK):
+        segment, ended = segmenter.feed(audio[start:start + BLOCK])
+        if segment is not None:
+            segments.append(segment)
+        if ended:
+            break
+    tail = segmenter.finish()
+    if tail is not None:
+        segments.append(tail)
+    return segments, ended, segmenter
+
+
+def test_speech_after_leading_silence_is_segmented():
+    segments, ended, _ = _run(np.concatenate([_silence(0.5), _tone(1.0), _silence(2.5)]))
+    assert len(segments) == 1
+    assert ended
+
+
+def test_speech_from_the_first_block_is_segmented():
+    segments, ended, segmenter = _run(np.concatenate([_tone(1.0), _silence(2.5)]))
+    assert len(segments) == 1
+    assert len(segments[0]) >= SAMPLE_RATE
+    assert ended
+    assert segmenter.noise_floor is None or segmenter.noise_floor < segmenter.threshold
+
+
+def test_noise_floor_ignores_loud_blocks():
+    _, _, segmenter = _run(np.concatenate([_silence(0.3), _tone(0.5)]))
+    assert segmenter.noise_floor < 0.01
+
+
+def test_pause_splits_segments():
+    audio = np.concatenate([_tone(0.5), _silence(0.8), _tone(0.5), _silence(2.5)])
+    segments, ended, _ = _run(audio)
+    assert len(segments) == 2
+    assert ended
+
+
+def test_long_speech_is_cut_at_max_segment():
+    segments, _, _ = _run(np.concatenate([_tone(2.5), _silence(2.5)]), max_segment=1)
+    assert len(segments) >= 2
+    assert all(len(segment) <= SAMPLE_RATE + BLOCK for segment in segments)
+
+
+def test_silence_alone_never_ends():
+    segments, ended, _ = _run(_silence(3.0))
+    assert segments == []
+    assert not ended
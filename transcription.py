@@ -0,0 +1,350 @@
+import os
+import time
+import queue
+import logging
+import argparse
+import secrets
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from multiprocessing.managers import BaseManager
+from telemetry import configure_logging
+
+logger = logging.getLogger(__name__)
+
+#---------transcription service settings---------
+WHISPER_BACKEND = os.getenv("WHISPER_BACKEND", "whisper")  # "whisper", "faster-whisper" or "fake" (load tests)
+WHISPER_MODEL = os.getenv("WHISPER_MODEL", "base")  # Try 'tiny' for faster performance
+WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "float32")  # "float32" or "int8"
+WHISPER_THREADS = int(os.getenv("WHISPER_THREADS", "0"))  # 0 keeps the library default
+WHISPER_BEAM_SIZE = int(os.getenv("WHISPER_BEAM_SIZE", "1"))  # 1 is greedy decoding
+TRANSCRIBE_MAX_BATCH = int(os.getenv("TRANSCRIBE_MAX_BATCH", "8"))
+TRANSCRIBE_BATCH_WAIT = float(os.getenv("TRANSCRIBE_BATCH_WAIT", "0.05"))
+# "host:port" of a shared transcription process; unset runs the model in this process
+TRANSCRIBE_SERVER_ADDRESS = os.getenv("TRANSCRIBE_SERVER_ADDRESS")
+# Shared secret for that socket (it carries pickles, so it must not be guessable): taken from
+# TRANSCRIBE_SERVER_AUTHKEY, else from a key file serve() generates with owner-only permissions
+TRANSCRIBE_SERVER_AUTHKEY = os.getenv("TRANSCRIBE_SERVER_AUTHKEY")
+TRANSCRIBE_SERVER_KEY_FILE = os.getenv("TRANSCRIBE_SERVER_KEY_FILE", "transcription.key")
+
+
+class EngineConfig:
+    """Model size, backend and CPU tuning for a transcription engine."""
+
+    def __init__(self, backend=WHISPER_BACKEND, model_size=WHISPER_MODEL, compute_type=WHISPER_COMPUTE_TYPE,
+                 threads=WHISPER_THREADS, beam_size=WHISPER_BEAM_SIZE):
+        if backend not in ENGINES:
+            raise ValueError(f"Unknown transcription backend '{backend}'. Choose from: {', '.join(ENGINES)}")
+        if compute_type not in ("float32", "int8"):
+            raise ValueError(f"Unsupported compute type '{compute_type}'. Use 'float32' or 'int8'.")
+        self.backend = backend
+        self.model_size = model_size
+        self.compute_type = compute_type
+        self.threads = threads
+        self.beam_size = beam_size
+
+    def __repr__(self):
+        return (f"{self.backend}/{self.model_size}/{self.compute_type}"
+                f"/threads={self.threads or 'auto'}/beam={self.beam_size}")
+
+
+def wav_duration(path):
+    """
+    Seconds of audio in a WAV file. Read through scipy rather than the wave module, which
+    rejects the IEEE-float WAVs voice.py archives.
+    """
+    from scipy.io.wavfile import read
+    rate, data = read(path, mmap=True)
+    return len(data) / rate
+
+
+#---------engines---------
+class WhisperEngine:
+    """
+    openai-whisper on CPU. Clips within the 30s window are decoded as one batch;
+    int8 applies PyTorch dynamic quantization to the model's linear layers.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.model = None
+
+    def load(self):
+        import torch
+        import whisper
+
+        if self.config.threads:
+            torch.set_num_threads(self.config.threads)
+        self.model = whisper.load_model(self.config.model_size, device="cpu")
+        if self.config.compute_type == "int8":
+            self.model = torch.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    def transcribe_batch(self, inputs):
+        import torch
+        import whisper
+
+        audios = [whisper.load_audio(audio) if isinstance(audio, str) else audio for audio in inputs]
+        texts = [None] * len(audios)
+        beam_size = self.config.beam_size if self.config.beam_size > 1 else None
+
+        short = [i for i, audio in enumerate(audios) if len(audio) <= whisper.audio.N_SAMPLES]
+        if short:
+            n_mels = getattr(self.model.dims, "n_mels", 80)
+            mels = torch.stack([
+                whisper.log_mel_spectrogram(whisper.pad_or_trim(audios[i]), n_mels)
+                for i in short
+            ])
+            options = whisper.DecodingOptions(fp16=False, beam_size=beam_size)
+            for i, result in zip(short, whisper.decode(self.model, mels, options)):
+                texts[i] = result.text.strip()
+
+        for i, audio in enumerate(audios):
+            if texts[i] is None:
+                texts[i] = self.model.transcribe(audio, fp16=False, beam_size=beam_size)["text"].strip()
+        return texts
+
+
+class FasterWhisperEngine:
+    """CTranslate2-based faster-whisper, with native int8 CPU kernels."""
+
+    def __init__(self, config):
+        self.config = config
+        self.model = None
+
+    def load(self):
+        from faster_whisper import WhisperModel
+
+        self.model = WhisperModel(
+            self.config.model_size,
+            device="cpu",
+            compute_type=self.config.compute_type,
+            cpu_threads=self.config.threads,
+        )
+
+    def transcribe_batch(self, inputs):
+        texts = []
+        for audio in inputs:
+            segments, _ = self.model.transcribe(audio, beam_size=self.config.beam_size)
+            texts.append("".join(segment.text for segment in segments).strip())
+        return texts
+
+
+class FakeEngine:
+    """
+    Stand-in engine for offline load tests: returns a fixed transcript after sleeping
+    `WHISPER_FAKE_RTF` seconds per second of audio, so no model has to be loaded.
+    """
+
+    TRANSCRIPT = "I have worked on several projects where I used these skills in practice."
+
+    def __init__(self, config):
+        self.config = config
+        self.rtf = float(os.getenv("WHISPER_FAKE_RTF", "0"))
+
+    def load(self):
+        pass
+
+    @staticmethod
+    def _duration(audio):
+        if isinstance(audio, str):
+            return wav_duration(audio)
+        return len(audio) / 16000
+
+    def transcribe_batch(self, inputs):
+        if self.rtf:
+            time.sleep(self.rtf * sum(self._duration(audio) for audio in inputs))
+        return [self.TRANSCRIPT for _ in inputs]
+
+
+ENGINES = {
+    "whisper": WhisperEngine,
+    "faster-whisper": FasterWhisperEngine,
+    "fake": FakeEngine,
+}
+
+
+def build_engine(config=None):
+    config = config or EngineConfig()
+    return ENGINES[config.backend](config)
+
+
+class TranscriptionServer:
+    """
+    Owns the single transcription engine of a process and batches concurrent requests.
+    Requests are file paths or 16 kHz mono float32 arrays.
+    Requests queued within `batch_wait` seconds of each other (up to `max_batch`)
+    are handed to the engine together.
+    """
+
+    def __init__(self, config=None, max_batch=TRANSCRIBE_MAX_BATCH, batch_wait=TRANSCRIBE_BATCH_WAIT):
+        self.config = config or EngineConfig()
+        self.max_batch = max_batch
+        self.batch_wait = batch_wait
+        self.engine = None
+        self._requests = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._worker is not None:
+                return
+            logger.info(f"Loading transcription engine {self.config}...")
+            engine = build_engine(self.config)
+            engine.load()
+            self.engine = engine
+            logger.info("Transcription engine loaded successfully.")
+            self._worker = threading.Thread(target=self._run, name="transcription-server", daemon=True)
+            self._worker.start()
+
+    def submit(self, audio):
+        """Queues a file path or audio array for transcription and returns a Future resolving to its text."""
+        self.start()
+        future = Future()
+        self._requests.put((audio, future))
+        return future
+
+    def transcribe(self, audio, timeout=None):
+        return self.submit(audio).result(timeout=timeout)
+
+    def _next_batch(self):
+        batch = [self._requests.get()]
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._requests.get(timeout=self.batch_wait))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            inputs = [audio for audio, _ in batch]
+            try:
+                logger.info(f"Transcribing batch of {len(inputs)} request(s).")
+                texts = list(self.engine.transcribe_batch(inputs))
+                if len(texts) != len(batch):
+                    raise RuntimeError(f"engine returned {len(texts)} transcript(s) for {len(batch)} request(s)")
+                for (_, future), text in zip(batch, texts):
+                    future.set_result(text)
+            except Exception as e:
+                logger.error(f"Batch transcription failed: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def get_server():
+    """Returns the in-process transcription server, creating it on first use."""
+    global _server
+    if _server is None:
+        with _server_lock:
+            if _server is None:
+                _server = TranscriptionServer()
+    return _server
+
+
+#---------shared transcription process over a local socket---------
+class TranscriptionManager(BaseManager):
+    pass
+
+
+TranscriptionManager.register("transcribe", callable=lambda audio: get_server().transcribe(audio))
+
+_remote = None
+_remote_executor = None
+
+
+def server_authkey(create=False, path=TRANSCRIBE_SERVER_KEY_FILE):
+    """
+    The transcription socket's authkey: TRANSCRIBE_SERVER_AUTHKEY, else the key file.
+    With `create`, a missing key file is generated (readable by its owner only).
+    Raises RuntimeError when there is no key, or the key file is readable by others.
+    """
+    if TRANSCRIBE_SERVER_AUTHKEY:
+        return TRANSCRIBE_SERVER_AUTHKEY.encode()
+    if create and not os.path.exists(path):
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            with os.fdopen(fd, "w") as f:
+                f.write(secrets.token_hex(32))
+            logger.info(f"Generated transcription server key in {path}")
+        except FileExistsError:
+            pass  # another process created it first
+    if not os.path.exists(path):
+        raise RuntimeError("No transcription server key: set TRANSCRIBE_SERVER_AUTHKEY "
+                           f"or run the server once to create {path}")
+    if os.stat(path).st_mode & 0o077:
+        raise RuntimeError(f"Transcription server key {path} is accessible to other users; chmod 600 it")
+    with open(path) as f:
+        key = f.read().strip()
+    if not key:
+        raise RuntimeError(f"Transcription server key {path} is empty")
+    return key.encode()
+
+
+def _connect_remote():
+    global _remote
+    with _server_lock:
+        if _remote is None:
+            host, port = TRANSCRIBE_SERVER_ADDRESS.rsplit(":", 1)
+            manager = TranscriptionManager(address=(host, int(port)), authkey=server_authkey())
+            manager.connect()
+            _remote = manager
+    return _remote
+
+
+def _remote_transcribe(audio):
+    return _connect_remote().transcribe(audio)._getvalue()
+
+
+def transcribe(audio):
+    """
+    Transcribes a file path or 16 kHz float32 array through the shared model: the local
+    transcription process when TRANSCRIBE_SERVER_ADDRESS is set, otherwise this
+    process's own batching server.
+    """
+    if TRANSCRIBE_SERVER_ADDRESS:
+        return _remote_transcribe(audio)
+    return get_server().transcribe(audio)
+
+
+def transcribe_async(audio):
+    """Like transcribe(), but returns a Future so callers can keep capturing audio meanwhile."""
+    global _remote_executor
+    if TRANSCRIBE_SERVER_ADDRESS:
+        with _server_lock:
+            if _remote_executor is None:
+                _remote_executor = ThreadPoolExecutor(max_workers=TRANSCRIBE_MAX_BATCH,
+                                                      thread_name_prefix="transcribe-client")
+        return _remote_executor.submit(_remote_transcribe, audio)
+    return get_server().submit(audio)
+
+
+def warmup():
+    """Loads the local engine (or connects to the shared process) ahead of the first answer."""
+    if TRANSCRIBE_SERVER_ADDRESS:
+        _connect_remote()
+    else:
+        get_server().start()
+
+
+def serve(host="127.0.0.1", port=50051):
+    """Runs a transcription process that every Streamlit worker on the node can share."""
+    authkey = server_authkey(create=True)  # refuses to listen without a private key
+    get_server().start()
+    manager = TranscriptionManager(address=(host, port), authkey=authkey)
+    logger.info(f"Transcription server listening on {host}:{port}")
+    manager.get_server().serve_forever()
+
+
+if __name__ == "__main__":
+    configure_logging()
+    parser = argparse.ArgumentParser(description="Shared Whisper transcription server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=50051)
+    args = parser.parse_args()
+    serve(args.host, args.port)
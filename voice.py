@@ -1,43 +1,120 @@
-import sounddevice as sd
-from scipy.io.wavfile import write
-import whisper
+from concurrent.futures import ThreadPoolExecutor
+from math import gcd
+import numpy as np
 import datetime
+import queue
+import io
 import os
+import json
 import logging
+from transcription import transcribe, transcribe_async
+from telemetry import traced
 
-# ==== Logging Configuration ====
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("audio_transcription.log"),
-        logging.StreamHandler()
-    ]
-)
-
-# ==== Load Whisper model once (globally) ====
-try:
-    logging.info("Loading Whisper model...")
-    whisper_model = whisper.load_model("base")  # Try 'tiny' for faster performance
-    logging.info("Whisper model loaded successfully.")
-except Exception as e:
-    logging.critical(f"Error loading Whisper model: {e}")
-    whisper_model = None
-
-def record_audio(duration=20, fs=44100, save_dir="recordings"):
-    """
-    Records audio for a specified duration and saves it as a .wav file.
+# ==== Whisper model ====
+# The model is owned by the shared transcription server (see transcription.py),
+# which loads it once per node and batches requests from concurrent sessions.
+
+# ==== Audio libraries ====
+# sounddevice and scipy are imported on first use (or by preload_audio_stack() during
+# the startup warmup), so a fresh worker can render the first page without them.
+def preload_audio_stack():
+    """Imports the recording and resampling libraries ahead of the first answer."""
+    import sounddevice  # noqa: F401
+    import scipy.io.wavfile  # noqa: F401
+    import scipy.signal  # noqa: F401
+
+# ==== Audio settings ====
+SAMPLE_RATE = 16000  # Whisper's native rate, so recordings need no resampling
+# Recordings are written to disk on a background thread, purely for archival
+ARCHIVE_RECORDINGS = os.getenv("ARCHIVE_RECORDINGS", "1") == "1"
+_archive_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="audio-archive")
+
+# ==== Streaming capture settings ====
+STREAM_BLOCK_SECONDS = 0.1
+VAD_THRESHOLD = float(os.getenv("VAD_THRESHOLD", "0.01"))  # minimum RMS treated as speech
+VAD_PAUSE_SECONDS = 0.6  # silence that closes a segment
+VAD_END_SILENCE_SECONDS = float(os.getenv("VAD_END_SILENCE_SECONDS", "2.0"))  # silence that ends the answer
+VAD_MAX_SEGMENT_SECONDS = 25  # stay inside Whisper's 30s window
+
+def _recording_path(save_dir):
+    os.makedirs(save_dir, exist_ok=True)
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    return os.path.join(save_dir, f"response_{timestamp}.wav")
+
+def write_metadata(filename, metadata):
+    """
+    Writes the sidecar <recording>.json describing what was answered (round, question,
+    domain...), so archived recordings can be re-graded offline (see rescore.py).
+    """
+    if not metadata:
+        return
+    with open(f"{os.path.splitext(filename)[0]}.json", "w", encoding="utf-8") as f:
+        json.dump(metadata, f)
+
+def archive_audio(audio, fs=SAMPLE_RATE, save_dir="recordings", metadata=None):
+    """
+    Writes a recording (and its metadata sidecar) to `save_dir` on the archive thread
+    and returns its future filename. The caller never waits on disk I/O.
+    """
+    filename = _recording_path(save_dir)
+
+    def save():
+        try:
+            from scipy.io.wavfile import write
+            write(filename, fs, audio)
+            write_metadata(filename, metadata)
+            logging.info(f"Archived audio to {filename}")
+        except Exception as e:
+            logging.error(f"Error archiving audio to {filename}: {e}")
+
+    _archive_executor.submit(save)
+    return filename
+
+def to_whisper_audio(audio, fs):
+    """Converts a recording to the mono float32 16 kHz array Whisper expects, resampling once in memory."""
+    audio = np.asarray(audio)
+    if np.issubdtype(audio.dtype, np.integer):
+        audio = audio.astype(np.float32) / np.iinfo(audio.dtype).max
+    if audio.ndim > 1:
+        audio = audio.mean(axis=1)
+    if fs != SAMPLE_RATE:
+        from scipy.signal import resample_poly
+        divisor = gcd(int(fs), SAMPLE_RATE)
+        audio = resample_poly(audio, SAMPLE_RATE // divisor, int(fs) // divisor)
+    return np.ascontiguousarray(audio, dtype=np.float32)
+
+def load_wav_bytes(data):
+    """Decodes WAV file bytes (e.g. from a browser recorder) straight into a Whisper-ready array."""
+    from scipy.io.wavfile import read
+    fs, audio = read(io.BytesIO(data))
+    return to_whisper_audio(audio, fs)
+
+@traced("record_audio")
+def record_audio(duration=20, fs=SAMPLE_RATE, save_dir="recordings", in_memory=False, metadata=None):
+    """
+    Records mono audio for a specified duration.
+    By default saves it as a .wav file and returns the path; with `in_memory=True`
+    returns the float32 samples for direct transcription and archives the file
+    in the background (when ARCHIVE_RECORDINGS is on). `metadata` is saved next to the file.
     Includes exception handling and logging for recording issues.
     """
     try:
-        os.makedirs(save_dir, exist_ok=True)
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = os.path.join(save_dir, f"response_{timestamp}.wav")
+        import sounddevice as sd
+        from scipy.io.wavfile import write
 
         logging.info(f"Recording for {duration} seconds...")
-        audio = sd.rec(int(duration * fs), samplerate=fs, channels=1)
+        audio = sd.rec(int(duration * fs), samplerate=fs, channels=1, dtype="float32")
         sd.wait()
+        audio = audio[:, 0]
+
+        if in_memory:
+            if ARCHIVE_RECORDINGS:
+                archive_audio(audio, fs, save_dir, metadata)
+            return to_whisper_audio(audio, fs)
+
+        filename = _recording_path(save_dir)
         write(filename, fs, audio)
+        write_metadata(filename, metadata)
         logging.info(f"Saved audio to {filename}")
         return filename
 
@@ -45,24 +122,169 @@ def record_audio(duration=20, fs=44100, save_dir="recordings"):
         logging.error(f"Error during audio recording: {e}")
         return None
 
-def transcribe_audio(filename):
+@traced("transcribe_audio")
+def transcribe_audio(audio):
     """
-    Transcribes the audio file using Whisper.
+    Transcribes an audio file path, or a 16 kHz mono float32 NumPy array, using the
+    shared Whisper transcription server.
     Includes exception handling and logging for transcription issues.
     """
     try:
-        if whisper_model is None:
-            raise RuntimeError("Whisper model is not loaded.")
+        if audio is None:
+            raise ValueError("No audio to transcribe.")
 
-        if not os.path.exists(filename):
-            raise FileNotFoundError(f"Audio file not found: {filename}")
+        if isinstance(audio, np.ndarray):
+            logging.info(f"Transcribing {len(audio) / SAMPLE_RATE:.1f}s in-memory recording...")
+            audio = np.ascontiguousarray(audio, dtype=np.float32)
+        elif not os.path.exists(audio):
+            raise FileNotFoundError(f"Audio file not found: {audio}")
+        else:
+            logging.info(f"Transcribing {audio}...")
 
-        logging.info(f"Transcribing {filename}...")
-        result = whisper_model.transcribe(filename)
-        text = result["text"].strip()
+        text = transcribe(audio)
         logging.info(f"Transcribed text: {text}")
         return text
 
     except Exception as e:
         logging.error(f"Error during transcription: {e}")
         return ""
+
+def stream_microphone(max_duration=20, fs=SAMPLE_RATE, block_seconds=STREAM_BLOCK_SECONDS):
+    """
+    Yields mono float32 blocks from the microphone as they are captured,
+    for at most `max_duration` seconds. Closing the generator stops the stream.
+    """
+    import sounddevice as sd
+
+    blocks = queue.Queue()
+
+    def callback(indata, frames, time_info, status):
+        if status:
+            logging.warning(f"Audio input status: {status}")
+        blocks.put(indata[:, 0].copy())
+
+    max_samples = int(max_duration * fs)
+    captured = 0
+    with sd.InputStream(samplerate=fs, channels=1, dtype="float32",
+                        blocksize=int(fs * block_seconds), callback=callback):
+        while captured < max_samples:
+            block = blocks.get()
+            captured += len(block)
+            yield block
+
+
+class SpeechSegmenter:
+    """
+    Energy-based voice activity detector.
+    feed() returns the finished speech segment (or None) and whether the speaker has
+    stopped, i.e. `end_silence` seconds of silence followed speech.
+    The speech threshold adapts to the noise floor of the quiet blocks heard before
+    speech starts; loud blocks never raise it, so speech from the first block is kept.
+    """
+
+    def __init__(self, fs=SAMPLE_RATE, threshold=VAD_THRESHOLD, pause=VAD_PAUSE_SECONDS,
+                 end_silence=VAD_END_SILENCE_SECONDS, max_segment=VAD_MAX_SEGMENT_SECONDS):
+        self.fs = fs
+        self.threshold = threshold
+        self.pause_samples = int(pause * fs)
+        self.end_silence_samples = int(end_silence * fs)
+        self.max_segment_samples = int(max_segment * fs)
+        self.noise_floor = None
+        self.heard_speech = False
+        self.silence = 0
+        self.current = []
+        self.current_samples = 0
+
+    def _is_speech(self, block):
+        rms = float(np.sqrt(np.mean(np.square(block)))) if len(block) else 0.0
+        speech = rms > max(self.threshold, 3 * (self.noise_floor or 0.0))
+        if not speech and not self.heard_speech:
+            self.noise_floor = rms if self.noise_floor is None else 0.9 * self.noise_floor + 0.1 * rms
+        return speech
+
+    def _flush(self):
+        segment = np.concatenate(self.current) if self.current else None
+        self.current = []
+        self.current_samples = 0
+        return segment
+
+    def feed(self, block):
+        if self._is_speech(block):
+            self.heard_speech = True
+            self.silence = 0
+        elif self.heard_speech:
+            self.silence += len(block)
+
+        if self.heard_speech and (self.current or self.silence == 0):
+            self.current.append(block)
+            self.current_samples += len(block)
+
+        segment = None
+        if self.current and (self.silence >= self.pause_samples or self.current_samples >= self.max_segment_samples):
+            segment = self._flush()
+        ended = self.heard_speech and self.silence >= self.end_silence_samples
+        return segment, ended
+
+    def finish(self):
+        """Returns whatever speech is still buffered when the stream closes."""
+        return self._flush()
+
+
+def stream_transcribe(blocks, fs=SAMPLE_RATE, on_partial=None):
+    """
+    Segments incoming audio `blocks` with the VAD and transcribes each segment as soon as
+    it closes, while capture continues. Stops consuming blocks once the speaker falls silent.
+    Returns (full_audio, transcript); `on_partial(text)` is called as segments are decoded.
+    """
+    segmenter = SpeechSegmenter(fs=fs)
+    captured = []
+    pending = []
+    texts = []
+
+    def drain(block_until_done=False):
+        while pending and (block_until_done or pending[0].done()):
+            text = pending.pop(0).result().strip()
+            if text:
+                texts.append(text)
+                if on_partial:
+                    on_partial(" ".join(texts))
+
+    for block in blocks:
+        captured.append(block)
+        segment, ended = segmenter.feed(block)
+        if segment is not None:
+            pending.append(transcribe_async(segment))
+        drain()
+        if ended:
+            logging.info("Silence detected, ending recording early.")
+            break
+
+    if hasattr(blocks, "close"):
+        blocks.close()
+
+    segment = segmenter.finish()
+    if segment is not None:
+        pending.append(transcribe_async(segment))
+    drain(block_until_done=True)
+
+    audio = np.concatenate(captured) if captured else np.zeros(0, dtype=np.float32)
+    return audio, " ".join(texts)
+
+
+@traced("record_audio_streaming")
+def record_audio_streaming(duration=20, save_dir="recordings", on_partial=None, metadata=None):
+    """
+    Records an answer in streaming mode: audio is segmented on pauses and transcribed
+    while the candidate is still speaking, and recording stops early on silence.
+    Returns (filename, transcript); filename is None when ARCHIVE_RECORDINGS is off.
+    """
+    try:
+        logging.info(f"Streaming recording for up to {duration} seconds...")
+        audio, transcript = stream_transcribe(stream_microphone(max_duration=duration), on_partial=on_partial)
+        filename = archive_audio(audio, SAMPLE_RATE, save_dir, metadata) if ARCHIVE_RECORDINGS else None
+        logging.info(f"Transcribed text: {transcript}")
+        return filename, transcript
+
+    except Exception as e:
+        logging.error(f"Error during streaming recording: {e}")
+        return None, ""